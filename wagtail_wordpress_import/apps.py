@@ -2,6 +2,10 @@ from django.apps import AppConfig
 
 
 class WagtailWordpressImportAppConfig(AppConfig):
+    default_auto_field = "django.db.models.AutoField"
     label = "wagtail_wordpress_import"
     name = "wagtail_wordpress_import"
     verbose_name = "Wagtail wordpress import"
+
+    def ready(self):
+        from wagtail_wordpress_import import checks  # noqa: F401
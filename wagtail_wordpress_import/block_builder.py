@@ -1,12 +1,28 @@
-from bs4 import BeautifulSoup
+from types import MappingProxyType
+
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.utils.module_loading import import_string
 
 from wagtail_wordpress_import.block_builder_defaults import (
     conf_fallback_block,
     conf_html_tags_to_blocks,
 )
-from wagtail_wordpress_import.prefilters.handle_shortcodes import SHORTCODE_HANDLERS
+from wagtail_wordpress_import.html_parsing import get_body, parse_html
+from wagtail_wordpress_import.prefilters.handle_shortcodes import get_shortcode_handlers
+
+# HTML tag names mapped to the block builder functions registered with
+# register_block_builder
+REGISTERED_BLOCK_BUILDERS = {}
+
+DISPATCH_TABLE_SETTINGS = [
+    "WAGTAIL_WORDPRESS_IMPORTER_CONVERT_HTML_TAGS_TO_BLOCKS",
+    "WAGTAIL_WORDPRESS_IMPORTER_FALLBACK_BLOCK",
+    "WAGTAIL_WORDPRESS_IMPORTER_PROMOTE_CHILD_TAGS",
+]
+
+_dispatch_table = None
 
 
 def conf_promote_child_tags():
@@ -14,9 +30,9 @@ def conf_promote_child_tags():
 
     # for each registered shortcode handler add the element_name property
     # to TAGS_TO_PROMOTE
-    for handler in SHORTCODE_HANDLERS:
+    for handler in get_shortcode_handlers():
         if handler.is_top_level_html_tag:
-            TAGS_TO_PROMOTE.append(handler().element_name)
+            TAGS_TO_PROMOTE.append(handler.element_name)
     return getattr(
         settings,
         "WAGTAIL_WORDPRESS_IMPORTER_PROMOTE_CHILD_TAGS",
@@ -27,13 +43,105 @@ def conf_promote_child_tags():
     )
 
 
+class BlockDispatchTable:
+    """
+    The block builder functions for the configured HTML tags, the registered
+    block builders and the registered shortcode handlers, imported once and
+    shared by every item.
+
+    builders:
+        A read only mapping of HTML tag name to the function that builds its
+        block. A block builder registered with register_block_builder takes
+        the place of the configured function for the same tag, which takes
+        the place of a shortcode handler's construct_block.
+    """
+
+    def __init__(self, shortcode_handlers):
+        self.shortcode_handlers = shortcode_handlers
+
+        builders = {
+            handler.element_name: handler.construct_block
+            for handler in shortcode_handlers
+            if hasattr(handler, "construct_block")
+        }
+        builders.update(
+            {
+                tag_name: import_string(builder)
+                for tag_name, builder in conf_html_tags_to_blocks().items()
+            }
+        )
+        builders.update(REGISTERED_BLOCK_BUILDERS)
+        self.builders = MappingProxyType(builders)
+
+        self.fallback_function = import_string(conf_fallback_block())
+
+        config_promote_child_tags = conf_promote_child_tags()
+        self.tags_to_promote = tuple(config_promote_child_tags["TAGS_TO_PROMOTE"])
+        self.parents_to_remove = frozenset(
+            config_promote_child_tags["PARENTS_TO_REMOVE"]
+        )
+
+
+def get_block_dispatch_table():
+    """Return the BlockDispatchTable, it's only built again when one of its
+    settings changes, a block builder is registered or a shortcode handler
+    is registered."""
+    global _dispatch_table
+
+    shortcode_handlers = get_shortcode_handlers()
+    if (
+        _dispatch_table is None
+        or _dispatch_table.shortcode_handlers is not shortcode_handlers
+    ):
+        _dispatch_table = BlockDispatchTable(shortcode_handlers)
+    return _dispatch_table
+
+
+def clear_block_dispatch_table():
+    global _dispatch_table
+    _dispatch_table = None
+
+
+@receiver(setting_changed)
+def clear_block_dispatch_table_on_setting_changed(setting, **kwargs):
+    if setting in DISPATCH_TABLE_SETTINGS:
+        clear_block_dispatch_table()
+
+
+def register_block_builder(tag_name, function=None):
+    """Register a function to build the block for an HTML tag.
+
+    Usage:
+
+        from wagtail_wordpress_import.block_builder import register_block_builder
+
+        @register_block_builder("h2")
+        def build_subheading_block(tag):
+            return {"type": "heading", "value": {"importance": "h2", "text": tag.text}}
+
+    or register_block_builder("h2", "path.to.build_subheading_block")
+    """
+
+    def _wrapper(function):
+        REGISTERED_BLOCK_BUILDERS[tag_name] = (
+            import_string(function) if isinstance(function, str) else function
+        )
+        clear_block_dispatch_table()
+        return function
+
+    if function is not None:
+        return _wrapper(function)
+    return _wrapper
+
+
 class BlockBuilder:
     def __init__(self, value, node, logger):
-        self.soup = BeautifulSoup(value, "lxml")
+        self.soup = parse_html(value)
         self.blocks = []  # for each page this holds the sequence of StreamBlocks
         self.logged_items = {"processed": 0, "imported": 0, "skipped": 0, "items": []}
         self.node = node
         self.logger = logger
+        self.dispatch_table = get_block_dispatch_table()
 
     def promote_child_tags(self):
         """
@@ -43,9 +151,8 @@ class BlockBuilder:
         returns: None
             but modifies the page soup
         """
-        config_promote_child_tags = conf_promote_child_tags()
-        promotee_tags = config_promote_child_tags["TAGS_TO_PROMOTE"]
-        removee_tags = config_promote_child_tags["PARENTS_TO_REMOVE"]
+        promotee_tags = self.dispatch_table.tags_to_promote
+        removee_tags = self.dispatch_table.parents_to_remove
 
         for promotee in promotee_tags:
             promotees = self.soup.findAll(promotee)
@@ -60,25 +167,7 @@ class BlockBuilder:
         returns:
             a function to parse the block from configuration
         """
-
-        # Detecting standard blocks to tags
-        try:
-            builder = conf_html_tags_to_blocks()[element.name]
-            return import_string(builder)
-        except KeyError:
-            pass
-
-        # registered shortcode handlers custom HTML tags
-        conf_custom_tags = {}
-        for handler in SHORTCODE_HANDLERS:
-            cls = handler()
-            conf_custom_tags[cls.element_name] = handler
-
-        if element.name in conf_custom_tags:
-            handler = conf_custom_tags[element.name]
-            # Return the method, so we can call it later like a function that takes a
-            # single argument.
-            return handler().construct_block
+        return self.dispatch_table.builders.get(element.name)
 
     def build(self):
         """
@@ -92,13 +181,12 @@ class BlockBuilder:
         If a HTML tag does have child blocks we should parse then inside the
         build_block_* method
         """
-        soup = self.soup.find("body").findChildren(recursive=False)
+        soup = get_body(self.soup).findChildren(recursive=False)
         cached_fallback_value = (
             ""  # append fall back content here, by default it's a Rich Text block
         )
-        cached_fallback_function = import_string(
-            conf_fallback_block()
-        )  # Rich Text block
+        # Rich Text block
+        cached_fallback_function = self.dispatch_table.fallback_function
         counter = 0
         for element in soup:  # each single top level tag
             counter += 1
@@ -1,12 +1,27 @@
+import re
+
 import requests
-from bs4 import BeautifulSoup
 from django.conf import settings
 from django.core.files import File
-from django.core.files.temp import NamedTemporaryFile
-from django.utils.module_loading import import_string
 from wagtail.documents import get_document_model
 from wagtail.images import get_image_model
 
+from wagtail_wordpress_import.handle_inline_shortcodes import (
+    get_inline_shortcode_scanner,
+)
+from wagtail_wordpress_import.html_parsing import fragment_to_html, parse_html_fragment
+from wagtail_wordpress_import.media import (
+    MediaTooLarge,
+    get_media_fetcher,
+    get_media_index,
+    get_media_source,
+    get_session,
+    hash_file,
+    media_max_size,
+    stream_to_file,
+)
+from wagtail_wordpress_import.timings import time_stage
+
 ImportedImage = get_image_model()
 ImportedDocument = get_document_model()
 
@@ -27,9 +42,10 @@ def conf_html_tags_to_blocks():
 
 
 def fetch_url(src, allow_redirects=True):
-    """general purpose url fetcher with ability to pass in own config"""
+    """general purpose url fetcher with ability to pass in own config,
+    using the pooled session shared by all media requests"""
     try:
-        response = requests.get(
+        response = get_session().get(
             src,
             **getattr(
                 settings,
@@ -44,26 +60,62 @@ def fetch_url(src, allow_redirects=True):
         )
         status = True if response.status_code == 200 else False
         return response, status, response.headers.get("content-type")
-    except requests.ConnectionError:
-        print(f"ConnectionError: {src}")
-        return None, False, None
-    except requests.HTTPError:
-        print(f"HTTPError: {src}")
-        return None, False, None
-    except requests.RequestException:
-        print(f"RequestException: {src}")
-        return None, False, None
-    except requests.ReadTimeout:
-        print(f"ReadTimeout: {src}")
-        return None, False, None
-    except requests.Timeout:
-        print(f"Timeout: {src}")
-        return None, False, None
-    except requests.ConnectTimeout:
-        print(f"ConnectTimeout: {src}")
+    except requests.RequestException as error:
+        # ConnectionError, HTTPError, ReadTimeout, Timeout, ConnectTimeout...
+        print(f"{error.__class__.__name__}: {src}")
         return None, False, None
 
 
+def download_media(src):
+    """
+    Return a (file, valid, content type, sha256 digest) tuple for the media url.
+
+    The response is streamed to a temporary file in chunks and hashed as it's
+    written. Media larger than the WAGTAIL_WORDPRESS_IMPORTER_MEDIA_MAX_SIZE
+    setting is not valid, it's rejected before it's downloaded when the
+    response has a Content-Length header.
+    """
+    response, valid, content_type = fetch_url(src)
+    if response is None:
+        return None, False, content_type, None
+    if not valid:
+        response.close()
+        return None, False, content_type, None
+
+    try:
+        # stream_to_file closes the response
+        media_file, digest = stream_to_file(response, max_size=media_max_size())
+    except MediaTooLarge:
+        print(f"MEDIA IS TOO LARGE: {src}")
+        return None, False, content_type, None
+    return media_file, True, content_type, digest
+
+
+def fetch_media(src):
+    """
+    Return a (file, valid, content type, sha256 digest) tuple for the media url.
+
+    The file is opened from the media source if there is one and it has the
+    url, or it's the result prefetched by the active MediaFetcher, otherwise
+    it's downloaded. The caller closes the file.
+    """
+    with time_stage("block_builder.media_fetch"):
+        media_source = get_media_source()
+        if media_source:
+            local_media = media_source.open(src)
+            if local_media:
+                media_file, content_type = local_media
+                return media_file, True, content_type, hash_file(media_file)
+
+        media_fetcher = get_media_fetcher()
+        if media_fetcher:
+            prefetched = media_fetcher.get(src)
+            if prefetched:
+                return prefetched
+
+        return download_media(src)
+
+
 # FUNCTIONS FOR IMAGES
 
 
@@ -81,7 +133,11 @@ def image_linker(html):
     If the image can be retrieved from the remote site and saved into a Wagtail ImageModel
     the soup is modified.
     """
-    soup = BeautifulSoup(html, "html.parser")
+    return fragment_to_html(link_images(parse_html_fragment(html)))
+
+
+def link_images(soup):
+    """image_linker for a BeautifulSoup tree, the tree is modified and returned"""
     images = soup.find_all("img")
     for image in images:
         if image.attrs and image.attrs.get("src"):
@@ -100,14 +156,30 @@ def image_linker(html):
         else:
             print(f"IMAGE HAS NO SRC: {image}")
 
-    return str(soup)
+    return soup
 
 
 def get_or_save_image(src):
+    """
+    Return the image for the src url, fetching and saving it if it hasn't been
+    imported already.
+
+    During an import the MediaIndex is used to find an image already imported
+    from the same url, another size of it or a file with the same content.
+    Otherwise an image with the same filename as its title is used, and
+    recorded in the MediaIndex.
+    """
     image_file_name = get_image_file_name(src)
-    existing_image = image_exists(image_file_name)
+    media_index = get_media_index()
+    existing_image = None
+    if media_index:
+        existing_image = media_index.get_object(ImportedImage, "image", url=src)
     if not existing_image:
-        response, valid, type = fetch_url(src)
+        existing_image = find_media_by_title("image", image_file_name)
+        if existing_image and media_index:
+            media_index.add("image", src, "", existing_image)
+    if not existing_image:
+        image_file, valid, type, digest = fetch_media(src)
         if valid and (
             type
             in getattr(
@@ -121,17 +193,27 @@ def get_or_save_image(src):
                 ],
             )
         ):
-            temp_image = NamedTemporaryFile(delete=True)
-            temp_image.name = image_file_name
-            temp_image.write(response.content)
-            temp_image.flush()
+            if media_index:
+                existing_image = media_index.get_object(
+                    ImportedImage, "image", digest=digest
+                )
+                if existing_image:  # the same file from another url
+                    image_file.close()
+                    media_index.add("image", src, digest, existing_image)
+                    return existing_image
+
             retrieved_image = ImportedImage(
-                file=File(file=temp_image), title=image_file_name
+                file=File(file=image_file, name=image_file_name),
+                title=image_file_name,
             )
             retrieved_image.save()
-            temp_image.close()
+            image_file.close()
+            if media_index:
+                media_index.add("image", src, digest, retrieved_image)
             return retrieved_image
         else:
+            if image_file:
+                image_file.close()
             print(f"RECEIVED INVALID IMAGE RESPONSE: {src}")
     return existing_image
 
@@ -153,7 +235,11 @@ def document_linker(html):
     If the image can be retrived from the remote site and saved into a Wagtail ImageModel
     the soup is modified.
     """
-    soup = BeautifulSoup(html, "html.parser")
+    return fragment_to_html(link_documents(parse_html_fragment(html)))
+
+
+def link_documents(soup):
+    """document_linker for a BeautifulSoup tree, the tree is modified and returned"""
     anchors = soup.find_all("a")
     for anchor in anchors:
         if anchor.attrs and anchor.attrs.get("href"):
@@ -172,12 +258,11 @@ def document_linker(html):
         else:
             print(f"DOCUMENT HAS NO HREF: {anchor}")
 
-    return str(soup)
+    return soup
 
 
-def get_or_save_document(href):
-    file_type = href.split(".")[-1]
-    if file_type in getattr(
+def get_document_file_types():
+    return getattr(
         settings,
         "",
         [
@@ -185,11 +270,25 @@ def get_or_save_document(href):
             "ppt",
             "docx",
         ],
-    ):
+    )
+
+
+def get_or_save_document(href):
+    file_type = href.split(".")[-1]
+    if file_type in get_document_file_types():
         document_file_name = get_document_file_name(href)
-        existing_document = document_exists(document_file_name)
+        media_index = get_media_index()
+        existing_document = None
+        if media_index:
+            existing_document = media_index.get_object(
+                ImportedDocument, "document", url=href
+            )
+        if not existing_document:
+            existing_document = find_media_by_title("document", document_file_name)
+            if existing_document and media_index:
+                media_index.add("document", href, "", existing_document)
         if not existing_document:
-            response, valid, type = fetch_url(href)
+            document_file, valid, type, digest = fetch_media(href)
             if valid and (
                 type
                 in getattr(
@@ -202,21 +301,76 @@ def get_or_save_document(href):
                     ],
                 )
             ):
-                temp_document = NamedTemporaryFile(delete=True)
-                temp_document.name = document_file_name
-                temp_document.write(response.content)
-                temp_document.flush()
+                if media_index:
+                    existing_document = media_index.get_object(
+                        ImportedDocument, "document", digest=digest
+                    )
+                    if existing_document:  # the same file from another url
+                        document_file.close()
+                        media_index.add("document", href, digest, existing_document)
+                        return existing_document
+
                 retrieved_document = ImportedDocument(
-                    file=File(file=temp_document), title=document_file_name
+                    file=File(file=document_file, name=document_file_name),
+                    title=document_file_name,
                 )
                 retrieved_document.save()
-                temp_document.close()
+                document_file.close()
+                if media_index:
+                    media_index.add("document", href, digest, retrieved_document)
                 return retrieved_document
             else:
+                if document_file:
+                    document_file.close()
                 print(f"RECEIVED INVALID DOCUMENT RESPONSE: {href}")
         return existing_document
 
 
+# FUNCTIONS FOR PREFETCHING MEDIA
+
+IMG_SRC_PATTERN = re.compile(r"<img\s[^>]*?\bsrc\s*=\s*[\"']([^\"']+)", re.IGNORECASE)
+A_HREF_PATTERN = re.compile(r"<a\s[^>]*?\bhref\s*=\s*[\"']([^\"']+)", re.IGNORECASE)
+
+
+def get_media_urls(html):
+    """
+    Return the absolute urls of the images and documents in the html which
+    image_linker and document_linker will need to fetch, because they haven't
+    been imported already.
+
+    The html is searched with regular expressions rather than parsed, a url
+    that is missed here is fetched by the linker when it's needed.
+    """
+    if not html:
+        return []
+
+    domain = getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN")
+    media_source = get_media_source()
+    media_index = get_media_index()
+    urls = []
+
+    for src in IMG_SRC_PATTERN.findall(html):
+        src = get_absolute_src(src, domain)
+        if media_index and media_index.get("image", src) is not None:
+            continue
+        if not find_media_by_title("image", get_image_file_name(src)):
+            urls.append(src)
+
+    for href in A_HREF_PATTERN.findall(html):
+        href = get_absolute_src(href, domain)
+        if href.split(".")[-1] not in get_document_file_types():
+            continue
+        if media_index and media_index.get("document", href) is not None:
+            continue
+        if not find_media_by_title("document", get_document_file_name(href)):
+            urls.append(href)
+
+    if media_source:  # no need to download what the media source has
+        urls = [url for url in urls if not media_source.has(url)]
+
+    return urls
+
+
 # STREAMFIELD BLOCKS
 
 
@@ -279,15 +433,15 @@ def build_richtext_block_content(html, blocks):
     """
     image_linker is called to link up and retrive the remote image
     document_linker is called to link up and retrive the remote documents
-    filters are called to replace inline shortcodes
+    the inline shortcode handlers with a shortcode in the html are called
+
+    The html is parsed once for both linkers, and not at all if it has no
+    img or a tags.
     """
-    html = image_linker(html)
-    html = document_linker(html)
-    for inline_shortcode_handler in getattr(
-        settings, "WAGTAIL_WORDPRESS_IMPORTER_INLINE_SHORTCODE_HANDLERS", []
-    ):
-        function = import_string(inline_shortcode_handler).construct_html_tag
-        html = function(html)
+    if "<img" in html or "<a" in html:
+        soup = parse_html_fragment(html)
+        html = fragment_to_html(link_documents(link_images(soup)))
+    html = get_inline_shortcode_scanner().construct_html_tags(html)
     blocks.append({"type": "rich_text", "value": html})
     html = ""
     return html
@@ -322,6 +476,23 @@ def document_exists(name):
         pass
 
 
+def find_media_by_title(media_type, name):
+    """
+    Return the image or document with the filename as its title.
+
+    During an import it's only returned if the MediaIndex has no record of
+    it, e.g. it was imported before the media urls were recorded. A recorded
+    one is media with the same filename from another url, the media is
+    fetched and compared by its content instead.
+    """
+    model = ImportedImage if media_type == "image" else ImportedDocument
+    media_index = get_media_index()
+    # there can be more than one, with the same filename from different urls
+    for media in model.objects.filter(title=name).order_by("pk"):
+        if not (media_index and media_index.is_recorded(media_type, media.pk)):
+            return media
+
+
 # GENERAL FUNCTIONS
 
 
@@ -0,0 +1,105 @@
+from django.apps import apps
+from django.core.checks import Tags, Warning, register
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, router
+
+# the fields pages are looked up by during an import
+INDEXED_FIELDS = ["wp_post_id", "wp_link_hash"]
+
+
+def get_imported_page_models():
+    from wagtail_wordpress_import.models import WPImportedPageMixin
+
+    return [
+        model
+        for model in apps.get_models()
+        if issubclass(model, WPImportedPageMixin) and not model._meta.proxy
+    ]
+
+
+def is_indexed(model, field):
+    if field.db_index or field.unique:
+        return True
+    return any(index.fields[:1] == [field.name] for index in model._meta.indexes)
+
+
+@register(Tags.models)
+def check_imported_page_fields(app_configs, **kwargs):
+    """Warn when a page model using WPImportedPageMixin has overridden the
+    fields pages are looked up by without an index."""
+    errors = []
+    for model in get_imported_page_models():
+        if app_configs is not None and model._meta.app_config not in app_configs:
+            continue
+        for name in INDEXED_FIELDS:
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                indexed = False
+            else:
+                indexed = is_indexed(model, field)
+            if not indexed:
+                errors.append(
+                    Warning(
+                        f"{model._meta.label}.{name} isn't indexed, looking up "
+                        "pages during an import will be slow.",
+                        hint="Keep the field as defined by WPImportedPageMixin.",
+                        obj=model,
+                        id="wagtail_wordpress_import.W001",
+                    )
+                )
+    return errors
+
+
+@register(Tags.database)
+def check_imported_page_indexes(app_configs, databases=None, **kwargs):
+    """Warn when the table of a page model using WPImportedPageMixin exists
+    without the indexes of its lookup fields, e.g. when the migration adding
+    them hasn't been made or applied."""
+    errors = []
+    for alias in databases or []:
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            tables = set(connection.introspection.table_names(cursor))
+            for model in get_imported_page_models():
+                if app_configs is not None and (
+                    model._meta.app_config not in app_configs
+                ):
+                    continue
+                if (
+                    model._meta.db_table not in tables
+                    or not router.allow_migrate_model(alias, model)
+                ):
+                    continue
+
+                indexed_columns = {
+                    constraint["columns"][0]
+                    for constraint in connection.introspection.get_constraints(
+                        cursor, model._meta.db_table
+                    ).values()
+                    if (constraint["index"] or constraint["unique"])
+                    and constraint["columns"]
+                }
+                missing = []
+                for name in INDEXED_FIELDS:
+                    try:
+                        column = model._meta.get_field(name).column
+                    except FieldDoesNotExist:
+                        continue  # reported by check_imported_page_fields
+                    if column not in indexed_columns:
+                        missing.append(name)
+                if missing:
+                    errors.append(
+                        Warning(
+                            f"The {model._meta.db_table} table in the {alias} "
+                            f"database has no index on {', '.join(missing)}.",
+                            hint=(
+                                "Run makemigrations and migrate, and add "
+                                "wagtail_wordpress_import.operations.PopulateWPLinkHash "
+                                "to the migration adding wp_link_hash."
+                            ),
+                            obj=model,
+                            id="wagtail_wordpress_import.W002",
+                        )
+                    )
+    return errors
@@ -1,4 +1,5 @@
 from collections import defaultdict
+from itertools import islice
 
 
 def clean_node_name(node_name):
@@ -50,6 +51,48 @@ def node_to_dict(node):
     return obj
 
 
+def get_element_name(element):
+    """
+    Return the tag name of an lxml element using the prefix from the XML file,
+    e.g. `wp:post_id` rather than `{http://wordpress.org/export/1.2/}post_id`
+    so the names match those returned by node_to_dict.
+    """
+    localname = element.tag.rpartition("}")[2]
+    if element.prefix:
+        return f"{element.prefix}:{localname}"
+    return localname
+
+
+def get_element_value(element):
+    child_elements = [child for child in element if isinstance(child.tag, str)]
+    if child_elements:
+        return get_element_name(element), element_to_dict(element)
+    # Only comments or processing instructions are left, like pulldom
+    # their own text is dropped but the text following them is kept
+    value = (element.text or "") + "".join(child.tail or "" for child in element)
+    if not value:
+        return get_element_name(element), None
+    return get_element_name(element), coerce_node_value(value)
+
+
+def element_to_dict(element):
+    """
+    The lxml equivalent of node_to_dict, it returns the same dict
+    for an element parsed with lxml.etree as node_to_dict does for a
+    pulldom node.
+    """
+    obj = defaultdict(list)
+    for child in element:
+        if not isinstance(child.tag, str):
+            continue  # Comments and processing instructions
+        name, value = get_element_value(child)
+        obj[clean_node_name(name)].append(value)
+    obj = {key: value[0] if len(value) == 1 else value for key, value in obj.items()}
+    if obj == {"nil": True}:
+        return None
+    return obj
+
+
 def snakecase_key(key):
     """
     Convert the key to snake_case by replacing ':' with '_'
@@ -75,3 +118,36 @@ def get_attr_as_list(node, key):
         return []
     except TypeError:
         return []
+
+
+def iter_chunks(iterable, size, counts=None):
+    """Yield lists of up to `size` items from the iterable.
+
+    If `counts` is given only the items it returns True for count toward the
+    size, the other items are added to the list being built.
+    """
+    iterator = iter(iterable)
+    if counts is None:
+        while True:
+            chunk = list(islice(iterator, size))
+            if not chunk:
+                return
+            yield chunk
+
+    chunk = []
+    counted = 0
+    for item in iterator:
+        chunk.append(item)
+        if counts(item):
+            counted += 1
+            if counted >= size:
+                yield chunk
+                chunk = []
+                counted = 0
+    if chunk:
+        yield chunk
+
+
+def get_qualified_name(obj):
+    """Return the dotted path of a function or class, e.g. for a digest."""
+    return f"{obj.__module__}.{obj.__qualname__}"
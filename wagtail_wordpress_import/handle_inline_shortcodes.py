@@ -1,4 +1,10 @@
 import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from wagtail_wordpress_import.shortcodes import get_inline_shortcode_tokenizer
 
 
 class InlineShortcodeHandler:
@@ -51,3 +57,56 @@ class InlineShortcodeHandler:
         attrs = string.split(" ")
         attrs = [attr.split("=") for attr in attrs]
         return {attr[0]: attr[1].replace('"', "") for attr in attrs}
+
+
+def conf_inline_shortcode_handlers():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_INLINE_SHORTCODE_HANDLERS", [])
+
+
+class InlineShortcodeScanner:
+    """
+    Find which of the configured inline shortcode handlers have a shortcode in
+    the html with a single scan, so construct_html_tag is only called for them
+    rather than every handler scanning every rich text block.
+
+    A handler without a shortcode_name is always called.
+    """
+
+    def __init__(self, handlers):
+        self.handlers = handlers
+        names = tuple(
+            dict.fromkeys(
+                handler.shortcode_name
+                for handler in handlers
+                if getattr(handler, "shortcode_name", None)
+            )
+        )
+        self.tokenizer = get_inline_shortcode_tokenizer(names) if names else None
+
+    def get_handlers(self, html):
+        found = set()
+        if self.tokenizer and "[" in html:
+            found = {match.group("name") for match in self.tokenizer.finditer(html)}
+        return [
+            handler
+            for handler in self.handlers
+            if getattr(handler, "shortcode_name", None) in found
+            or not getattr(handler, "shortcode_name", None)
+        ]
+
+    def construct_html_tags(self, html):
+        for handler in self.get_handlers(html):
+            html = handler.construct_html_tag(html)
+        return html
+
+
+def get_inline_shortcode_scanner():
+    """Return the InlineShortcodeScanner for the handlers in the
+    WAGTAIL_WORDPRESS_IMPORTER_INLINE_SHORTCODE_HANDLERS setting, it's only
+    built again when the setting changes."""
+    return build_inline_shortcode_scanner(tuple(conf_inline_shortcode_handlers()))
+
+
+@lru_cache(maxsize=8)
+def build_inline_shortcode_scanner(handler_paths):
+    return InlineShortcodeScanner([import_string(path) for path in handler_paths])
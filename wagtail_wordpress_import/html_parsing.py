@@ -0,0 +1,39 @@
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+
+def html_parser():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_HTML_PARSER", None)
+
+
+def parse_html(html):
+    """Parse the body content of an item to a BeautifulSoup tree for the
+    block builder, with lxml unless the HTML parser setting is set."""
+    return BeautifulSoup(html, html_parser() or "lxml")
+
+
+def parse_html_fragment(html):
+    """Parse a piece of HTML that will be converted back to a string, with
+    html.parser unless the HTML parser setting is set. Use fragment_to_html
+    to convert the tree back to a string."""
+    return BeautifulSoup(html, html_parser() or "html.parser")
+
+
+def get_body(soup):
+    """Return the <body> tag if the parser added one, or the whole tree."""
+    return soup.body or soup
+
+
+def fragment_to_html(soup):
+    """
+    Return the HTML for a tree from parse_html_fragment.
+
+    lxml and html5lib wrap a fragment in <html>, <head> and <body> tags, only
+    the contents of the <head> and <body> tags are returned. The <head> tag
+    holds tags such as <style> or <meta> that were at the start of the fragment.
+    """
+    if soup.html is None or soup.builder.NAME == "html.parser":
+        return str(soup)
+    return "".join(
+        tag.decode_contents() for tag in (soup.head, soup.body) if tag is not None
+    )
@@ -0,0 +1,66 @@
+from wagtail_wordpress_import.importers.wordpress_defaults import (
+    category_name_min_length,
+)
+
+
+def clean_category_names(names):
+    """Return the names as strings, without the names that are too short."""
+    return [
+        str(name)
+        for name in names or []
+        if name and len(str(name)) > category_name_min_length()
+    ]
+
+
+class CategoryIndex:
+    """
+    An in memory map of the names of the categories to the category instances,
+    so the categories of a page are found without a query for each one.
+
+    Names that aren't in the map are collected with add_names() and created
+    together, with one query to create them and one to fetch them, by
+    create_pending().
+    """
+
+    def __init__(self, category_model):
+        self.category_model = category_model
+        self.categories = {}
+        self.pending = {}  # a dict rather than a set, to keep the order
+
+    @classmethod
+    def load(cls, category_model):
+        """Load all the existing categories with one query."""
+        index = cls(category_model)
+        for category in category_model.objects.order_by("pk"):
+            index.categories.setdefault(category.name, category)
+        return index
+
+    def add_names(self, names):
+        """Create the categories for the names that don't exist yet on the
+        next call to create_pending()."""
+        for name in clean_category_names(names):
+            if name not in self.categories:
+                self.pending[name] = None
+
+    def create_pending(self):
+        if not self.pending:
+            return
+        names = list(self.pending)
+        self.pending = {}
+        # a category created since the index was loaded is ignored by
+        # bulk_create and fetched below with the new ones
+        self.category_model.objects.bulk_create(
+            [self.category_model(name=name) for name in names],
+            ignore_conflicts=True,
+        )
+        for category in self.category_model.objects.filter(name__in=names).order_by(
+            "pk"
+        ):
+            self.categories.setdefault(category.name, category)
+
+    def get_categories(self, names):
+        """Return the categories for the names, creating any that don't exist."""
+        names = clean_category_names(names)
+        self.add_names(names)
+        self.create_pending()
+        return [self.categories[name] for name in names]
@@ -0,0 +1,155 @@
+import json
+import os
+
+from django.conf import settings
+
+# the Logger counts saved in a checkpoint
+LOGGER_COUNTS = ["processed", "imported", "skipped", "unchanged", "bytes_processed"]
+
+
+def checkpoint_every():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_CHECKPOINT_EVERY", 0)
+
+
+class ImportCheckpoint:
+    """
+    The state of an import after the tags read from the XML file up to
+    position have been imported, so a failed import can be resumed from there.
+
+    The checkpoint is saved as a JSON file alongside the XML file. It's only
+    valid for the XML file size and modification time, and the import options
+    selecting the items, it was saved with.
+    """
+
+    version = 1
+
+    def __init__(
+        self,
+        xml_file_path,
+        *,
+        size,
+        mtime,
+        options,
+        position,
+        imported_page_ids,
+        pages_with_unresolved_links,
+        items_cache,
+        tags_cache,
+        logger_counts,
+    ):
+        self.xml_file_path = xml_file_path
+        self.size = size
+        self.mtime = mtime
+        self.options = options
+        self.position = position
+        self.imported_page_ids = imported_page_ids
+        self.pages_with_unresolved_links = pages_with_unresolved_links
+        self.items_cache = items_cache
+        self.tags_cache = tags_cache
+        self.logger_counts = logger_counts
+
+    @staticmethod
+    def get_checkpoint_path(xml_file_path):
+        return f"{xml_file_path}.checkpoint.json"
+
+    @staticmethod
+    def get_cached_items(cache, hooks):
+        """Return the items of each hook cached in memory. Caches stored in a
+        database are committed instead, and are still there when resuming."""
+        cache.flush()
+        return {
+            hook: list(getattr(cache, hook))
+            for hook in hooks
+            if not getattr(cache, hook).persistent
+        }
+
+    @classmethod
+    def from_importer(cls, importer, options, position):
+        stat = os.stat(importer.xml_file)
+        return cls(
+            importer.xml_file,
+            size=stat.st_size,
+            mtime=stat.st_mtime_ns,
+            options=options,
+            position=position,
+            imported_page_ids=importer.imported_page_ids,
+            pages_with_unresolved_links=importer.pages_with_unresolved_links,
+            items_cache=cls.get_cached_items(
+                importer.items_cache,
+                getattr(settings, "WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE", {}),
+            ),
+            tags_cache=cls.get_cached_items(
+                importer.tags_cache,
+                getattr(settings, "WORDPRESS_IMPORT_HOOKS_TAGS_TO_CACHE", {}),
+            ),
+            logger_counts={
+                **{name: getattr(importer.logger, name) for name in LOGGER_COUNTS},
+                "results": dict(importer.logger.results),
+            },
+        )
+
+    @classmethod
+    def load(cls, xml_file_path, options):
+        """Return the saved checkpoint or None if it doesn't exist, is stale
+        or was saved with different options."""
+        try:
+            with open(cls.get_checkpoint_path(xml_file_path)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if data.pop("version", None) != cls.version:
+            return None
+
+        checkpoint = cls(xml_file_path, **data)
+        if not checkpoint.is_valid() or checkpoint.options != options:
+            return None
+        return checkpoint
+
+    def save(self):
+        """Write the checkpoint to a temporary file and rename it, so a failure
+        while it's written leaves the previous checkpoint."""
+        path = self.get_checkpoint_path(self.xml_file_path)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(
+                {
+                    "version": self.version,
+                    "size": self.size,
+                    "mtime": self.mtime,
+                    "options": self.options,
+                    "position": self.position,
+                    "imported_page_ids": self.imported_page_ids,
+                    "pages_with_unresolved_links": self.pages_with_unresolved_links,
+                    "items_cache": self.items_cache,
+                    "tags_cache": self.tags_cache,
+                    "logger_counts": self.logger_counts,
+                },
+                f,
+            )
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def delete(cls, xml_file_path):
+        try:
+            os.remove(cls.get_checkpoint_path(xml_file_path))
+        except FileNotFoundError:
+            pass
+
+    def is_valid(self):
+        try:
+            stat = os.stat(self.xml_file_path)
+        except OSError:
+            return False
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime
+
+    def restore(self, importer):
+        """Restore the state of the import to the importer and its logger."""
+        importer.imported_page_ids = list(self.imported_page_ids)
+        importer.pages_with_unresolved_links = list(self.pages_with_unresolved_links)
+        for hook, items in self.items_cache.items():
+            importer.items_cache.set_cache(hook, items)
+        for hook, items in self.tags_cache.items():
+            importer.tags_cache.set_cache(hook, items)
+        for name in LOGGER_COUNTS:
+            setattr(importer.logger, name, self.logger_counts[name])
+        importer.logger.results.update(self.logger_counts["results"])
@@ -1,67 +1,305 @@
 import copy
+import hashlib
+import json
+import sqlite3
 
 from django.conf import settings
 
+_connections = {}
 
-class ItemsCache:
-    """Store the WordPress XML item tags.
-    These are item tags that don't represent a page in the XML file.
-    They are temporarily stored and used at the end of the import process.
+
+def cache_db():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_CACHE_DB", None)
+
+
+def get_item_hash(item):
+    return hashlib.sha1(json.dumps(item, sort_keys=True, default=str).encode()).digest()
+
+
+class CachedItems(list):
     """
+    The list of dicts cached for an import hook, without duplicates.
 
-    def __init__(self):
-        """For each value in settings.WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE
-        create the class attribute.
+    Items are added with add(), which checks for a duplicate with a hash of
+    the item rather than comparing it with every item in the list, and can be
+    looked up by the value of one of their keys with get().
+    """
+
+    # the items are kept in memory, so they're saved in a checkpoint
+    persistent = False
+
+    def __init__(self, items=(), key=None):
+        """
+        key:
+            The key looked up by get() when it isn't given one.
         """
+        super().__init__()
+        self.key = key
+        self.hashes = set()
+        self.indexes = {}
+        for item in items:
+            self.add(item)
 
-        for hook in getattr(
-            settings, "WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE", {}
-        ).keys():
-            setattr(self, hook, [])
+    def add(self, item):
+        """Add the item if it isn't already in the list, return whether it was added."""
+        item_hash = get_item_hash(item)
+        if item_hash in self.hashes:
+            return False
+        self.hashes.add(item_hash)
+        self.append(item)
+        for key, index in self.indexes.items():
+            index.setdefault(str(item.get(key)), item)
+        return True
 
-    def add_item_to_cache(self, key, item):
-        """Add an item dict to the list of cached items if not already added.
+    def get(self, value, default=None, key=None):
+        """
+        Return the first item with the value for the key, e.g.
+        items_cache.get(thumbnail_id) for the attachment with that wp:post_id.
+        Values are compared as strings, so 43120 and "43120" are the same.
 
-        key:
-            The value from <wp:post_type>...</wp:post_type> of an item tag in the XML file.
-        item:
-            The complete item tag in the XML file as a dict.
+        An index of the items by the key is built the first time it's used.
         """
+        key = key or self.key
+        if key is None:
+            raise ValueError("A key is needed to get an item from this cache")
+        if key not in self.indexes:
+            index = self.indexes[key] = {}
+            for item in self:
+                index.setdefault(str(item.get(key)), item)
+        return self.indexes[key].get(str(value), default)
 
-        cache = getattr(self, key)
-        item = copy.deepcopy(item)
-        if "wp:postmeta" in item:  # wp:postmeta is not needed in the cache
-            del item["wp:postmeta"]
-        if item not in cache:
-            cache.append(item)
+    def clear(self):
+        super().clear()
+        self.hashes = set()
+        self.indexes = {}
 
+    def flush(self):
+        pass
 
-class TagsCache:
-    """Store the WordPress XML top level tags.
-    These are tags that don't represent a page in the XML file.
-    They are temporarily stored and used at the end of the import process.
+
+def get_cache_connection(path):
+    """Return the connection to the SQLite database at the path, creating
+    the table for the cached items if it doesn't exist."""
+    if path not in _connections:
+        connection = sqlite3.connect(path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cached_items (
+                id INTEGER PRIMARY KEY,
+                cache TEXT NOT NULL,
+                name TEXT NOT NULL,
+                hash BLOB NOT NULL,
+                key_value TEXT,
+                data TEXT NOT NULL,
+                UNIQUE (cache, name, hash)
+            )
+            """
+        )
+        connection.execute(
+            """
+            CREATE INDEX IF NOT EXISTS cached_items_key
+            ON cached_items (cache, name, key_value)
+            """
+        )
+        connection.commit()
+        _connections[path] = connection
+    return _connections[path]
+
+
+def close_cache_connections():
+    while _connections:
+        _connections.popitem()[1].close()
+
+
+class SqliteCachedItems:
     """
+    The items cached for an import hook, stored in a SQLite database rather
+    than in memory. It has the same interface as CachedItems, other than not
+    being a list: the items can be iterated over, counted, added with add()
+    and looked up with get().
 
-    def __init__(self):
-        """For each value in settings.WORDPRESS_IMPORT_HOOKS_TAGS_TO_CACHE
-        create the class attribute.
+    cache:
+        The name of the cache, "items" or "tags".
+    name:
+        The name of the hook, the post type of the items or the tag name.
+
+    The items are indexed by their name and the value of the key, e.g. the
+    post type and wp:post_id of the items. Iterating over the items reads
+    them from the database as they're needed, so every item is never in
+    memory at once. Each item returned is a new dict.
+
+    The database is kept after the import so the items cached before a
+    checkpoint are there when the import is resumed.
+    """
+
+    persistent = True
+    # the number of items added between each commit
+    commit_every = 1000
+
+    def __init__(self, path, cache, name, key=None):
+        self.connection = get_cache_connection(path)
+        self.cache = cache
+        self.name = name
+        self.key = key
+        self.uncommitted = 0
+
+    def add(self, item):
+        """Add the item if it isn't already cached, return whether it was added."""
+        key_value = None
+        if self.key is not None and item.get(self.key) is not None:
+            key_value = str(item.get(self.key))
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO cached_items (cache, name, hash, key_value, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                self.cache,
+                self.name,
+                get_item_hash(item),
+                key_value,
+                json.dumps(item, default=str),
+            ),
+        )
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_every:
+            self.flush()
+        return cursor.rowcount == 1
+
+    def get(self, value, default=None, key=None):
+        """
+        Return the first item with the value for the key, values are compared
+        as strings. Looking up the key of the cache uses the index, any other
+        key is found by reading through the items.
         """
+        key = key or self.key
+        if key is None:
+            raise ValueError("A key is needed to get an item from this cache")
+        if key != self.key:
+            for item in self:
+                if str(item.get(key)) == str(value):
+                    return item
+            return default
+
+        row = self.connection.execute(
+            "SELECT data FROM cached_items WHERE cache = ? AND name = ? AND key_value = ? "
+            "ORDER BY id LIMIT 1",
+            (self.cache, self.name, str(value)),
+        ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def __iter__(self):
+        for (data,) in self.connection.execute(
+            "SELECT data FROM cached_items WHERE cache = ? AND name = ? ORDER BY id",
+            (self.cache, self.name),
+        ):
+            yield json.loads(data)
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM cached_items WHERE cache = ? AND name = ?",
+            (self.cache, self.name),
+        ).fetchone()[0]
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def clear(self):
+        self.connection.execute(
+            "DELETE FROM cached_items WHERE cache = ? AND name = ?",
+            (self.cache, self.name),
+        )
+        self.flush()
+
+    def flush(self):
+        """Commit the items added, so they're kept if the import fails."""
+        self.connection.commit()
+        self.uncommitted = 0
+
 
-        for hook in getattr(settings, "WORDPRESS_IMPORT_HOOKS_TAGS_TO_CACHE", {}):
-            setattr(self, hook, [])
+class BaseCache:
+    # the name of the cache in the SQLite database
+    name = None
+    # the key CachedItems.get() looks up by default
+    default_key = None
+
+    @staticmethod
+    def get_hooks_config():
+        raise NotImplementedError
+
+    def __init__(self):
+        """For each value in the hooks config create the class attribute."""
+        for hook in self.get_hooks_config():
+            setattr(self, hook, self.create_cache(hook))
+
+    def create_cache(self, hook):
+        """Return a CachedItems, or a SqliteCachedItems if the
+        WAGTAIL_WORDPRESS_IMPORTER_CACHE_DB setting is set."""
+        key = self.get_hooks_config()[hook].get("KEY", self.default_key)
+        if cache_db():
+            return SqliteCachedItems(cache_db(), self.name, hook, key)
+        return CachedItems(key=key)
+
+    def set_cache(self, key, items):
+        """Replace the cached items for the hook, e.g. with items saved in a checkpoint."""
+        cache = self.create_cache(key)
+        cache.clear()
+        for item in items:
+            cache.add(item)
+        cache.flush()
+        setattr(self, key, cache)
+
+    def clear(self):
+        for hook in self.get_hooks_config():
+            getattr(self, hook).clear()
+
+    def flush(self):
+        for hook in self.get_hooks_config():
+            getattr(self, hook).flush()
 
     def add_item_to_cache(self, key, item):
-        """Add an item dict to the list of cached items if not already added
+        """Add an item dict to the list of cached items if not already added.
 
         key:
-            The XML tag name of a tag in the XML file.
+            The name of the hook in the hooks config.
         item:
             The complete tag in the XML file as a dict.
         """
+        # a deep copy, so changing the item after it's cached doesn't change
+        # the cache, without wp:postmeta which is not needed in the cache
+        item = copy.deepcopy(
+            {name: value for name, value in item.items() if name != "wp:postmeta"}
+        )
+        getattr(self, key).add(item)
+
+
+class ItemsCache(BaseCache):
+    """Store the WordPress XML item tags.
+    These are item tags that don't represent a page in the XML file.
+    They are temporarily stored and used at the end of the import process.
+
+    Each cache can be looked up by wp:post_id, e.g. cache.get(thumbnail_id).
+    """
+
+    name = "items"
+    default_key = "wp:post_id"
+
+    @staticmethod
+    def get_hooks_config():
+        return getattr(settings, "WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE", {})
+
+
+class TagsCache(BaseCache):
+    """Store the WordPress XML top level tags.
+    These are tags that don't represent a page in the XML file.
+    They are temporarily stored and used at the end of the import process.
+
+    A cache can be looked up by the tag in the KEY of its hook config, e.g.
+    "wp:author_login", or with cache.get(value, key=tag).
+    """
+
+    name = "tags"
 
-        cache = getattr(self, key)
-        item = copy.deepcopy(item)
-        if "wp:postmeta" in item:  # wp:postmeta is not needed in the cache
-            del item["wp:postmeta"]
-        if item not in cache:
-            cache.append(item)
+    @staticmethod
+    def get_hooks_config():
+        return getattr(settings, "WORDPRESS_IMPORT_HOOKS_TAGS_TO_CACHE", {})
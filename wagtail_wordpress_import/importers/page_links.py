@@ -0,0 +1,125 @@
+import hashlib
+from urllib.parse import parse_qs, urlsplit
+
+# the query string parameters of WordPress permalinks using the post id
+POST_ID_QUERY_PARAMS = ["p", "page_id"]
+
+
+def normalise_host(host):
+    host = host.lower().split(":")[0]
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+def normalise_path(path):
+    path = path.rstrip("/")
+    return path or "/"
+
+
+def split_link(link):
+    """Return a (host, path, post_id) tuple for a link.
+
+    The scheme, port, a leading www., any trailing slash and the fragment are
+    ignored. host is None for a relative link and post_id is None unless the
+    link is a ?p=ID or ?page_id=ID permalink.
+
+    Returns None if the link isn't a http(s) or relative link.
+    """
+    if not link:
+        return None
+
+    try:
+        parts = urlsplit(link.strip())
+    except ValueError:
+        return None
+
+    if parts.scheme not in ("", "http", "https"):
+        return None  # e.g. mailto: or tel:
+    if not parts.netloc and not parts.path and not parts.query:
+        return None  # e.g. #an-anchor
+
+    post_id = None
+    query = parse_qs(parts.query)
+    for param in POST_ID_QUERY_PARAMS:
+        value = query.get(param, [""])[0]
+        if value.isdigit():
+            post_id = int(value)
+            break
+
+    return (
+        normalise_host(parts.netloc) if parts.netloc else None,
+        normalise_path(parts.path),
+        post_id,
+    )
+
+
+def get_link_path_hash(link):
+    """Return the sha1 hex digest of the normalised path of the link, or None
+    if it isn't a http(s) or relative link. Links to the same page on any
+    host, with or without a trailing slash, have the same hash.
+    """
+    parts = split_link(link)
+    if parts is None:
+        return None
+    return hashlib.sha1(parts[1].encode("utf-8")).hexdigest()
+
+
+class PageLinkIndex:
+    """An in memory map of the wp_link and wp_post_id of pages to the page id,
+    so the links in rich text can be resolved without a query for each link.
+
+    A link on a host that isn't the host of any page is an external link.
+    """
+
+    def __init__(self):
+        self.hosts = set()
+        self.paths = {}
+        self.post_ids = {}
+
+    @classmethod
+    def build(cls, page_model_class):
+        """Build the index for all the pages of the page model with one query."""
+        index = cls()
+        for page_id, wp_link, wp_post_id in page_model_class.objects.values_list(
+            "id", "wp_link", "wp_post_id"
+        ):
+            index.add(page_id, wp_link, wp_post_id)
+        return index
+
+    def add(self, page_id, wp_link, wp_post_id=None):
+        if wp_post_id is not None:
+            self.post_ids[wp_post_id] = page_id
+
+        parts = split_link(wp_link)
+        if parts is None:
+            return
+        host, path, post_id = parts
+        if host:
+            self.hosts.add(host)
+        self.paths[path] = page_id
+
+    def add_host(self, url):
+        """Treat links to the host of the url as internal links, e.g. the
+        WordPress site before any of its pages are imported."""
+        parts = split_link(url)
+        if parts and parts[0]:
+            self.hosts.add(parts[0])
+
+    def is_internal(self, link):
+        """Return True if the link is relative or on the host of a page."""
+        parts = split_link(link)
+        return parts is not None and (parts[0] is None or parts[0] in self.hosts)
+
+    def resolve(self, link):
+        """Return the id of the page for the link, or None if it can't be found."""
+        parts = split_link(link)
+        if parts is None:
+            return None
+
+        host, path, post_id = parts
+        if host and host not in self.hosts:
+            return None
+        if post_id is not None:
+            return self.post_ids.get(post_id)
+        return self.paths.get(path)
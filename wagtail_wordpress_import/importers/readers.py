@@ -0,0 +1,212 @@
+import io
+import os
+from itertools import islice
+from xml.dom import pulldom
+
+from django.utils.module_loading import import_string
+from lxml import etree
+
+from wagtail_wordpress_import.functions import (
+    element_to_dict,
+    get_element_name,
+    node_to_dict,
+)
+from wagtail_wordpress_import.importers.wordpress_defaults import item_reader
+from wagtail_wordpress_import.importers.xml_index import XmlIndex, count_items
+
+ITEM_READERS = {
+    "pulldom": "wagtail_wordpress_import.importers.readers.PulldomItemReader",
+    "iterparse": "wagtail_wordpress_import.importers.readers.IterparseItemReader",
+}
+
+
+class BaseItemReader:
+    """Read the XML file and yield a (tag name, dict) tuple for each
+    <item> tag and each tag listed in tags_to_cache.
+
+    Tags are yielded in the order they appear in the XML file. Tags nested
+    inside a tag that has already been yielded are not yielded again.
+    The dict for a tag is the same shape as the one returned by node_to_dict.
+    """
+
+    def __init__(self, xml_file, tags_to_cache=None):
+        """
+        xml_file:
+            A path to the XML file or a file like object.
+        tags_to_cache:
+            An iterable of XML tag names to yield as well as <item> tags.
+        """
+        self.xml_file = xml_file
+        self.tag_names = {"item", *(tags_to_cache or [])}
+
+    def __iter__(self):
+        raise NotImplementedError("Subclasses of BaseItemReader must define __iter__")
+
+    def count_items(self):
+        """Return the number of <item> tags that will be read, or None if
+        the xml file is a file like object that can't be read twice."""
+        if isinstance(self.xml_file, (str, os.PathLike)):
+            return count_items(self.xml_file)
+        return None
+
+    def iter_from(self, position):
+        """Iterate over the tags after the first `position` tags."""
+        return islice(self, position, None)
+
+
+class PulldomItemReader(BaseItemReader):
+    """Read the XML file with xml.dom.pulldom, expanding each tag of interest
+    to a minidom node.
+    """
+
+    def __iter__(self):
+        xml_doc = pulldom.parse(self.xml_file)
+
+        for event, node in xml_doc:
+            if event == pulldom.START_ELEMENT and node.tagName in self.tag_names:
+                xml_doc.expandNode(node)
+                yield node.tagName, node_to_dict(node)
+
+
+class EncodedTextReader:
+    """lxml only reads bytes from file like objects, this encodes
+    the output of a text stream such as StringIO as it's read.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def read(self, size=-1):
+        return self.stream.read(size).encode("utf-8")
+
+
+class IterparseItemReader(BaseItemReader):
+    """Read the XML file with lxml.etree.iterparse.
+
+    Each tag of interest is cleared, along with the siblings before it,
+    once it has been yielded so the memory used stays flat however large
+    the XML file is.
+    """
+
+    def __iter__(self):
+        xml_file = self.xml_file
+        if isinstance(xml_file, io.TextIOBase):
+            xml_file = EncodedTextReader(xml_file)
+
+        # entities aren't resolved, a DOCTYPE can't pull in local files or urls
+        yield from iter_captured_tags(
+            etree.iterparse(
+                xml_file,
+                events=("start", "end"),
+                huge_tree=True,
+                resolve_entities=False,
+                no_network=True,
+            ),
+            self.tag_names,
+        )
+
+
+class IndexedItemReader(BaseItemReader):
+    """Read only the selected <item> tags by seeking to them using the
+    XmlIndex for the XML file, the index is built if it doesn't exist or is stale.
+
+    Tags to cache are read from the part of the XML file before the first
+    <item> tag, which is where WordPress exports them. Items with a post type
+    in item_types_to_cache are always read, whatever post_ids and post_types are.
+    """
+
+    def __init__(
+        self,
+        xml_file,
+        tags_to_cache=None,
+        post_ids=None,
+        post_types=None,
+        item_types_to_cache=None,
+    ):
+        super().__init__(xml_file, tags_to_cache)
+        self.post_ids = post_ids
+        self.post_types = post_types
+        self.item_types_to_cache = item_types_to_cache
+        self.index = None
+
+    def get_index(self):
+        if self.index is None:
+            self.index = XmlIndex.get_or_build(self.xml_file)
+        return self.index
+
+    def get_entries(self):
+        return self.get_index().filter(
+            post_ids=self.post_ids,
+            post_types=self.post_types,
+            always_types=self.item_types_to_cache,
+        )
+
+    def count_items(self):
+        return len(self.get_entries())
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def iter_from(self, position):
+        """Iterate over the tags after the first `position` tags, the items
+        before them are skipped without being read."""
+        index = self.get_index()
+
+        if self.tag_names != {"item"}:
+            parser = etree.XMLPullParser(
+                events=("start", "end"),
+                huge_tree=True,
+                resolve_entities=False,
+                no_network=True,
+            )
+            parser.feed(index.read_header())
+            for tag in iter_captured_tags(
+                parser.read_events(), self.tag_names - {"item"}
+            ):
+                if position:
+                    position -= 1
+                else:
+                    yield tag
+
+        for item in index.iter_items(self.get_entries()[position:]):
+            yield "item", item
+
+
+def iter_captured_tags(events, tag_names):
+    """Yield a (tag name, dict) tuple for each element in tag_names from
+    a stream of lxml (event, element) start and end events.
+
+    Each element is cleared, along with the siblings before it, once it has
+    been yielded.
+    """
+    capturing = None
+
+    for event, element in events:
+        if event == "start":
+            if capturing is None and get_element_name(element) in tag_names:
+                capturing = element
+            continue
+
+        if element is not capturing:
+            continue
+
+        yield get_element_name(element), element_to_dict(element)
+
+        capturing = None
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+def get_item_reader_class(reader=None):
+    """Return the item reader class.
+
+    reader:
+        A key of ITEM_READERS or a dotted path to a BaseItemReader subclass.
+        If it's not provided the WAGTAIL_WORDPRESS_IMPORT_ITEM_READER setting
+        is used.
+    """
+    reader = reader or item_reader()
+    return import_string(ITEM_READERS.get(reader, reader))
@@ -1,7 +1,14 @@
 import copy
+import hashlib
+import html
 import json
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
+from urllib.parse import urlsplit
 
+import django
 from wagtail import VERSION as WAGTAIL_VERSION
 
 try:
@@ -9,11 +16,10 @@ try:
 except ImportError:
     from cached_property import cached_property
 
-from xml.dom import pulldom
-
-from bs4 import BeautifulSoup
 from django.apps import apps
 from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
 from django.utils.module_loading import import_string
 from django.utils.text import slugify
 from django.utils.timezone import make_aware
@@ -23,24 +29,59 @@ if WAGTAIL_VERSION >= (3, 0):
 else:
     from wagtail.core.models import Page
 
-from wagtail_wordpress_import.block_builder import BlockBuilder
+from wagtail_wordpress_import.block_builder import (
+    REGISTERED_BLOCK_BUILDERS,
+    BlockBuilder,
+    conf_promote_child_tags,
+)
+from wagtail_wordpress_import.block_builder_defaults import (
+    A_HREF_PATTERN,
+    conf_fallback_block,
+    conf_html_tags_to_blocks,
+    download_media,
+    get_media_urls,
+)
 from wagtail_wordpress_import.functions import (
     get_attr_as_list,
-    node_to_dict,
+    get_qualified_name,
+    iter_chunks,
     snakecase_key,
 )
+from wagtail_wordpress_import.html_parsing import (
+    fragment_to_html,
+    html_parser,
+    parse_html_fragment,
+)
+from wagtail_wordpress_import.importers.categories import CategoryIndex
+from wagtail_wordpress_import.importers.checkpoint import ImportCheckpoint
 from wagtail_wordpress_import.importers.import_hooks import ItemsCache, TagsCache
+from wagtail_wordpress_import.importers.page_links import PageLinkIndex
+from wagtail_wordpress_import.importers.readers import (
+    IndexedItemReader,
+    get_item_reader_class,
+)
 from wagtail_wordpress_import.importers.wordpress_defaults import (
-    category_name_min_length,
     category_plugin_enabled,
     debug_enabled,
     get_category_model,
     yoast_plugin_config,
     yoast_plugin_enabled,
 )
+from wagtail_wordpress_import.media import (
+    MediaFetcher,
+    MediaIndex,
+    activate_media_fetcher,
+    activate_media_index,
+    get_media_fetcher,
+    media_fetch_workers,
+    uploads_url_path,
+)
+from wagtail_wordpress_import.prefilters.handle_shortcodes import get_shortcode_handlers
 from wagtail_wordpress_import.prefilters.linebreaks_wp_filter import (
     filter_linebreaks_wp,
 )
+from wagtail_wordpress_import.prefilters.pipeline import run_prefilters
+from wagtail_wordpress_import.timings import record_timings, time_stage
 
 DEFAULT_PREFILTERS = [
     {
@@ -59,16 +100,74 @@ DEFAULT_PREFILTERS = [
 
 
 class WordpressImporter:
-    def __init__(self, xml_file_path):
+    def __init__(self, xml_file_path, item_reader=None):
         self.xml_file = xml_file_path
+        self.item_reader_class = get_item_reader_class(item_reader)
         self.imported_page_ids = []
-        self.page_link_errors = []
         self.items_cache = ItemsCache()
         self.tags_cache = TagsCache()
 
     def run(self, *args, **kwargs):
         self.logger = kwargs["logger"]
-        xml_doc = pulldom.parse(self.xml_file)
+        tags_to_cache = getattr(settings, "WORDPRESS_IMPORT_HOOKS_TAGS_TO_CACHE", {})
+        tags_to_read = list(tags_to_cache)
+
+        self.categories = None
+        if category_plugin_enabled() and get_category_model():
+            self.categories = CategoryIndex.load(import_string(get_category_model()))
+            # the categories declared at the top of the XML file are created
+            # along with the first batch of items
+            tags_to_read.append("wp:category")
+
+        if kwargs.get("use_index") or kwargs.get("post_ids"):
+            # seek straight to the selected items using the XML index
+            items = IndexedItemReader(
+                self.xml_file,
+                tags_to_cache=tags_to_read,
+                post_ids=kwargs.get("post_ids") or None,
+                post_types=kwargs["page_types"],
+                item_types_to_cache=getattr(
+                    settings, "WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE", {}
+                ),
+            )
+        else:
+            items = self.item_reader_class(self.xml_file, tags_to_cache=tags_to_read)
+
+        # the options selecting the items, a checkpoint is only resumed with the same options
+        checkpoint_options = {
+            "page_types": list(kwargs["page_types"]),
+            "page_statuses": list(kwargs["page_statuses"]),
+            "app_for_pages": kwargs["app_for_pages"],
+            "model_for_pages": kwargs["model_for_pages"],
+            "parent_id": kwargs["parent_id"],
+            "use_index": bool(kwargs.get("use_index") or kwargs.get("post_ids")),
+            "post_ids": list(kwargs.get("post_ids") or []),
+            "categories": self.categories is not None,
+        }
+        checkpoint_every = kwargs.get("checkpoint_every") or 0
+        position = checkpoint_position = 0
+        self.pages_with_unresolved_links = []
+
+        checkpoint = None
+        if kwargs.get("resume"):
+            checkpoint = ImportCheckpoint.load(self.xml_file, checkpoint_options)
+            if checkpoint:
+                checkpoint.restore(self)
+                position = checkpoint_position = checkpoint.position
+                print(f"Resuming the import after {position} tags")
+            else:
+                print(
+                    "There is no checkpoint to resume, the import starts from the beginning"
+                )
+        if not checkpoint:
+            # caches stored in a database keep the items of a previous import
+            self.items_cache.clear()
+            self.tags_cache.clear()
+
+        if self.logger.progress is not None:
+            self.logger.progress.start(
+                total=items.count_items(), processed=self.logger.processed
+            )
 
         try:
             self.page_model_class = apps.get_model(
@@ -89,150 +188,414 @@ class WordpressImporter:
             print(f"A page with id {kwargs['parent_id']} does not exist")
             exit()
 
-        for event, node in xml_doc:
-            """
-            Each node represents a tag in the xml.
-            `event` is true for a start element.
-            """
-
-            if event == pulldom.START_ELEMENT and node.tagName in getattr(
-                settings, "WORDPRESS_IMPORT_HOOKS_TAGS_TO_CACHE", {}
-            ):  # add top level XML tags to cache
-                xml_doc.expandNode(node)
-                item = node_to_dict(node)
-                self.tags_cache.add_item_to_cache(node.tagName, item)
-
-            if event == pulldom.START_ELEMENT and node.tagName == "item":
-                xml_doc.expandNode(node)
-                item = node_to_dict(node)
-                self.logger.processed += 1
-
-                post_type = item.get("wp:post_type")
-                if post_type in getattr(
-                    settings, "WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE", {}
-                ):  # add item level XML tags to cache
-                    self.items_cache.add_item_to_cache(post_type, item)
+        # links in the content are rewritten as pages are imported, from this
+        # index of the existing pages and the pages imported so far
+        self.page_links = PageLinkIndex.build(self.page_model_class)
+        self.page_links.add_host(
+            getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN", "")
+        )
+
+        batch_size = kwargs.get("batch_size") or 1
+        workers = kwargs.get("workers") or 1
+        # the worker processes are forked before the media fetcher starts its
+        # threads, forking a process while other threads run isn't safe
+        worker_pool = start_worker_pool(workers) if workers > 1 else nullcontext()
+
+        # the media is fetched and saved by this process, also with workers
+        media_fetcher = (
+            MediaFetcher(download_media) if media_fetch_workers() else nullcontext()
+        )
+
+        with worker_pool as executor, media_fetcher, MediaIndex.load():
+            prepared_items = self.prepare_items(
+                items.iter_from(position),
+                page_types=kwargs["page_types"],
+                page_statuses=kwargs["page_statuses"],
+                incremental=kwargs.get("incremental", False),
+                executor=executor,
+                workers=workers,
+                batch_size=batch_size,
+            )
 
-                if (
-                    item.get("wp:post_type") in kwargs["page_types"]
-                    and item.get("wp:status") in kwargs["page_statuses"]
+            # only the pages count toward the batch size, the other tags
+            # read from the XML file are saved with them
+            for batch in iter_chunks(
+                prepared_items,
+                batch_size,
+                counts=lambda prepared_item: prepared_item[2] is not None,
+            ):
+                if self.categories is not None:
+                    self.create_batch_categories(batch)
+
+                # each batch of items is saved in a single transaction
+                with transaction.atomic():
+                    self.start_batch()
+                    for tag_name, item, wordpress_item, page in batch:
+                        timings = wordpress_item.timings if wordpress_item else None
+                        with record_timings(timings):
+                            self.import_item(
+                                tag_name,
+                                item,
+                                wordpress_item,
+                                page,
+                                tags_to_cache=tags_to_cache,
+                                incremental=kwargs.get("incremental", False),
+                            )
+                        if timings is not None:
+                            self.logger.log_timings(
+                                wordpress_item.cleaned_post_id(), timings
+                            )
+                    self.end_batch()
+
+                # a checkpoint is saved after the batch has been committed
+                position += len(batch)
+                if checkpoint_every and position - checkpoint_position >= (
+                    checkpoint_every
                 ):
+                    ImportCheckpoint.from_importer(
+                        self, checkpoint_options, position
+                    ).save()
+                    checkpoint_position = position
 
-                    wordpress_item = WordpressItem(item, self.logger)
+        if checkpoint_every:
+            # if the steps below fail, resuming only runs them again
+            ImportCheckpoint.from_importer(self, checkpoint_options, position).save()
 
-                    try:
-                        page = self.page_model_class.objects.get(
-                            wp_post_id=wordpress_item.cleaned_data.get("wp_post_id")
-                        )
-                    except self.page_model_class.DoesNotExist:
-                        page = self.page_model_class()
+        self.items_cache.flush()
+        self.tags_cache.flush()
 
-                    # add categories for this page if categories plugin is enabled
-                    if category_plugin_enabled() and get_category_model():
-                        self.connect_page_categories(
-                            page, import_string(get_category_model()), item
-                        )
+        self.imported_pages = self.page_model_class.objects.filter(
+            id__in=[id for id in self.imported_page_ids]
+        ).specific()
 
-                    cleaned_data = wordpress_item.cleaned_data
+        self.connect_richtext_page_links(self.pages_with_unresolved_links)
 
-                    body = cleaned_data.get("body")
+        """Run all hooks in settings.WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE"""
+        for hook, actions in getattr(
+            settings, "WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE", {}
+        ).items():
+            import_string(actions["FUNCTION"])(
+                self.imported_pages,
+                actions["DATA_TAG"],
+                getattr(self.items_cache, hook),
+            )
 
+        """Run all hooks in settings.WORDPRESS_IMPORT_HOOKS_TAGS_TO_CACHE"""
+        for hook, actions in getattr(
+            settings, "WORDPRESS_IMPORT_HOOKS_TAGS_TO_CACHE", {}
+        ).items():
+            import_string(actions["FUNCTION"])(
+                self.imported_pages,
+                actions["DATA_TAG"],
+                getattr(self.tags_cache, hook),
+            )
+
+        if checkpoint_every or kwargs.get("resume"):
+            ImportCheckpoint.delete(self.xml_file)
+
+    def import_item(
+        self, tag_name, item, wordpress_item, page, *, tags_to_cache, incremental
+    ):
+        """
+        Each item is an <item> tag or a tag to cache in the xml as a dict.
+        """
+
+        if tag_name in tags_to_cache:  # add top level XML tags to cache
+            self.tags_cache.add_item_to_cache(tag_name, item)
+
+        if tag_name == "item":
+            self.logger.processed += 1
+            self.logger.bytes_processed += len(
+                (item.get("content:encoded") or "").encode("utf-8")
+            )
+
+            post_type = item.get("wp:post_type")
+            if post_type in getattr(
+                settings, "WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE", {}
+            ):  # add item level XML tags to cache
+                self.items_cache.add_item_to_cache(post_type, item)
+
+            if wordpress_item:
+                digest = wordpress_item.digest
+
+                if incremental and self.is_unchanged(
+                    page, digest
+                ):  # nothing has changed since the page was last imported
+                    self.logger.unchanged += 1
+                    self.logger.log_item(
+                        {
+                            "id": page.id,
+                            "title": page.title,
+                            "link": item.get("link"),
+                            "result": "unchanged",
+                            "reason": "digest matched",
+                            "datecheck": "",
+                            "slugcheck": "",
+                        }
+                    )
+                    self.imported_page_ids.append(page.id)
+                    if self.has_unresolved_links(page):
+                        # the pages they link to may have been imported since
+                        self.pages_with_unresolved_links.append(page.id)
+                    return
+
+                # add categories for this page if categories plugin is enabled
+                if self.categories is not None:
+                    with time_stage("categories"):
+                        self.connect_page_categories(page, item)
+
+                cleaned_data = dict(wordpress_item.cleaned_data)
+
+                with time_stage("update_page_links"):
+                    blocks = json.loads(cleaned_data["body"])
+                    unresolved_links = self.update_page_links(blocks)
+                    cleaned_data["body"] = body = json.dumps(blocks)
+
+                with time_stage("check_stream_field_block_types"):
                     self.check_stream_field_block_types(
                         page, body
                     )  # if the body streamfield is invalid, exit with a ValueError
 
-                    page.import_wordpress_data(cleaned_data)
+                page.import_wordpress_data(cleaned_data)
 
-                    if item.get("wp:status") == "draft":
-                        setattr(page, "live", False)
-                    else:
-                        setattr(page, "live", True)
-
-                    if page.id:
-                        page.save()
-                        self.logger.imported += 1
-                        self.logger.items.append(
-                            {
-                                "id": page.id,
-                                "title": page.title,
-                                "link": item.get("link"),
-                                "result": "updated",
-                                "reason": "existed",
-                                "datecheck": wordpress_item.date_changed,
-                                "slugcheck": wordpress_item.slug_changed,
-                            }
-                        )
-                    else:
-                        self.parent_page_obj.add_child(instance=page)
-                        page.save()
-                        self.logger.imported += 1
-                        self.logger.items.append(
-                            {
-                                "id": page.id,
-                                "title": page.title,
-                                "link": item.get("link"),
-                                "result": "created",
-                                "reason": "existed",
-                                "datecheck": wordpress_item.date_changed,
-                                "slugcheck": wordpress_item.slug_changed,
-                            }
-                        )
+                if hasattr(page, "wp_import_digest"):
+                    page.wp_import_digest = digest
 
-                    self.imported_page_ids.append(page.id)
+                if item.get("wp:status") == "draft":
+                    setattr(page, "live", False)
+                else:
+                    setattr(page, "live", True)
 
+                if page.id:
+                    with time_stage("page_save"):
+                        page.save()
+                    self.logger.imported += 1
+                    self.logger.log_item(
+                        {
+                            "id": page.id,
+                            "title": page.title,
+                            "link": item.get("link"),
+                            "result": "updated",
+                            "reason": "existed",
+                            "datecheck": wordpress_item.date_changed,
+                            "slugcheck": wordpress_item.slug_changed,
+                        }
+                    )
                 else:
-                    self.logger.skipped += 1
-                    self.logger.items.append(
+                    with time_stage("page_save"):
+                        self.add_child_page(page)
+                    self.logger.imported += 1
+                    self.logger.log_item(
                         {
-                            "id": 0,
-                            "title": "",
-                            "link": "",
-                            "result": "excluded",
-                            "reason": "not a page type or status to import",
-                            "datecheck": "",
-                            "slugcheck": "",
+                            "id": page.id,
+                            "title": page.title,
+                            "link": item.get("link"),
+                            "result": "created",
+                            "reason": "existed",
+                            "datecheck": wordpress_item.date_changed,
+                            "slugcheck": wordpress_item.slug_changed,
                         }
                     )
+
+                self.imported_page_ids.append(page.id)
+                self.page_links.add(page.id, page.wp_link, page.wp_post_id)
+                if unresolved_links:  # links to pages that may not be imported yet
+                    self.pages_with_unresolved_links.append(page.id)
+
             else:
-                self.logger.items.append(
+                self.logger.skipped += 1
+                self.logger.log_item(
                     {
                         "id": 0,
                         "title": "",
                         "link": "",
                         "result": "excluded",
-                        "reason": "not a item",
+                        "reason": "not a page type or status to import",
                         "datecheck": "",
                         "slugcheck": "",
                     }
                 )
-            self.logger.log_progress()
 
-        self.imported_pages = self.page_model_class.objects.filter(
-            id__in=[id for id in self.imported_page_ids]
-        ).specific()
-
-        self.connect_richtext_page_links(self.imported_pages)
+    def start_batch(self):
+        self.last_child_path = None
+        self.new_child_count = 0
 
-        """Run all hooks in settings.WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE"""
-        for hook, actions in getattr(
-            settings, "WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE", {}
-        ).items():
-            import_string(actions["FUNCTION"])(
-                self.imported_pages,
-                actions["DATA_TAG"],
-                getattr(self.items_cache, hook),
+    def end_batch(self):
+        """Update the numchild of the parent page once for all the pages
+        added in the batch."""
+        if self.new_child_count:
+            Page.objects.filter(pk=self.parent_page_obj.pk).update(
+                numchild=F("numchild") + self.new_child_count
             )
+            self.parent_page_obj.numchild += self.new_child_count
 
-        """Run all hooks in settings.WORDPRESS_IMPORT_HOOKS_TAGS_TO_CACHE"""
-        for hook, actions in getattr(
-            settings, "WORDPRESS_IMPORT_HOOKS_TAGS_TO_CACHE", {}
-        ).items():
-            import_string(actions["FUNCTION"])(
-                self.imported_pages,
-                actions["DATA_TAG"],
-                getattr(self.tags_cache, hook),
+    def add_child_page(self, page):
+        """
+        Add the page as the last child of the parent page.
+
+        This does the same as treebeard's add_child() but the path of the last
+        child is kept for the rest of the batch, so the children of the parent
+        page aren't queried again for each new page.
+        """
+        parent = self.parent_page_obj
+        if self.last_child_path is None and parent.numchild:
+            last_child = parent.get_last_child()
+            if last_child:
+                self.last_child_path = last_child.path
+
+        page.depth = parent.depth + 1
+        if self.last_child_path is None:
+            page.path = parent._get_path(parent.path, page.depth, 1)
+        else:
+            page.path = self.last_child_path
+            page.path = page._inc_path()
+        page._cached_parent_obj = parent
+        page.save()
+
+        self.last_child_path = page.path
+        self.new_child_count += 1
+
+    def prepare_items(
+        self,
+        items,
+        *,
+        page_types,
+        page_statuses,
+        incremental=False,
+        executor=None,
+        workers=1,
+        batch_size=1,
+    ):
+        """
+        Yield a (tag name, item, wordpress item, page) tuple for each tag from
+        the item reader. The wordpress item and page are None unless the item
+        is a page to import, the page is the existing page or a new instance.
+
+        The existing pages are fetched with one query for each batch_size pages.
+
+        With an executor from start_worker_pool() the prefilters of each
+        wordpress item are run in the pool of worker processes while earlier
+        items are saved. The block builder, which fetches and saves the media,
+        and every other database write is left to this process. The items are
+        still yielded in the same order as the XML file.
+        """
+        window = 0
+        timings = self.logger.timings is not None
+        if executor:
+            window = workers * 4  # the number of items in progress is limited
+        pending = deque()
+        # new pages handed out that haven't been saved yet, by post id
+        unsaved_pages = {}
+
+        def is_page(tag_and_item):
+            tag_name, item = tag_and_item
+            return (
+                tag_name == "item"
+                and item.get("wp:post_type") in page_types
+                and item.get("wp:status") in page_statuses
             )
 
+        media_fetcher = get_media_fetcher()
+
+        def resolve_pending():
+            chunk_number, is_last, prepared_item = pending.popleft()
+            yield self.resolve_prepared_item(*prepared_item)
+            # the batches of run() are the same as the chunks, when the next
+            # item is asked for the items of the chunk have been imported
+            if media_fetcher and is_last:
+                media_fetcher.discard(chunk_number)
+
+        for chunk_number, chunk in enumerate(
+            iter_chunks(items, batch_size, counts=is_page)
+        ):
+            wordpress_items = [
+                WordpressItem(item, self.logger, timings=timings)
+                if is_page((tag_name, item))
+                else None
+                for tag_name, item in chunk
+            ]
+
+            # get the existing pages for the chunk in a single query
+            pages = {
+                page.wp_post_id: page
+                for page in self.page_model_class.objects.filter(
+                    wp_post_id__in=[
+                        wordpress_item.cleaned_post_id()
+                        for wordpress_item in wordpress_items
+                        if wordpress_item
+                    ]
+                )
+            }
+
+            # with workers the earlier chunks may not have been saved yet,
+            # a later item with the same post id updates the same page
+            for post_id, page in list(unsaved_pages.items()):
+                if page.id:
+                    del unsaved_pages[post_id]
+                elif post_id not in pages:
+                    pages[post_id] = page
+
+            if media_fetcher:
+                # download the media for the chunk concurrently, ahead of
+                # the image and document linkers needing it
+                for wordpress_item in wordpress_items:
+                    if wordpress_item and not (
+                        incremental
+                        and wordpress_item.cleaned_post_id() in pages
+                        and self.is_unchanged(
+                            pages[wordpress_item.cleaned_post_id()],
+                            wordpress_item.digest,
+                        )
+                    ):
+                        media_fetcher.prefetch(
+                            get_media_urls(wordpress_item.raw_body),
+                            group=chunk_number,
+                        )
+
+            for index, ((tag_name, item), wordpress_item) in enumerate(
+                zip(chunk, wordpress_items)
+            ):
+                page = None
+
+                if wordpress_item:
+                    post_id = wordpress_item.cleaned_post_id()
+                    if post_id not in pages:
+                        # a later item with the same post id updates this page
+                        pages[post_id] = self.page_model_class()
+                        unsaved_pages[post_id] = pages[post_id]
+                    page = pages[post_id]
+
+                    if executor and not (
+                        incremental and self.is_unchanged(page, wordpress_item.digest)
+                    ):
+                        wordpress_item = executor.submit(
+                            clean_wordpress_item, item, timings
+                        )
+
+                pending.append(
+                    (
+                        chunk_number,
+                        index == len(chunk) - 1,
+                        (tag_name, item, wordpress_item, page),
+                    )
+                )
+
+                if len(pending) > window:
+                    yield from resolve_pending()
+
+        while pending:
+            yield from resolve_pending()
+
+    def resolve_prepared_item(self, tag_name, item, wordpress_item, page):
+        if isinstance(wordpress_item, Future):
+            wordpress_item = wordpress_item.result()
+            wordpress_item.logger = self.logger
+        return tag_name, item, wordpress_item, page
+
+    @staticmethod
+    def is_unchanged(page, digest):
+        return bool(page.id) and getattr(page, "wp_import_digest", None) == digest
+
     @staticmethod
     def check_stream_field_block_types(page, body):
         """Body JSON is validated to check it is using only StreamField blocks declared in the model StreamField
@@ -249,85 +612,145 @@ class WordpressImporter:
                 raise ValueError(f"Invalid page streamfield block types: {item_block}")
 
     def analyze_html(self, html_analyzer, *, page_types, page_statuses):
-        xml_doc = pulldom.parse(self.xml_file)
-
-        for event, node in xml_doc:
-            """
-            Each node represents a tag in the xml.
-            `event` is true for a start element.
-            """
-            if event == pulldom.START_ELEMENT and node.tagName == "item":
-                xml_doc.expandNode(node)
-                item = node_to_dict(node)
-                if (
-                    item.get("wp:post_type") in page_types
-                    and item.get("wp:status") in page_statuses
-                ):
+        for tag_name, item in self.item_reader_class(self.xml_file):
+            if (
+                item.get("wp:post_type") in page_types
+                and item.get("wp:status") in page_statuses
+            ):
 
-                    html_analyzer.analyze(
-                        filter_linebreaks_wp(item.get("content:encoded"))
-                    )
+                html_analyzer.analyze(filter_linebreaks_wp(item.get("content:encoded")))
 
-    def connect_richtext_page_links(self, imported_pages):
+    def connect_richtext_page_links(self, page_ids):
         """
-        Update the StreamField content of each page by reconstructing
-        the existing blocks. Only update rich_text blocks by analysing the anchor links
-        in update_rich_text_page_links()
+        Rewrite the links which couldn't be resolved when the pages were
+        imported, now that all the pages have been imported. Only the pages
+        with unresolved links are updated, with a queryset update of the body.
+
+        Links to the WordPress site which still can't be resolved are saved to
+        the page link errors report.
         """
-        for page in imported_pages:
-            stream_data = page.body._raw_data
-            reconstructed_blocks = []
-            for block in stream_data:
-                del block["id"]  # these get created on save so lose the old id
-                if block["type"] == "rich_text":
-                    block["value"] = str(self.update_rich_text_page_links(block, page))
-                reconstructed_blocks.append(block)
+        for page in self.page_model_class.objects.filter(id__in=page_ids).only(
+            "id", "title", "body"
+        ):
+            stream_data = list(page.body.raw_data)
+            for link in self.update_page_links(stream_data):
+                self.logger.log_page_link_error(
+                    {"id": page.id, "title": page.title, "link": link}
+                )
             page.body = json.dumps(stream_data)
-            page.save()
+            self.page_model_class.objects.filter(pk=page.pk).update(body=page.body)
+
+    def has_unresolved_links(self, page):
+        """
+        Return True if the rich_text blocks of the saved page body still have
+        internal links, which couldn't be resolved when it was imported.
+        Resolved page links don't have a href.
+        """
+        return any(
+            self.is_unresolved_page_link(html.unescape(href))
+            for block in page.body.raw_data
+            if block["type"] == "rich_text"
+            for href in A_HREF_PATTERN.findall(block["value"])
+        )
+
+    def update_page_links(self, blocks):
+        """
+        Update the page links in the rich_text blocks in place, by analysing
+        the anchor links in update_rich_text_page_links().
+        Return the internal links that cannot be resolved.
+        """
+        unresolved_links = []
+        for block in blocks:
+            if block["type"] == "rich_text" and "<a" in block["value"]:
+                block["value"] = fragment_to_html(
+                    self.update_rich_text_page_links(block, unresolved_links)
+                )
+        return unresolved_links
 
-    def update_rich_text_page_links(self, block, page):
+    def update_rich_text_page_links(self, block, unresolved_links):
         """
         Get all the anchor tags (bs4) and replace the anchor tag with
         <a id="{wagtail page id}" linktype="page">{the current anchor text}</a>
-        If a wagtail page cannot be found for the anchor link, ignore it but
-        save to the log.
+        If a wagtail page cannot be found for an internal anchor link, ignore it
+        but add it to unresolved_links.
         """
-        soup = BeautifulSoup(block["value"], "html.parser")
+        soup = parse_html_fragment(block["value"])
         links = soup.findAll("a")
 
         for link in links:
-            page_link = self.get_page(link.attrs.get("href"), page)
-            if page_link:
+            href = link.attrs.get("href")
+            page_id = self.page_links.resolve(href)
+            if page_id:
                 new_tag = soup.new_tag("a")
-                new_tag.attrs["id"] = page_link.id
+                new_tag.attrs["id"] = page_id
                 new_tag.attrs["linktype"] = "page"
                 new_tag.string = link.text
                 link.replace_with(new_tag)
+            elif self.is_unresolved_page_link(href):
+                unresolved_links.append(href)
         return soup
 
-    def get_page(self, link, page):
-        try:
-            if debug_enabled():
-                self.logger.page_link_errors.append((link, page))
-            return self.page_model_class.objects.get(wp_link=link)
-        except self.page_model_class.DoesNotExist:
-            pass
+    def is_unresolved_page_link(self, href):
+        """
+        Return True if a link that isn't to an imported page is to the
+        WordPress site. Links to the files in its uploads folder aren't links
+        to pages.
+        """
+        return self.page_links.is_internal(href) and (
+            uploads_url_path() not in urlsplit(href.strip()).path
+        )
 
-    def connect_page_categories(self, page, category_model, item):
+    def create_batch_categories(self, batch):
+        """Create the categories of the pages in the batch, and the
+        <wp:category> tags, that don't exist yet with one query."""
+        for tag_name, item, wordpress_item, page in batch:
+            if tag_name == "wp:category":
+                self.categories.add_names([item.get("wp:cat_name")])
+            elif wordpress_item and "category" in item.keys():
+                self.categories.add_names(item["category"])
+        self.categories.create_pending()
+
+    def connect_page_categories(self, page, item):
         if "category" in item.keys():
-            categories = [
-                str(category)
-                for category in item["category"]
-                if category and len(str(category)) > category_name_min_length()
-            ]
-
-            page_categories = []
-
-            for name in categories:
-                category, created = category_model.objects.get_or_create(name=name)
-                page_categories.append(category)
-
-            page.categories = page_categories
+            page.categories = self.categories.get_categories(item["category"])
+
+
+def init_worker():
+    """
+    Set up Django in a worker process. Database connections inherited from
+    the parent process are discarded, without closing them as they are still
+    used by the parent, so the worker opens its own.
+
+    The media fetcher and index copied from the parent are deactivated, the
+    media is only fetched and saved by the parent.
+    """
+    django.setup()
+    for connection in connections.all():
+        connection.connection = None
+    activate_media_fetcher(None)
+    activate_media_index(None)
+
+
+def start_worker_pool(workers):
+    """
+    Return a ProcessPoolExecutor with its worker processes started. The
+    processes are forked by the first task, so the pool is started before
+    any threads, e.g. of the MediaFetcher, that a forked process would copy
+    in whatever state they're in.
+    """
+    executor = ProcessPoolExecutor(workers, initializer=init_worker)
+    executor.submit(int).result()
+    return executor
+
+
+def clean_wordpress_item(item, timings=False):
+    """Run the prefilters of an item in a worker process. They only process
+    the content, the rest of cleaned_data is processed by the parent."""
+    wordpress_item = WordpressItem(item, None, timings=timings)
+    with record_timings(wordpress_item.timings):
+        wordpress_item.prefiltered_body
+    wordpress_item.digest
+    return wordpress_item
 
 
 def default_prefilters():
@@ -348,7 +771,7 @@ def default_prefilters():
 
 
 class WordpressItem:
-    def __init__(self, node, logger):
+    def __init__(self, node, logger, timings=False):
         self.node = node
         self.raw_body = self.node["content:encoded"]
         self.slug_changed = ""
@@ -359,22 +782,75 @@ class WordpressItem:
         self.logger = logger
         self.post_meta_items = None
         self.post_item_tags = None
+        # the seconds spent in each stage of processing the item, if timed
+        self.timings = {} if timings else None
 
     def prefilter_content(self, content):
         """
         FILTERS ARE CUMULATIVE: Each filter receives the output from the previous filter.
         """
-        cached_result = content
+        with time_stage("prefilter_content"):
+            return run_prefilters(
+                content,
+                getattr(
+                    settings, "WAGTAIL_WORDPRESS_IMPORT_PREFILTERS", DEFAULT_PREFILTERS
+                ),
+                debug_content=self.debug_content if debug_enabled() else None,
+            )
 
-        for filter in getattr(
-            settings, "WAGTAIL_WORDPRESS_IMPORT_PREFILTERS", DEFAULT_PREFILTERS
-        ):
-            function = import_string(filter["FUNCTION"])
-            cached_result = function(cached_result, filter.get("OPTIONS"))
-            if debug_enabled():
-                self.debug_content[function.__name__] = cached_result
+    @cached_property
+    def prefiltered_body(self):
+        return self.prefilter_content(self.raw_body)
 
-        return cached_result
+    @cached_property
+    def digest(self):
+        """
+        Return a sha256 hash of the raw item and the configuration used to
+        process it: the prefilters, the block builders, the shortcode
+        handlers and the settings that change the page.
+        If the digest matches the one saved on the page, processing the item
+        again would produce the same page.
+
+        WAGTAIL_WORDPRESS_IMPORTER_DIGEST_VERSION can be changed to process
+        every item again after a change the digest can't see, e.g. to the
+        code of a block builder.
+        """
+        data = {
+            "item": self.node,
+            "version": getattr(
+                settings, "WAGTAIL_WORDPRESS_IMPORTER_DIGEST_VERSION", None
+            ),
+            "prefilters": getattr(
+                settings, "WAGTAIL_WORDPRESS_IMPORT_PREFILTERS", DEFAULT_PREFILTERS
+            ),
+            "html_tags_to_blocks": conf_html_tags_to_blocks(),
+            "fallback_block": conf_fallback_block(),
+            "promote_child_tags": conf_promote_child_tags(),
+            "registered_block_builders": {
+                tag_name: get_qualified_name(function)
+                for tag_name, function in REGISTERED_BLOCK_BUILDERS.items()
+            },
+            "shortcode_handlers": [
+                [
+                    get_qualified_name(type(handler)),
+                    handler.shortcode_name,
+                    getattr(handler, "element_name", None),
+                ]
+                for handler in get_shortcode_handlers()
+            ],
+            "inline_shortcode_handlers": getattr(
+                settings, "WAGTAIL_WORDPRESS_IMPORTER_INLINE_SHORTCODE_HANDLERS", []
+            ),
+            "html_parser": html_parser(),
+            "source_domain": getattr(
+                settings, "WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN", None
+            ),
+            "debug": debug_enabled(),
+            "yoast": yoast_plugin_enabled() and yoast_plugin_config(),
+        }
+        return hashlib.sha256(
+            json.dumps(data, sort_keys=True, default=str).encode()
+        ).hexdigest()
 
     def cleaned_title(self):
         title = self.node.get("title", None)
@@ -444,9 +920,10 @@ class WordpressItem:
         return str(self.node["link"].strip())
 
     def body_stream_field(self, content):
-        builder = BlockBuilder(content, self.node, self.logger)
-        builder.promote_child_tags()
-        blocks_dict = builder.build()
+        with time_stage("block_builder"):
+            builder = BlockBuilder(content, self.node, self.logger)
+            builder.promote_child_tags()
+            blocks_dict = builder.build()
         if debug_enabled():
             self.debug_content["block_json"] = blocks_dict
         return json.dumps(blocks_dict)
@@ -527,7 +1004,7 @@ class WordpressItem:
             "first_published_at": self.cleaned_first_published_at(),
             "last_published_at": self.cleaned_last_published_at(),
             "latest_revision_created_at": self.cleaned_latest_revision_created_at(),
-            "body": self.body_stream_field(self.prefilter_content(self.raw_body)),
+            "body": self.body_stream_field(self.prefiltered_body),
             "search_description": self.cleaned_search_description(),
             "wp_post_id": self.cleaned_post_id(),
             "wp_post_type": self.cleaned_post_type(),
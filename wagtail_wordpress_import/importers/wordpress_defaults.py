@@ -41,3 +41,7 @@ def category_name_min_length():
 
 def get_category_model():
     return getattr(settings, "WAGTAIL_WORDPRESS_IMPORT_CATEGORY_PLUGIN_MODEL", None)
+
+
+def item_reader():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORT_ITEM_READER", "iterparse")
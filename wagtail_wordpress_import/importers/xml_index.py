@@ -0,0 +1,219 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+
+from lxml import etree
+
+from wagtail_wordpress_import.functions import element_to_dict
+
+# CDATA sections and comments are matched so an <item> tag inside them is skipped
+ITEM_TAG_PATTERN = re.compile(
+    rb"<!\[CDATA\[.*?\]\]>|<!--.*?-->|<(?P<closing>/?)item[\s/>]", re.DOTALL
+)
+ROOT_TAG_PATTERN = re.compile(rb"<(?P<name>[^\s?!/>]+)[^>]*>")
+
+
+def iter_item_spans(data, start=0):
+    """Yield the (offset, length) of each top level <item> tag in the bytes."""
+    depth = 0
+    item_start = None
+    for match in ITEM_TAG_PATTERN.finditer(data, start):
+        if match.group("closing") is None:
+            continue  # CDATA or a comment
+        tag_end = data.find(b">", match.start()) + 1
+        if match.group("closing"):
+            depth -= 1
+            if depth == 0:
+                yield item_start, tag_end - item_start
+        elif data[tag_end - 2 : tag_end] == b"/>":
+            if depth == 0:
+                yield match.start(), tag_end - match.start()
+        else:
+            if depth == 0:
+                item_start = match.start()
+            depth += 1
+
+
+class XmlIndex:
+    """A byte offset index of the <item> tags in a WordPress XML file.
+
+    The index is saved as a JSON file alongside the XML file. Each entry records
+    the byte offset and length of an <item> tag, its wp:post_id, wp:post_type,
+    wp:status and a sha256 hash of the item bytes, so selected items can be read
+    without parsing the rest of the file.
+
+    An index is only valid for the XML file size and modification time it was
+    built from, if either changes the index is stale and is rebuilt.
+    """
+
+    version = 1
+
+    def __init__(self, xml_file_path, *, size, mtime, prolog_length, root_name, items):
+        self.xml_file_path = xml_file_path
+        self.size = size
+        self.mtime = mtime
+        self.prolog_length = prolog_length
+        self.root_name = root_name
+        self.items = items
+
+    @staticmethod
+    def get_index_path(xml_file_path):
+        return f"{xml_file_path}.index.json"
+
+    @classmethod
+    def build(cls, xml_file_path):
+        """Build the index by scanning the file, raise ValueError if the file
+        is empty or has no root tag."""
+        stat = os.stat(xml_file_path)
+        if not stat.st_size:
+            raise ValueError(f"The XML file {xml_file_path} is empty")
+
+        with open(xml_file_path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            root = ROOT_TAG_PATTERN.search(data)
+            if root is None:
+                raise ValueError(f"The XML file {xml_file_path} has no root tag")
+            prolog = data[: root.end()]
+            root_name = root.group("name").decode()
+
+            items = list(iter_item_spans(data, root.end()))
+
+            index = cls(
+                xml_file_path,
+                size=stat.st_size,
+                mtime=stat.st_mtime_ns,
+                prolog_length=len(prolog),
+                root_name=root_name,
+                items=[],
+            )
+            for offset, length in items:
+                item_bytes = data[offset : offset + length]
+                item = index.parse_item(prolog, item_bytes)
+                index.items.append(
+                    {
+                        "offset": offset,
+                        "length": length,
+                        "post_id": item.get("wp:post_id"),
+                        "post_type": item.get("wp:post_type"),
+                        "status": item.get("wp:status"),
+                        "hash": hashlib.sha256(item_bytes).hexdigest(),
+                    }
+                )
+
+        return index
+
+    @classmethod
+    def load(cls, xml_file_path):
+        """Return the saved index or None if it doesn't exist or is stale."""
+        try:
+            with open(cls.get_index_path(xml_file_path)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if data.get("version") != cls.version:
+            return None
+
+        index = cls(
+            xml_file_path,
+            size=data["size"],
+            mtime=data["mtime"],
+            prolog_length=data["prolog_length"],
+            root_name=data["root_name"],
+            items=data["items"],
+        )
+        if not index.is_valid():
+            return None
+        return index
+
+    @classmethod
+    def get_or_build(cls, xml_file_path):
+        index = cls.load(xml_file_path)
+        if index is None:
+            index = cls.build(xml_file_path)
+            index.save()
+        return index
+
+    def save(self):
+        with open(self.get_index_path(self.xml_file_path), "w") as f:
+            json.dump(
+                {
+                    "version": self.version,
+                    "size": self.size,
+                    "mtime": self.mtime,
+                    "prolog_length": self.prolog_length,
+                    "root_name": self.root_name,
+                    "items": self.items,
+                },
+                f,
+            )
+
+    def is_valid(self):
+        try:
+            stat = os.stat(self.xml_file_path)
+        except OSError:
+            return False
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime
+
+    def filter(self, post_ids=None, post_types=None, always_types=None):
+        """Return the index entries matching all the post_ids and post_types
+        given, and any entries with a post type in always_types.
+        """
+        return [
+            entry
+            for entry in self.items
+            if (always_types and entry["post_type"] in always_types)
+            or (
+                (post_ids is None or entry["post_id"] in post_ids)
+                and (post_types is None or entry["post_type"] in post_types)
+            )
+        ]
+
+    def read_header(self):
+        """Return the bytes of the XML file before the first <item> tag."""
+        end = self.items[0]["offset"] if self.items else self.size
+        with open(self.xml_file_path, "rb") as f:
+            return f.read(end)
+
+    def iter_items(self, entries):
+        """Seek to and parse each entry, yielding the item dicts."""
+        with open(self.xml_file_path, "rb") as f:
+            prolog = f.read(self.prolog_length)
+            for entry in entries:
+                f.seek(entry["offset"])
+                yield self.parse_item(prolog, f.read(entry["length"]))
+
+    def parse_item(self, prolog, item_bytes):
+        """The item is wrapped in the root tag so namespace prefixes are declared."""
+        root = etree.fromstring(
+            prolog + item_bytes + f"</{self.root_name}>".encode(),
+            parser=etree.XMLParser(
+                huge_tree=True, resolve_entities=False, no_network=True
+            ),
+        )
+        for element in root:
+            if isinstance(element.tag, str):
+                return element_to_dict(element)
+
+
+def count_items(xml_file_path):
+    """
+    Return the number of <item> tags in the XML file, from its index if
+    there's a saved index that isn't stale, otherwise by scanning the file
+    for the tags without parsing it.
+    """
+    index = XmlIndex.load(xml_file_path)
+    if index is not None:
+        return len(index.items)
+
+    with open(xml_file_path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            root = ROOT_TAG_PATTERN.search(data)
+            if root is None:
+                return 0
+            return sum(1 for span in iter_item_spans(data, root.end()))
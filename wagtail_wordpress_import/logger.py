@@ -1,22 +1,214 @@
 import csv
+import json
 import sys
+from collections import Counter, deque
 from datetime import datetime
 
+from django.conf import settings
+from prettytable import PrettyTable
+
+from wagtail_wordpress_import.timings import StageTimings
+
+# the rows of the import report, and the labels in the first row of the csv file
+IMPORT_REPORT_FIELDS = {
+    "id": "Page ID",
+    "title": "Page Title",
+    "url": "Wordpress Link",
+    "reason": "Reason for result ->",
+    "result": "Result",
+    "dates": "Dates Changed",
+    "slug": "Slug Changed",
+}
+
+IMAGES_REPORT_FIELDS = {
+    "id": "Page ID",
+    "title": "Page Title",
+    "url": "Wordpress Link",
+    "reason": "Reason",
+}
+
+PAGE_LINK_ERRORS_REPORT_FIELDS = {
+    "id": "Page ID",
+    "title": "Page Title",
+    "link": "Wordpress Link",
+}
+
+
+def import_report_format():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_REPORT_FORMAT", "csv")
+
+
+def recent_items_count():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_LOG_RECENT_ITEMS", 100)
+
+
+def import_report_row(item):
+    return {
+        "id": item["id"],
+        "title": item["title"],
+        "url": item["link"],
+        "reason": item["reason"],
+        "result": item["result"],
+        "dates": item["datecheck"],
+        "slug": item["slugcheck"],
+    }
+
+
+def images_report_row(image):
+    return {
+        "id": image["id"],
+        "title": image["title"],
+        "url": image["link"],
+        "reason": image["reason"],
+    }
+
+
+def page_link_errors_report_row(error):
+    return {
+        "id": error["id"],
+        "title": error["title"],
+        "link": error["link"],
+    }
+
+
+class ImportReportWriter:
+    """
+    Write the rows of a report to a file as they are logged, through a
+    buffered file rather than holding them in memory until the end.
+
+    format:
+        "csv", with the labels of the columns in the first row, or "jsonl",
+        with a JSON object for each row.
+    fields:
+        The labels of the columns, by the keys of the rows.
+    """
+
+    def __init__(
+        self,
+        file_name,
+        format="csv",
+        fields=IMPORT_REPORT_FIELDS,
+        buffer_size=64 * 1024,
+    ):
+        if format not in ("csv", "jsonl"):
+            raise ValueError(f"Unknown import report format: {format}")
+        self.file_name = file_name
+        self.format = format
+        self.file = open(file_name, "w", newline="", buffering=buffer_size)
+        if format == "csv":
+            self.writer = csv.DictWriter(self.file, fieldnames=fields)
+            self.writer.writerow(fields)
+
+    def write(self, row):
+        if self.format == "csv":
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row, default=str) + "\n")
+
+    def close(self):
+        self.file.close()
+
 
 class Logger:
-    def __init__(self, logdir):
+    """
+    Count the results of an import and write a row to the import report for
+    each item logged.
+
+    Only the counts and the most recent items, image errors and page link
+    errors are kept in memory. The reports are written as they are logged
+    once start_import_report() has been called.
+
+    progress:
+        An ImportProgress that reports the counts as the items are logged.
+    verbose:
+        Write a line for each page imported.
+    timings:
+        Collect the time spent in each stage of processing the items.
+    """
+
+    def __init__(
+        self, logdir, report_format=None, progress=None, verbose=True, timings=False
+    ):
         self.logdir = logdir
+        self.report_format = report_format or import_report_format()
+        self.progress = progress
+        self.verbose = verbose
+        self.timings = StageTimings() if timings else None
         self.processed = 0
+        self.bytes_processed = 0
         self.imported = 0
         self.skipped = 0
-        self.items = []
-        self.images = []
+        self.unchanged = 0
+        self.results = Counter()
+        self.items = deque(maxlen=recent_items_count())
+        self.import_report = None
+        self.images = deque(maxlen=recent_items_count())
+        self.images_logged = 0
+        self.images_report = None
         self.urls = []
-        self.page_link_errors = []
+        self.page_link_errors = deque(maxlen=recent_items_count())
+        self.page_link_errors_logged = 0
+        self.page_link_errors_report = None
+
+    def start_import_report(self):
+        """Open the report files in the log folder, each item, image and page
+        link error logged from now on is written to them."""
+        extension = "jsonl" if self.report_format == "jsonl" else "csv"
+        self.import_report = ImportReportWriter(
+            f"{self.logdir}/import-report-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extension}",
+            self.report_format,
+        )
+        self.start_images_report()
+        self.start_pagelink_errors_report()
+
+    def start_images_report(self):
+        self.images_report = ImportReportWriter(
+            f"{self.logdir}/images-report-{datetime.now().strftime('%Y%m%d-%H%M%S')}.csv",
+            fields=IMAGES_REPORT_FIELDS,
+        )
+
+    def start_pagelink_errors_report(self):
+        self.page_link_errors_report = ImportReportWriter(
+            f"{self.logdir}/pagelink_errors-report-{datetime.now().strftime('%Y%m%d-%H%M%S')}.csv",
+            fields=PAGE_LINK_ERRORS_REPORT_FIELDS,
+        )
+
+    def log_item(self, item):
+        """
+        Record the result of importing an item, a dict with the "id", "title",
+        "link", "result", "reason", "datecheck" and "slugcheck" of the item.
+        """
+        self.results[item["result"]] += 1
+        self.items.append(item)
+        if self.import_report is not None:
+            self.import_report.write(import_report_row(item))
+        self.log_progress(item)
+
+    def log_image(self, image):
+        """Record an image error, a dict with the "id", "title", "link" and
+        "reason"."""
+        self.images_logged += 1
+        self.images.append(image)
+        if self.images_report is not None:
+            self.images_report.write(images_report_row(image))
+
+    def log_page_link_error(self, error):
+        """Record a link which couldn't be resolved, a dict with the "id" and
+        "title" of the page and the "link"."""
+        self.page_link_errors_logged += 1
+        self.page_link_errors.append(error)
+        if self.page_link_errors_report is not None:
+            self.page_link_errors_report.write(page_link_errors_report_row(error))
+
+    def log_timings(self, post_id, timings):
+        """Record the seconds spent in each stage of importing an item."""
+        if self.timings is not None:
+            self.timings.add_item(post_id, timings)
 
-    def log_progress(self):
-        item = self.items[-1]
-        if not item["id"] == 0:
+    def log_progress(self, item):
+        if self.progress is not None:
+            self.progress.update(self)
+        if self.verbose and not item["id"] == 0:
             sys.stdout.write(
                 f"Wagtail ID: {item['id']}, {item['title']}, {item['result']}\n"
             )
@@ -26,7 +218,9 @@ class Logger:
             "processed": self.processed,
             "imported": self.imported,
             "skipped": self.skipped,
-            "items": self.items,
+            "unchanged": self.unchanged,
+            "results": dict(self.results),
+            "items": list(self.items),
         }
 
         return report_data
@@ -38,10 +232,12 @@ class Logger:
             + str(self.imported)
             + " Skipped: "
             + str(self.skipped)
+            + " Unchanged: "
+            + str(self.unchanged)
             + " Processed: "
             + str(self.processed)
         )
-        if self.processed - self.skipped == self.imported:
+        if self.processed - self.skipped - self.unchanged == self.imported:
             sys.stdout.write("\n✅ Completed Successfully\n")
         else:
             sys.stdout.write(
@@ -49,100 +245,82 @@ class Logger:
             )
 
     def save_csv_import_report(self):
-        file_name = f"{self.logdir}/import-report-{datetime.now().strftime('%Y%m%d-%H%M%S')}.csv"
-
-        with open(file_name, "w", newline="") as csvfile:
-            writer = csv.DictWriter(
-                csvfile,
-                fieldnames=[
-                    "id",
-                    "title",
-                    "url",
-                    "reason",
-                    "result",
-                    "dates",
-                    "slug",
-                ],
+        """
+        Finish the import report. If it wasn't started before the import,
+        it only has the most recent items.
+        """
+        if self.import_report is None:
+            self.start_import_report()
+            for item in self.items:
+                self.import_report.write(import_report_row(item))
+        self.import_report.close()
+        self.import_report = None
+
+    def output_timings_report(self):
+        if self.timings is None:
+            return
+
+        report = self.timings.get_report()
+        table = PrettyTable()
+        table.field_names = [
+            "Stage",
+            "Items",
+            "Total (s)",
+            "Mean (ms)",
+            "p50 (ms)",
+            "p90 (ms)",
+            "p99 (ms)",
+            "Max (ms)",
+        ]
+        table.align["Stage"] = "l"
+        for stage in report["stages"]:
+            table.add_row(
+                [stage["stage"], stage["count"], f"{stage['total']:.2f}"]
+                + [
+                    f"{stage[column] * 1000:.2f}"
+                    for column in ("mean", "p50", "p90", "p99", "max")
+                ]
             )
-            writer.writerow(
-                {
-                    "id": "Page ID",
-                    "title": "Page Title",
-                    "url": "Wordpress Link",
-                    "reason": "Reason for result ->",
-                    "result": "Result",
-                    "dates": "Dates Changed",
-                    "slug": "Slug Changed",
-                }
+        sys.stdout.write("\nTimings ========================\n")
+        sys.stdout.write(str(table) + "\n")
+        sys.stdout.write(
+            "Slowest items: "
+            + ", ".join(
+                f"{item['post_id']} ({item['total']:.2f}s)"
+                for item in report["slowest_items"]
             )
-            for row in self.items:
-                writer.writerow(
-                    {
-                        "id": row["id"],
-                        "title": row["title"],
-                        "url": row["link"],
-                        "reason": row["reason"],
-                        "result": row["result"],
-                        "dates": row["datecheck"],
-                        "slug": row["slugcheck"],
-                    }
-                )
+            + "\n"
+        )
+
+    def save_timings_report(self):
+        if self.timings is None:
+            return
+
+        file_name = f"{self.logdir}/timings-report-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+
+        with open(file_name, "w") as f:
+            json.dump(self.timings.get_report(), f, indent=2)
 
     def save_csv_images_report(self):
-        file_name = f"{self.logdir}/images-report-{datetime.now().strftime('%Y%m%d-%H%M%S')}.csv"
-
-        with open(file_name, "w", newline="") as csvfile:
-            writer = csv.DictWriter(
-                csvfile,
-                fieldnames=[
-                    "id",
-                    "title",
-                    "url",
-                    "reason",
-                ],
-            )
-            writer.writerow(
-                {
-                    "id": "Page ID",
-                    "title": "Page Title",
-                    "url": "Wordpress Link",
-                    "reason": "Reason",
-                }
-            )
-            for row in self.images:
-                writer.writerow(
-                    {
-                        "id": row["id"],
-                        "title": row["title"],
-                        "url": row["link"],
-                        "reason": row["reason"],
-                    }
-                )
+        """
+        Finish the images report. If it wasn't started before the import,
+        it only has the most recent image errors.
+        """
+        if self.images_report is None:
+            self.start_images_report()
+            for image in self.images:
+                self.images_report.write(images_report_row(image))
+        self.images_report.close()
+        self.images_report = None
 
     def save_csv_pagelink_errors_report(self):
-        file_name = f"{self.logdir}/pagelink_errors-report-{datetime.now().strftime('%Y%m%d-%H%M%S')}.csv"
-
-        with open(file_name, "w", newline="") as csvfile:
-            writer = csv.DictWriter(
-                csvfile,
-                fieldnames=[
-                    "id",
-                    "title",
-                    "link",
-                ],
-            )
-            writer.writerow(
-                {
-                    "id": "Page ID",
-                    "title": "Page Title",
-                    "link": "Wordpress Link",
-                }
-            )
-            for row in self.images:
-                writer.writerow(
-                    {
-                        "id": row["id"],
-                        "title": row["title"],
-                        "link": row["link"],
-                    }
-                )
+        """
+        Finish the page link errors report. If it wasn't started before the
+        import, it only has the most recent page link errors.
+        """
+        if self.page_link_errors_report is None:
+            self.start_pagelink_errors_report()
+            for error in self.page_link_errors:
+                self.page_link_errors_report.write(page_link_errors_report_row(error))
+        self.page_link_errors_report.close()
+        self.page_link_errors_report = None
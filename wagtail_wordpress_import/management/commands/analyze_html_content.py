@@ -44,10 +44,17 @@ class Command(BaseCommand):
             help="The wordpress post statuse/s to import. Use a comma to separate multiple types",
             default="publish,draft",
         )
+        parser.add_argument(
+            "-r",
+            "--reader",
+            type=str,
+            help="The XML item reader to use, `iterparse`, `pulldom` or a dotted path to a reader class. The default is the WAGTAIL_WORDPRESS_IMPORT_ITEM_READER setting",
+            default=None,
+        )
 
     def handle(self, **options):
         xml_file_path = self.get_xml_file(f"{options['xml_file']}")
-        importer = WordpressImporter(xml_file_path)
+        importer = WordpressImporter(xml_file_path, item_reader=options["reader"])
         analyzer = HTMLAnalyzer()
 
         importer.analyze_html(
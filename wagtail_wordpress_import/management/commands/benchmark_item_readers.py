@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from prettytable import PrettyTable
+
+from wagtail_wordpress_import.importers.readers import (
+    ITEM_READERS,
+    get_item_reader_class,
+)
+
+try:
+    import resource
+except ImportError:  # resource is not available on Windows
+    resource = None
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if os.uname().sysname == "Darwin":
+        peak = peak // 1024
+    return peak
+
+
+def read_all_items(reader, xml_file, results):
+    """Run in a separate process so the peak RSS is only for this reader."""
+    start = time.perf_counter()
+    total = 0
+    for tag_name, item in get_item_reader_class(reader)(xml_file):
+        total += 1
+    elapsed = time.perf_counter() - start
+    results.put((total, elapsed, peak_rss_kb()))
+
+
+class Command(BaseCommand):
+    help = """This command is not used directly in an import.
+
+    It reads every item in the XML file with each item reader and outputs
+    the items read per second and the peak memory used by each reader.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("xml_file", type=str, help="The full path to your xml file")
+        parser.add_argument(
+            "-r",
+            "--readers",
+            type=str,
+            help="The item readers to compare. Use a comma to separate multiple readers",
+            default=",".join(ITEM_READERS),
+        )
+
+    def handle(self, **options):
+        xml_file_path = self.get_xml_file(f"{options['xml_file']}")
+
+        table = PrettyTable()
+        table.field_names = ["Reader", "Items", "Seconds", "Items/sec", "Peak RSS (MB)"]
+
+        for reader in options["readers"].split(","):
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=read_all_items, args=(reader, xml_file_path, results)
+            )
+            process.start()
+            total, elapsed, peak = results.get()
+            process.join()
+
+            table.add_row(
+                [
+                    reader,
+                    total,
+                    f"{elapsed:.2f}",
+                    f"{total / elapsed:.0f}" if elapsed else "-",
+                    f"{peak / 1024:.1f}" if peak is not None else "-",
+                ]
+            )
+
+        self.stdout.write(str(table))
+
+    def get_xml_file(self, xml_file):
+        if os.path.exists(xml_file):
+            return xml_file
+
+        self.stdout.write(
+            self.style.ERROR(f"The xml file cannot be found at: {xml_file}")
+        )
+        exit()
@@ -0,0 +1,49 @@
+import os
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from prettytable import PrettyTable
+
+from wagtail_wordpress_import.importers.xml_index import XmlIndex
+
+
+class Command(BaseCommand):
+    help = """Build the index of the item tags in the XML file.
+
+    The index records the position in the file of every item tag so an import
+    can read only selected items, see the --index and --post-ids options of
+    the import_xml command. The index is saved alongside the XML file.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("xml_file", type=str, help="The full path to your xml file")
+
+    def handle(self, **options):
+        xml_file_path = self.get_xml_file(f"{options['xml_file']}")
+        self.stdout.write(self.style.WARNING("Indexing ..."))
+
+        index = XmlIndex.build(xml_file_path)
+        index.save()
+
+        types_table = PrettyTable()
+        types_table.field_names = ["Post type", "Status", "Items"]
+        for (post_type, status), total in Counter(
+            (entry["post_type"], entry["status"]) for entry in index.items
+        ).most_common():
+            types_table.add_row([post_type, status, total])
+
+        self.stdout.write(str(types_table))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {len(index.items)} items, the index is here: {XmlIndex.get_index_path(xml_file_path)}"
+            )
+        )
+
+    def get_xml_file(self, xml_file):
+        if os.path.exists(xml_file):
+            return xml_file
+
+        self.stdout.write(
+            self.style.ERROR(f"The xml file cannot be found at: {xml_file}")
+        )
+        exit()
@@ -3,8 +3,11 @@ import os
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from wagtail_wordpress_import.importers.checkpoint import checkpoint_every
 from wagtail_wordpress_import.importers.wordpress import WordpressImporter
 from wagtail_wordpress_import.logger import Logger
+from wagtail_wordpress_import.progress import ImportProgress
+from wagtail_wordpress_import.timings import timings_enabled
 
 LOG_DIR = "log"
 
@@ -56,6 +59,73 @@ class Command(BaseCommand):
             help="The wordpress post statuse/s to import. Use a comma to separate multiple types",
             default="publish,draft",
         )
+        parser.add_argument(
+            "-r",
+            "--reader",
+            type=str,
+            help="The XML item reader to use, `iterparse`, `pulldom` or a dotted path to a reader class. The default is the WAGTAIL_WORDPRESS_IMPORT_ITEM_READER setting",
+            default=None,
+        )
+        parser.add_argument(
+            "-i",
+            "--index",
+            action="store_true",
+            help="Use the XML index to read only the items to import. The index is built if it doesn't exist or is out of date",
+        )
+        parser.add_argument(
+            "-p",
+            "--post-ids",
+            type=str,
+            help="The wordpress post ids to import. Use a comma to separate multiple ids. This uses the XML index",
+            default="",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Skip items that have not changed since they were last imported, and the import configuration has not changed",
+        )
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            help="The number of worker processes used to process the content of items while pages are saved",
+            default=1,
+        )
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            type=int,
+            help="The number of pages saved in each database transaction, other tags are saved with them",
+            default=1,
+        )
+        parser.add_argument(
+            "--checkpoint-every",
+            type=int,
+            help="Save a checkpoint after this number of items, so a failed import can be resumed with --resume. The default is the WAGTAIL_WORDPRESS_IMPORTER_CHECKPOINT_EVERY setting, 0 saves no checkpoints",
+            default=None,
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Resume the import from the last checkpoint saved for the xml file with the same options",
+        )
+        parser.add_argument(
+            "--timings",
+            action="store_true",
+            help="Time each stage of processing the items and report the timings at the end. The default is the WAGTAIL_WORDPRESS_IMPORTER_TIMINGS setting",
+        )
+        parser.add_argument(
+            "--status-file",
+            type=str,
+            help="The path to a JSON file the progress of the import is written to",
+            default=None,
+        )
+        parser.add_argument(
+            "--progress-interval",
+            type=float,
+            help="The number of seconds between progress reports. The default is the WAGTAIL_WORDPRESS_IMPORTER_PROGRESS_INTERVAL setting",
+            default=None,
+        )
 
     def handle(self, **options):
         if not getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN", ""):
@@ -66,20 +136,55 @@ class Command(BaseCommand):
             )
             exit()
         xml_file_path = self.get_xml_file(f"{options['xml_file']}")
-        logger = Logger(LOG_DIR)
-        importer = WordpressImporter(xml_file_path)
-        importer.run(
-            page_types=options["type"].split(","),
-            page_statuses=options["status"].split(","),
-            app_for_pages=options["app"],
-            model_for_pages=options["model"],
-            parent_id=options["parent_id"],
-            logger=logger,
+        progress = ImportProgress(
+            stream=self.stdout,
+            status_file=options["status_file"],
+            interval=options["progress_interval"],
+        )
+        # a line for each page is only written with --verbosity 2 or more
+        logger = Logger(
+            LOG_DIR,
+            progress=progress,
+            verbose=options["verbosity"] > 1,
+            timings=options["timings"] or timings_enabled(),
         )
+        logger.start_import_report()
+        importer = WordpressImporter(xml_file_path, item_reader=options["reader"])
+        try:
+            importer.run(
+                page_types=options["type"].split(","),
+                page_statuses=options["status"].split(","),
+                app_for_pages=options["app"],
+                model_for_pages=options["model"],
+                parent_id=options["parent_id"],
+                use_index=options["index"],
+                incremental=options["incremental"],
+                workers=options["workers"],
+                batch_size=options["batch_size"],
+                checkpoint_every=checkpoint_every()
+                if options["checkpoint_every"] is None
+                else options["checkpoint_every"],
+                resume=options["resume"],
+                post_ids=[
+                    int(post_id)
+                    for post_id in options["post_ids"].split(",")
+                    if post_id
+                ],
+                logger=logger,
+            )
+        except BaseException:
+            progress.finish(logger, state="failed")
+            raise
+        else:
+            progress.finish(logger)
+        finally:
+            # the rows written so far are kept if the import fails
+            logger.save_csv_import_report()
+            logger.save_csv_images_report()
+            logger.save_csv_pagelink_errors_report()
         logger.output_import_summary()
-        logger.save_csv_import_report()
-        logger.save_csv_images_report()
-        logger.save_csv_pagelink_errors_report()
+        logger.output_timings_report()
+        logger.save_timings_report()
 
     def get_xml_file(self, xml_file):
         if os.path.exists(xml_file):
@@ -0,0 +1,433 @@
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import unquote, urlsplit
+
+import requests
+from django.conf import settings
+from django.core.files.temp import NamedTemporaryFile
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_session = None
+_session_pid = None
+_active_fetcher = None
+_active_index = None
+
+# the size WordPress adds to the filename of resized images, e.g. image-300x200.jpg
+# and the suffix of large images it has scaled down, e.g. image-scaled.jpg
+WORDPRESS_SIZE_SUFFIX_PATTERN = re.compile(r"-(\d+x\d+|scaled)(?=\.\w+$)")
+
+
+def media_fetch_workers():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_MEDIA_FETCH_WORKERS", 8)
+
+
+def media_fetch_per_host():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_MEDIA_FETCH_PER_HOST", 4)
+
+
+def media_fetch_retries():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_MEDIA_FETCH_RETRIES", 3)
+
+
+def media_fetch_backoff():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_MEDIA_FETCH_BACKOFF", 0.5)
+
+
+def media_max_size():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_MEDIA_MAX_SIZE", None)
+
+
+def media_source():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_MEDIA_SOURCE", None)
+
+
+def uploads_dir():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_UPLOADS_DIR", None)
+
+
+def uploads_url_path():
+    return getattr(
+        settings, "WAGTAIL_WORDPRESS_IMPORTER_UPLOADS_URL_PATH", "/wp-content/uploads/"
+    )
+
+
+def get_session():
+    """
+    Return the requests Session shared by all media requests, so connections
+    to the source site are kept alive and pooled.
+
+    Failed connections and 429 and 5xx responses are retried with an
+    exponential backoff. A process started after the session was created gets
+    its own session rather than sharing the parent's connections.
+    """
+    global _session, _session_pid
+
+    if _session is None or _session_pid != os.getpid():
+        retry = Retry(
+            total=media_fetch_retries(),
+            backoff_factor=media_fetch_backoff(),
+            status_forcelist=[429, 500, 502, 503, 504],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_maxsize=max(media_fetch_workers(), 10), max_retries=retry
+        )
+        _session = requests.Session()
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+        _session_pid = os.getpid()
+
+    return _session
+
+
+class MediaTooLarge(Exception):
+    pass
+
+
+def stream_to_file(response, max_size=None, chunk_size=64 * 1024):
+    """
+    Write the body of the response to a temporary file in chunks, rather than
+    reading it into memory. Return the file, at the start, and the sha256
+    hex digest of the body.
+
+    Raise MediaTooLarge if the body is larger than max_size bytes, from the
+    Content-Length header before any of it is read if there is one.
+    """
+    try:
+        content_length = response.headers.get("content-length", "")
+        if max_size and content_length.isdigit() and int(content_length) > max_size:
+            raise MediaTooLarge(content_length)
+
+        media_file = NamedTemporaryFile(delete=True)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            for chunk in response.iter_content(chunk_size):
+                size += len(chunk)
+                if max_size and size > max_size:
+                    raise MediaTooLarge(size)
+                digest.update(chunk)
+                media_file.write(chunk)
+        except BaseException:
+            media_file.close()
+            raise
+    finally:
+        response.close()
+
+    media_file.flush()
+    media_file.seek(0)
+    return media_file, digest.hexdigest()
+
+
+def hash_file(media_file, chunk_size=64 * 1024):
+    """Return the sha256 hex digest of the file, leaving it at the start."""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: media_file.read(chunk_size), b""):
+        digest.update(chunk)
+    media_file.seek(0)
+    return digest.hexdigest()
+
+
+def close_media_file(future):
+    if not future.cancelled() and future.exception() is None:
+        media_file = future.result()[0]
+        if media_file:
+            media_file.close()
+
+
+class MediaFetcher:
+    """
+    Fetch media urls in a pool of threads ahead of the image and document
+    linkers needing them.
+
+    fetch:
+        The function to fetch a url, it returns a (file, valid, content type,
+        digest) tuple like block_builder_defaults.download_media.
+
+    At most max_per_host requests are made to each host at the same time.
+    """
+
+    def __init__(self, fetch, max_workers=None, max_per_host=None):
+        self.fetch = fetch
+        self.executor = ThreadPoolExecutor(max_workers or media_fetch_workers())
+        max_per_host = max_per_host or media_fetch_per_host()
+        self.host_limits = defaultdict(lambda: threading.BoundedSemaphore(max_per_host))
+        self.host_limits_lock = threading.Lock()
+        self.prefetched = {}
+        self.groups = {}  # the group each url was last prefetched for
+
+    def prefetch(self, urls, group=None):
+        """Start fetching the urls. The results that aren't used can be
+        discarded by the group, e.g. once the items they're for are imported."""
+        for url in urls:
+            if url not in self.prefetched:
+                self.prefetched[url] = self.executor.submit(self.fetch_in_thread, url)
+            self.groups[url] = group
+
+    def fetch_in_thread(self, url):
+        with self.host_limits_lock:
+            host_limit = self.host_limits[urlsplit(url).netloc]
+
+        with host_limit:
+            return self.fetch(url)
+
+    def get(self, url):
+        """Return the prefetched result for the url, or None if it
+        wasn't prefetched. Each result is only returned once."""
+        self.groups.pop(url, None)
+        future = self.prefetched.pop(url, None)
+        if future is not None:
+            return future.result()
+
+    def discard(self, group=None):
+        """Forget the prefetched results that weren't used, only those of the
+        group if one is given."""
+        for url in list(self.prefetched):
+            if group is None or self.groups.get(url) == group:
+                self.groups.pop(url, None)
+                future = self.prefetched.pop(url)
+                if not future.cancel():
+                    future.add_done_callback(close_media_file)
+
+    def shutdown(self):
+        self.discard()
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        activate_media_fetcher(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        activate_media_fetcher(None)
+        self.shutdown()
+
+
+def activate_media_fetcher(fetcher):
+    global _active_fetcher
+    _active_fetcher = fetcher
+
+
+def get_media_fetcher():
+    """Return the MediaFetcher being used by the import, if there is one."""
+    return _active_fetcher
+
+
+class FileSystemMediaSource:
+    """
+    Open media from a local copy of the WordPress uploads folder, instead of
+    downloading it from the source site.
+
+    A url with a path containing the uploads url path, e.g.
+    https://www.example.com/wp-content/uploads/2021/07/image.jpg
+    is found at 2021/07/image.jpg in the uploads folder, whatever the host is.
+    """
+
+    def __init__(self, root=None, url_path=None):
+        self.root = os.path.abspath(root or uploads_dir())
+        self.url_path = url_path or uploads_url_path()
+
+    def get_path(self, url):
+        """Return the local path for the url, or None if there isn't one."""
+        path = unquote(urlsplit(url).path)
+        if self.url_path not in path:
+            return None
+
+        local_path = os.path.abspath(
+            os.path.join(self.root, path.split(self.url_path, 1)[1])
+        )
+        # don't follow .. out of the uploads folder
+        if not local_path.startswith(self.root + os.sep):
+            return None
+        if not os.path.isfile(local_path):
+            return None
+        return local_path
+
+    def has(self, url):
+        return self.get_path(url) is not None
+
+    def open(self, url):
+        """Return a (file, content type) tuple for the url, or None if the file
+        isn't in the uploads folder. The file is opened for reading in binary mode.
+        """
+        local_path = self.get_path(url)
+        if local_path is None:
+            return None
+        content_type, encoding = mimetypes.guess_type(local_path)
+        return open(local_path, "rb"), content_type
+
+
+MEDIA_SOURCE_SETTINGS = [
+    "WAGTAIL_WORDPRESS_IMPORTER_MEDIA_SOURCE",
+    "WAGTAIL_WORDPRESS_IMPORTER_UPLOADS_DIR",
+    "WAGTAIL_WORDPRESS_IMPORTER_UPLOADS_URL_PATH",
+]
+
+
+@lru_cache(maxsize=None)
+def get_media_source():
+    """
+    Return an instance of the class in the WAGTAIL_WORDPRESS_IMPORTER_MEDIA_SOURCE
+    setting, or None if media is only downloaded from the source site.
+
+    The instance is created once, and again when one of its settings changes.
+    """
+    source_class = media_source()
+    if source_class:
+        return import_string(source_class)()
+
+
+def clear_media_source():
+    get_media_source.cache_clear()
+
+
+@receiver(setting_changed)
+def clear_media_source_on_setting_changed(setting, **kwargs):
+    if setting in MEDIA_SOURCE_SETTINGS:
+        clear_media_source()
+
+
+def normalise_media_url(url):
+    """
+    Return the url without the scheme, a leading www., the query string
+    or the size suffix WordPress adds to resized images, so every size of
+    an image has the same normalised url.
+    """
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host + WORDPRESS_SIZE_SUFFIX_PATTERN.sub("", parts.path)
+
+
+def is_original_media_url(url):
+    """Return whether the url isn't one of the sizes WordPress resizes
+    an image to."""
+    return not WORDPRESS_SIZE_SUFFIX_PATTERN.search(urlsplit(url).path)
+
+
+class MediaIndex:
+    """
+    An in memory index of the ImportedMedia records, to find an image or
+    document that has already been imported by its source url, normalised
+    url or sha256 digest without a query for each media url.
+
+    Only the original of an image is found by the normalised url of another
+    size, e.g. image-300x200.jpg is found as the imported image.jpg, but
+    image.jpg isn't found as an imported image-300x200.jpg.
+
+    The image and document instances are cached once they've been found.
+    """
+
+    def __init__(self):
+        self.urls = {}
+        self.normalised_urls = {}
+        self.digests = {}
+        self.objects = {}
+        self.object_ids = set()
+
+    @classmethod
+    def load(cls):
+        """Load all the ImportedMedia records with one query."""
+        from wagtail_wordpress_import.models import ImportedMedia
+
+        index = cls()
+        for (
+            media_type,
+            source_url,
+            normalised_url,
+            sha256,
+            object_id,
+        ) in ImportedMedia.objects.order_by("id").values_list(
+            "media_type", "source_url", "normalised_url", "sha256", "object_id"
+        ):
+            index.urls[(media_type, source_url)] = object_id
+            if is_original_media_url(source_url):
+                index.normalised_urls[(media_type, normalised_url)] = object_id
+            if sha256:
+                index.digests[(media_type, sha256)] = object_id
+            index.object_ids.add((media_type, object_id))
+        return index
+
+    def get(self, media_type, url):
+        """Return the id of the image or document for the url, or None."""
+        object_id = self.urls.get((media_type, url))
+        if object_id is None:
+            object_id = self.normalised_urls.get((media_type, normalise_media_url(url)))
+        return object_id
+
+    def is_recorded(self, media_type, object_id):
+        """Return whether the image or document was imported from a recorded url."""
+        return (media_type, object_id) in self.object_ids
+
+    def get_object(self, model, media_type, url=None, digest=None):
+        """Return the image or document instance for the url or digest, or
+        None if it hasn't been imported or has since been deleted."""
+        if url is not None:
+            object_id = self.get(media_type, url)
+        else:
+            object_id = self.digests.get((media_type, digest))
+        if object_id is None:
+            return None
+
+        if (model, object_id) not in self.objects:
+            self.objects[(model, object_id)] = model.objects.filter(
+                pk=object_id
+            ).first()
+        return self.objects[(model, object_id)]
+
+    def add(self, media_type, url, digest, instance):
+        """
+        Record that the media at the url is the image or document instance.
+        The digest is empty for media found by its title without fetching it.
+
+        If another import has recorded the url since the index was loaded its
+        record is kept, and the url is found as the media it recorded.
+        """
+        from wagtail_wordpress_import.models import ImportedMedia
+
+        normalised_url = normalise_media_url(url)
+        imported_media, created = ImportedMedia.objects.get_or_create(
+            media_type=media_type,
+            source_url=url,
+            defaults={
+                "normalised_url": normalised_url,
+                "sha256": digest,
+                "object_id": instance.pk,
+            },
+        )
+        self.urls[(media_type, url)] = imported_media.object_id
+        if is_original_media_url(url):
+            self.normalised_urls[
+                (media_type, normalised_url)
+            ] = imported_media.object_id
+        if digest:
+            self.digests[(media_type, digest)] = instance.pk
+        self.object_ids.add((media_type, instance.pk))
+        self.objects[(type(instance), instance.pk)] = instance
+
+    def __enter__(self):
+        activate_media_index(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        activate_media_index(None)
+
+
+def activate_media_index(index):
+    global _active_index
+    _active_index = index
+
+
+def get_media_index():
+    """Return the MediaIndex being used by the import, if there is one."""
+    return _active_index
@@ -0,0 +1,48 @@
+# Generated by Django 4.1.13 on 2026-10-18 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportedMedia",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "media_type",
+                    models.CharField(
+                        choices=[("image", "Image"), ("document", "Document")],
+                        max_length=20,
+                    ),
+                ),
+                ("source_url", models.TextField()),
+                ("normalised_url", models.TextField()),
+                ("sha256", models.CharField(db_index=True, max_length=64)),
+                ("object_id", models.IntegerField()),
+            ],
+            options={
+                "verbose_name_plural": "imported media",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="importedmedia",
+            constraint=models.UniqueConstraint(
+                fields=("media_type", "source_url"),
+                name="unique_imported_media_source_url",
+            ),
+        ),
+    ]
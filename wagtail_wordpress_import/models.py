@@ -1,6 +1,8 @@
 from django.db import models
 from wagtail import VERSION as WAGTAIL_VERSION
 
+from wagtail_wordpress_import.importers.page_links import get_link_path_hash, split_link
+
 if WAGTAIL_VERSION >= (3, 0):
     from wagtail.admin.panels import FieldPanel, FieldRowPanel
     from wagtail.models import Page
@@ -10,14 +12,20 @@ else:
 
 
 class WPImportedPageMixin(Page):
-    wp_post_id = models.IntegerField(blank=True, null=True)
+    wp_post_id = models.IntegerField(blank=True, null=True, db_index=True)
     wp_post_type = models.CharField(max_length=255, blank=True, null=True)
     wp_link = models.TextField(blank=True, null=True)
+    # wp_link is too long to index on every database, so the hash of its
+    # normalised path is indexed instead, it's set when the page is saved
+    wp_link_hash = models.CharField(
+        max_length=40, blank=True, null=True, db_index=True, editable=False
+    )
     wp_raw_content = models.TextField(blank=True, null=True)
     wp_processed_content = models.TextField(blank=True, null=True)
     wp_block_json = models.TextField(blank=True, null=True)
     wp_normalized_styles = models.TextField(blank=True, null=True)
     wp_post_meta = models.JSONField(blank=True, null=True)
+    wp_import_digest = models.CharField(max_length=64, blank=True, null=True)
 
     class Meta:
         abstract = True
@@ -27,6 +35,25 @@ class WPImportedPageMixin(Page):
             "import_wordpress_data() method not implemented in your page model"
         )
 
+    def save(self, *args, **kwargs):
+        self.wp_link_hash = get_link_path_hash(self.wp_link)
+        return super().save(*args, **kwargs)
+
+    @classmethod
+    def filter_by_wp_link(cls, link):
+        """
+        Return the pages for a link to a WordPress page, using the indexes
+        rather than comparing every wp_link. As with the links rewritten by
+        the import, the host is ignored and a ?p=ID or ?page_id=ID permalink
+        is found by its post id.
+        """
+        parts = split_link(link)
+        if parts is None:
+            return cls.objects.none()
+        if parts[2] is not None:
+            return cls.objects.filter(wp_post_id=parts[2])
+        return cls.objects.filter(wp_link_hash=get_link_path_hash(link))
+
     if WAGTAIL_VERSION >= (3, 0):
         wordpress_panels = [
             FieldRowPanel(
@@ -59,3 +86,30 @@ class WPImportedPageMixin(Page):
             FieldPanel("wp_raw_content", classname="full"),
             FieldPanel("wp_post_meta", classname="full"),
         ]
+
+
+class ImportedMedia(models.Model):
+    """
+    A record of an image or document imported from a WordPress media url,
+    so the same media isn't imported again from another url or filename.
+    """
+
+    MEDIA_TYPE_CHOICES = [("image", "Image"), ("document", "Document")]
+
+    media_type = models.CharField(max_length=20, choices=MEDIA_TYPE_CHOICES)
+    source_url = models.TextField()
+    normalised_url = models.TextField()
+    sha256 = models.CharField(max_length=64, db_index=True)
+    object_id = models.IntegerField()
+
+    class Meta:
+        verbose_name_plural = "imported media"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["media_type", "source_url"],
+                name="unique_imported_media_source_url",
+            )
+        ]
+
+    def __str__(self):
+        return self.source_url
@@ -0,0 +1,71 @@
+from django.db.migrations.operations.base import Operation
+
+from wagtail_wordpress_import.importers.page_links import get_link_path_hash
+
+
+class PopulateWPLinkHash(Operation):
+    """
+    A migration operation setting the wp_link_hash of the pages of a page
+    model using WPImportedPageMixin that were imported before the field was
+    added. Add it to the migration that adds wp_link_hash to your page model:
+
+        operations = [
+            ...
+            PopulateWPLinkHash("postpage"),
+        ]
+
+    The pages are updated batch_size at a time, with bulk_update(). It does
+    nothing when the migration is reversed.
+    """
+
+    reversible = True
+    reduces_to_sql = False
+
+    def __init__(self, model_name, batch_size=1000):
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+    def deconstruct(self):
+        kwargs = {"model_name": self.model_name}
+        if self.batch_size != 1000:
+            kwargs["batch_size"] = self.batch_size
+        return self.__class__.__name__, [], kwargs
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+
+        pages = (
+            model._base_manager.using(schema_editor.connection.alias)
+            .only("pk", "wp_link", "wp_link_hash")
+            .order_by("pk")
+        )
+        changed = []
+        for page in pages.iterator(chunk_size=self.batch_size):
+            wp_link_hash = get_link_path_hash(page.wp_link)
+            if page.wp_link_hash != wp_link_hash:
+                page.wp_link_hash = wp_link_hash
+                changed.append(page)
+            if len(changed) >= self.batch_size:
+                model._base_manager.using(schema_editor.connection.alias).bulk_update(
+                    changed, ["wp_link_hash"]
+                )
+                changed = []
+        if changed:
+            model._base_manager.using(schema_editor.connection.alias).bulk_update(
+                changed, ["wp_link_hash"]
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        pass
+
+    def describe(self):
+        return f"Set the wp_link_hash of the existing {self.model_name} pages"
+
+    @property
+    def migration_name_fragment(self):
+        return f"populate_{self.model_name.lower()}_wp_link_hash"
@@ -1,40 +1,66 @@
+from functools import lru_cache
+
 from bleach.sanitizer import Cleaner
 
-from wagtail_wordpress_import.prefilters.handle_shortcodes import SHORTCODE_HANDLERS
+from wagtail_wordpress_import.prefilters.handle_shortcodes import get_shortcode_handlers
 
 
 def filter_bleach_clean(html, options=None):
     """
     We do a final clean up on the processed html to be on the safe side.
     """
+    return get_cleaner(options).clean(html)
 
-    CONF_ALLOWED_TAGS = ALLOWED_TAGS
-    if options and options.get("ADDITIONAL_ALLOWED_TAGS"):
-        CONF_ALLOWED_TAGS += options["ADDITIONAL_ALLOWED_TAGS"]
 
-    # Registered shortcode handlers generate custom tags
-    # so they need to be added to ALLOWED_TAGS
+def get_cleaner(options=None):
+    """
+    Return the Cleaner for the allowed tags, attributes and styles with
+    the additions in options. A Cleaner is only built once for each distinct
+    options and set of shortcode handlers, and reused for every item.
+    """
+    return build_cleaner(freeze_options(options or {}), get_shortcode_handlers())
 
-    for handler in SHORTCODE_HANDLERS:
-        if handler.is_top_level_html_tag:
-            CONF_ALLOWED_TAGS.append(handler().element_name)
 
-    CONF_ALLOWED_ATTRIBUTES = ALLOWED_ATTRIBUTES
-    if options and options.get("ADDITIONAL_ALLOWED_ATTRIBUTES"):
-        CONF_ALLOWED_ATTRIBUTES.update(options["ADDITIONAL_ALLOWED_ATTRIBUTES"])
+def freeze_options(value):
+    """Return the options with the dicts and lists as tuples, so they can be
+    a cache key. A dict becomes a tuple of its (key, value) pairs."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze_options(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_options(item) for item in value)
+    return value
 
-    CONF_ALLOWED_STYLES = ALLOWED_STYLES
-    if options and options.get("ADDITIONAL_ALLOWED_STYLES"):
-        CONF_ALLOWED_STYLES += options["ADDITIONAL_ALLOWED_STYLES"]
 
-    cleaned = Cleaner(
-        tags=CONF_ALLOWED_TAGS,
-        attributes=CONF_ALLOWED_ATTRIBUTES,
-        styles=CONF_ALLOWED_STYLES,
-    )
+@lru_cache(maxsize=32)
+def build_cleaner(options, shortcode_handlers):
+    """options are the options from freeze_options()."""
+    options = dict(options)
+
+    tags = ALLOWED_TAGS + list(options.get("ADDITIONAL_ALLOWED_TAGS") or ())
 
-    cleaned_html = cleaned.clean(html)
-    return cleaned_html
+    # Registered shortcode handlers generate custom tags
+    # so they need to be added to the allowed tags
+    tags += [
+        handler.element_name
+        for handler in shortcode_handlers
+        if handler.is_top_level_html_tag
+    ]
+
+    attributes = {
+        **ALLOWED_ATTRIBUTES,
+        **{
+            tag: list(names)
+            for tag, names in options.get("ADDITIONAL_ALLOWED_ATTRIBUTES") or ()
+        },
+    }
+
+    styles = ALLOWED_STYLES + list(options.get("ADDITIONAL_ALLOWED_STYLES") or ())
+
+    return Cleaner(
+        tags=list(dict.fromkeys(tags)),
+        attributes=attributes,
+        styles=styles,
+    )
 
 
 ALLOWED_TAGS = [
@@ -1,6 +1,11 @@
 import re
+from functools import lru_cache
 
 from wagtail_wordpress_import.block_builder_defaults import get_or_save_image
+from wagtail_wordpress_import.shortcodes import (
+    get_shortcode_tokenizer,
+    pair_shortcode_tags,
+)
 
 SHORTCODE_HANDLERS = []
 
@@ -175,11 +180,98 @@ class CaptionHandler(BlockShortcodeHandler):
         }
 
 
+class BlockShortcodeScanner:
+    """
+    Replace the shortcodes of all the registered handlers with their custom
+    HTML tags in a single scan of the html, rather than a scan for each handler.
+
+    Handlers that override pre_filter are run after the scan, in the order
+    they were registered. If more than one handler has the same shortcode_name
+    the first one registered is used.
+    """
+
+    def __init__(self, handlers):
+        self.element_names = {}
+        self.other_handlers = []
+        for handler in handlers:
+            if type(handler).pre_filter is not BlockShortcodeHandler.pre_filter:
+                self.other_handlers.append(handler)
+            else:
+                self.element_names.setdefault(
+                    handler.shortcode_name, handler.element_name
+                )
+
+        self.tokenizer = None
+        if self.element_names:
+            self.tokenizer = get_shortcode_tokenizer(tuple(self.element_names))
+
+    def pre_filter(self, html):
+        if self.tokenizer and "[" in html:
+            html = self.replace_tags(html)
+        for handler in self.other_handlers:
+            html = handler.pre_filter(html)
+        return html
+
+    def replace_tags(self, html):
+        """Given an input:
+
+            "Preface [foo bar=1]some [foo]nested[/foo] text[/foo] [foo /]"
+
+        this function will return
+
+            "Preface <wagtail_block_foo bar=1>some <wagtail_block_foo>nested</wagtail_block_foo>
+            text</wagtail_block_foo> <wagtail_block_foo></wagtail_block_foo>"
+        """
+        replacements = []
+        for opening, closing in pair_shortcode_tags(html, self.tokenizer):
+            element_name = self.element_names[opening.group("name")]
+            start_tag = "<" + element_name + opening.group("attrs") + ">"
+            end_tag = "</" + element_name + ">"
+            if closing is None:
+                replacements.append((opening, start_tag + end_tag))
+            else:
+                replacements.append((opening, start_tag))
+                replacements.append((closing, end_tag))
+
+        if not replacements:
+            return html
+
+        replacements.sort(key=lambda replacement: replacement[0].start())
+        parts = []
+        position = 0
+        for match, replacement in replacements:
+            parts.append(html[position : match.start()])
+            parts.append(replacement)
+            position = match.end()
+        parts.append(html[position:])
+        return "".join(parts)
+
+
+def get_shortcode_handlers():
+    """Return a tuple of an instance of each registered handler class, the
+    instances are only created again when a handler is registered."""
+    return build_shortcode_handlers(tuple(SHORTCODE_HANDLERS))
+
+
+@lru_cache(maxsize=8)
+def build_shortcode_handlers(handler_classes):
+    return tuple(handler() for handler in handler_classes)
+
+
+def get_shortcode_scanner():
+    """Return the BlockShortcodeScanner for the registered handlers, it's only
+    built again when a handler is registered."""
+    return build_shortcode_scanner(get_shortcode_handlers())
+
+
+@lru_cache(maxsize=8)
+def build_shortcode_scanner(handlers):
+    return BlockShortcodeScanner(handlers)
+
+
 def filter_transform_shortcodes(html, options=None):
     """
     html: is the body content from one Wordpress item
     options: not implemented
     """
-    for handler in SHORTCODE_HANDLERS:
-        html = handler().pre_filter(html)
-    return html
+    return get_shortcode_scanner().pre_filter(html)
@@ -3,6 +3,74 @@ import re
 from django.utils.html import escape
 from django.utils.text import normalize_newlines
 
+# The patterns are compiled once here rather than on each call, the allblocks
+# alternation makes them too long to rely on the re module's cache.
+# Patterns start with a literal < where they can, so the regex engine skips
+# to the next < instead of trying to match at every character. Replacements
+# using a group are functions, python < 3.12 expands a template for each match.
+ALLBLOCKS = r"(?:table|thead|tfoot|caption|col|colgroup|tbody|tr|td|th|div|dl|dd|dt|ul|ol|li|pre|select|option|form|map|area|blockquote|address|math|style|input|p|h[1-6]|hr|fieldset|legend|section|article|aside|hgroup|header|footer|nav|figure|figcaption|details|menu|summary)"
+# a block tag without its leading <
+BLOCK_TAG = r"(/?" + ALLBLOCKS + r"[^>]*>)"
+
+DOUBLE_BR_PATTERN = re.compile(r"<br />\s*<br />")
+OPEN_OR_CLOSE_BLOCK_PATTERN = re.compile(
+    r"<(?:(" + ALLBLOCKS + r"[^>]*>)|/(" + ALLBLOCKS + r">))"
+)
+CLOSE_BLOCK_PATTERN = re.compile(r"(</" + ALLBLOCKS + r">)")
+PARAM_PATTERN = re.compile(r"\s*<param([^>]*)>\s*")
+EMBED_CLOSE_PATTERN = re.compile(r"\s*</embed>\s*")
+PARAGRAPH_SPLIT_PATTERN = re.compile(r"\n\s*\n")
+EMPTY_PARAGRAPH_PATTERN = re.compile(r"<p>\s*</p>")
+UNCLOSED_PARAGRAPH_PATTERN = re.compile(r"<p>([^<]+)</(div|address|form)>")
+PARAGRAPH_AROUND_BLOCK_PATTERN = re.compile(r"<p>\s*<" + BLOCK_TAG + r"\s*</p>")
+PARAGRAPH_AROUND_LI_PATTERN = re.compile(r"<p>(<li.+?)</p>")
+PARAGRAPH_BLOCKQUOTE_PATTERN = re.compile(r"<p><blockquote([^>]*)>", re.IGNORECASE)
+PARAGRAPH_BEFORE_BLOCK_PATTERN = re.compile(r"<p>\s*<" + BLOCK_TAG)
+PARAGRAPH_AFTER_BLOCK_PATTERN = re.compile("<" + BLOCK_TAG + r"\s*</p>")
+SCRIPT_STYLE_PATTERN = re.compile(r"<(script|style).*?</\1>", re.DOTALL)
+NEWLINE_PATTERN = re.compile(r"(?<!<br />)\s*\n")
+BR_AFTER_BLOCK_PATTERN = re.compile("<" + BLOCK_TAG + r"\s*<br />")
+BR_BEFORE_BLOCK_PATTERN = re.compile(
+    r"<br />(\s*</?(?:p|li|div|dl|dd|dt|th|pre|td|ul|ol)[^>]*>)"
+)
+PRE_PATTERN = re.compile(r"(<pre[^>]*>)(.*?)</pre>", re.IGNORECASE | re.DOTALL)
+TRAILING_PARAGRAPH_PATTERN = re.compile(r"\n</p>$")
+
+
+def _space_block_tag(match):
+    if match.group(1) is None:
+        return "</" + match.group(2) + "\n\n"
+    # an opening tag can end with a closing tag when it's missing its >,
+    # e.g. <p</div>, which is spaced as a closing tag too
+    tag = "<" + match.group(1)
+    if "</" in tag:
+        tag = CLOSE_BLOCK_PATTERN.sub("\\1\n\n", tag)
+    return "\n" + tag
+
+
+def _block_tag(match):
+    return "<" + match.group(1)
+
+
+def _first_group(match):
+    return match.group(1)
+
+
+def _blockquote_tag(match):
+    return "<blockquote" + match.group(1) + ">"
+
+
+def _preserve_newlines(match):
+    return match.group(0).replace("\n", "<WPPreserveNewline />")
+
+
+def _clean_pre(match):
+    text = match.group(2)
+    text = text.replace("<br />", "")
+    text = text.replace("<p>", "\n")
+    text = text.replace("</p>", "")
+    return match.group(1) + escape(text) + "</pre>"
+
 
 def filter_linebreaks_wp(pee, options=None):
     """
@@ -11,120 +79,52 @@ def filter_linebreaks_wp(pee, options=None):
 
     param: `options` NOT IMPLEMENTED
     """
-    # print(pee)
-    # seeing an error here when the first charcter is a int
-    # if (pee.strip() == ""):
-    #     return ""
-    pee = normalize_newlines(pee)
+    pee = str(pee)
+    if "\r" in pee:
+        pee = normalize_newlines(pee)
     pee = pee + "\n"
-    pee = re.sub(r"<br />\s*<br />", "\n\n", pee)
-    allblocks = r"(?:table|thead|tfoot|caption|col|colgroup|tbody|tr|td|th|div|dl|dd|dt|ul|ol|li|pre|select|option|form|map|area|blockquote|address|math|style|input|p|h[1-6]|hr|fieldset|legend|section|article|aside|hgroup|header|footer|nav|figure|figcaption|details|menu|summary)"
-    pee = re.sub(
-        r"(<" + allblocks + "[^>]*>)",
-        lambda m: "\n" + m.group(1) if m.group(1) else "\n",
-        pee,
-    )
-    pee = re.sub(
-        r"(</" + allblocks + ">)",
-        lambda m: m.group(1) + "\n\n" if m.group(1) else "\n\n",
-        pee,
+    if "<br />" in pee:
+        pee = DOUBLE_BR_PATTERN.sub("\n\n", pee)
+    # space out the opening and closing block tags in one scan
+    pee = OPEN_OR_CLOSE_BLOCK_PATTERN.sub(_space_block_tag, pee)
+    if "<object" in pee:
+        pee = PARAM_PATTERN.sub(r"<param\1>", pee)  # no pee inside object/embed
+        pee = EMBED_CLOSE_PATTERN.sub("</embed>", pee)
+    # splitting on a blank line removes the whole run of newlines and
+    # whitespace between the paragraphs, so duplicates needn't be removed first
+    pee = "".join(
+        [
+            "<p>%s</p>\n" % tinkle.strip("\n")
+            for tinkle in PARAGRAPH_SPLIT_PATTERN.split(pee)
+        ]
     )
-    # pee = pee.replace("\r\n", "\n")
-    # pee = pee.replace("\r", "\n") #these taken care of by normalize_newlines
-    if pee.find("<object") != -1:
-        pee = re.sub(
-            r"\s*<param([^>]*)>\s*",
-            lambda m: "<param%s>" % (m.group(1) if m.group(1) else "",),
-            pee,
-        )  # no pee inside object/embed
-        pee = re.sub(r"\s*</embed>\s*", "</embed>", pee)
-    pee = re.sub(r"\n\n+", "\n\n", pee)  # take care of duplicates
-    pees = re.split(
-        r"\n\s*\n", pee
-    )  # since PHP has a PREG_SPLIT_NO_EMPTY, may need to go through and drop any empty strings
-    # pees = [p for p in pees if p]
-    pee = "".join(["<p>%s</p>\n" % tinkle.strip("\n") for tinkle in pees])
-    pee = re.sub(
-        r"<p>\s*</p>", "", pee
-    )  # under certain strange conditions it could create a P of entirely whitespace
-    pee = re.sub(
-        r"<p>([^<]+)</(div|address|form)>",
-        lambda m: "<p>%s</p></%s>"
-        % (
-            (lambda x: x.group(1) if x.group(1) else "")(m),
-            (lambda x: x.group(2) if x.group(2) else "")(m),
-        ),
-        pee,
-    )
-    pee = re.sub(
-        r"<p>\s*(</?" + allblocks + r"[^>]*>)\s*</p>",
-        lambda m: m.group(1) if m.group(1) else "",
-        pee,
+    # under certain strange conditions it could create a P of entirely whitespace
+    pee = EMPTY_PARAGRAPH_PATTERN.sub("", pee)
+    if "</div>" in pee or "</address>" in pee or "</form>" in pee:
+        pee = UNCLOSED_PARAGRAPH_PATTERN.sub(r"<p>\1</p></\2>", pee)
+    pee = PARAGRAPH_AROUND_BLOCK_PATTERN.sub(
+        _block_tag, pee
     )  # don't pee all over a tag
-    pee = re.sub(
-        r"<p>(<li.+?)</p>", lambda m: m.group(1) if m.group(1) else "", pee
-    )  # problem with nested lists
-    pee = re.sub(
-        r"<p><blockquote([^>]*)>",
-        # lambda m: "<blockquote%s><p>" % (m.group(1) if m.group(1) else "",),
-        # found this not to our liking as it puts a p tag around the blockquote content
-        lambda m: "<blockquote%s>" % (m.group(1) if m.group(1) else "",),
-        pee,
-        flags=re.IGNORECASE,
-    )
-    # pee = pee.replace("</blockquote></p>", "</p></blockquote>")
-    # found this not to our liking as it puts a p tag around the blockquote content
+    if "<p><li" in pee:
+        pee = PARAGRAPH_AROUND_LI_PATTERN.sub(
+            _first_group, pee
+        )  # problem with nested lists
+    # the blockquote content isn't wrapped in a p tag, as wpautop does
+    pee = PARAGRAPH_BLOCKQUOTE_PATTERN.sub(_blockquote_tag, pee)
     pee = pee.replace("</blockquote></p>", "</blockquote>")
-    pee = re.sub(
-        r"<p>\s*(</?" + allblocks + r"[^>]*>)",
-        lambda m: m.group(1) if m.group(1) else "",
-        pee,
-    )
-    pee = re.sub(
-        r"(</?" + allblocks + r"[^>]*>)\s*</p>",
-        lambda m: m.group(1) if m.group(1) else "",
-        pee,
-    )
-
-    def _autop_newline_preservation_helper(matches):
-        return matches.group(0).replace("\n", "<WPPreserveNewline />")
+    pee = PARAGRAPH_BEFORE_BLOCK_PATTERN.sub(_block_tag, pee)
+    pee = PARAGRAPH_AFTER_BLOCK_PATTERN.sub(_block_tag, pee)
 
-    pee = re.sub(
-        r"<(script|style).*?</\1>",
-        _autop_newline_preservation_helper,
-        pee,
-        flags=re.DOTALL,
-    )
-    pee = re.sub(r"(?<!<br />)\s*\n", "<br />\n", pee)  # make line breaks
-    pee = pee.replace("<WPPreserveNewline />", "\n")
+    preserve_newlines = "<script" in pee or "<style" in pee
+    if preserve_newlines:
+        pee = SCRIPT_STYLE_PATTERN.sub(_preserve_newlines, pee)
+    pee = NEWLINE_PATTERN.sub("<br />\n", pee)  # make line breaks
+    if preserve_newlines:
+        pee = pee.replace("<WPPreserveNewline />", "\n")
 
-    pee = re.sub(
-        r"(</?" + allblocks + r"[^>]*>)\s*<br />",
-        lambda m: m.group(1) if m.group(1) else "",
-        pee,
-    )
-    pee = re.sub(
-        r"<br />(\s*</?(?:p|li|div|dl|dd|dt|th|pre|td|ul|ol)[^>]*>)",
-        lambda m: m.group(1) if m.group(1) else "",
-        pee,
-    )
-    if pee.find("<pre") != -1:
-
-        def clean_pre(m):
-            if m.group(1) and m.group(2):
-                text = m.group(2)
-                text = text.replace("<br />", "")
-                text = text.replace("<p>", "\n")
-                text = text.replace("</p>", "")
-                text = m.group(1) + escape(text) + "</pre>"
-            else:
-                text = m.group(0)
-                text = text.replace("<br />", "")
-                text = text.replace("<p>", "\n")
-                text = text.replace("</p>", "")
-
-            return text
-
-        pee = re.sub("(?is)(<pre[^>]*>)(.*?)</pre>", clean_pre, pee)
-    pee = re.sub(r"\n</p>$", "</p>", pee)
+    pee = BR_AFTER_BLOCK_PATTERN.sub(_block_tag, pee)
+    pee = BR_BEFORE_BLOCK_PATTERN.sub(_first_group, pee)
+    if "<pre" in pee:
+        pee = PRE_PATTERN.sub(_clean_pre, pee)
+    pee = TRAILING_PARAGRAPH_PATTERN.sub("</p>", pee)
     return pee
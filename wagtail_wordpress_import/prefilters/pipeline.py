@@ -0,0 +1,56 @@
+from django.utils.module_loading import import_string
+
+from wagtail_wordpress_import.html_parsing import fragment_to_html, parse_html_fragment
+from wagtail_wordpress_import.timings import time_stage
+
+
+def soup_prefilter(function):
+    """
+    Mark a prefilter as one that can receive a BeautifulSoup tree, parsed with
+    html.parser, and return the tree rather than a string.
+
+    When prefilters like this follow each other in run_prefilters() the
+    content is only parsed before the first and serialised after the last.
+    """
+    function.is_soup_prefilter = True
+    return function
+
+
+def run_prefilters(content, prefilters, debug_content=None):
+    """
+    Run each prefilter in turn on the content and return the result.
+
+    prefilters:
+        A list of dicts with the dotted path of a FUNCTION and its OPTIONS,
+        like the WAGTAIL_WORDPRESS_IMPORT_PREFILTERS setting.
+    debug_content:
+        A dict to save the output of each prefilter to, by function name.
+
+    String prefilters are given the content as a string. Soup prefilters share
+    a parsed tree, the tree is converted to a string when a string prefilter
+    needs it or, with debug_content, to save it.
+    """
+    soup = None
+
+    for prefilter in prefilters:
+        function = import_string(prefilter["FUNCTION"])
+
+        # parsing and serialising the tree is included in the prefilter's time
+        with time_stage("prefilter_content." + function.__name__):
+            if getattr(function, "is_soup_prefilter", False):
+                if soup is None:
+                    # an item without any content has None
+                    soup = parse_html_fragment(content or "")
+                soup = function(soup, prefilter.get("OPTIONS"))
+            else:
+                if soup is not None:
+                    content = fragment_to_html(soup)
+                    soup = None
+                content = function(content, prefilter.get("OPTIONS"))
+
+        if debug_content is not None:
+            debug_content[function.__name__] = (
+                content if soup is None else fragment_to_html(soup)
+            )
+
+    return content if soup is None else fragment_to_html(soup)
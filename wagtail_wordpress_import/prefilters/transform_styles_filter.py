@@ -3,6 +3,8 @@ import re
 from bs4 import BeautifulSoup
 from django.utils.module_loading import import_string
 
+from wagtail_wordpress_import.html_parsing import fragment_to_html, parse_html_fragment
+from wagtail_wordpress_import.prefilters.pipeline import soup_prefilter
 from wagtail_wordpress_import.prefilters.transform_styles_defaults import (
     HTML_TAGS,
     conf_transform_html_tags_enabled,
@@ -67,18 +69,25 @@ def normalize_style_attrs(soup):
     return soup
 
 
+@soup_prefilter
 def filter_transform_inline_styles(html, options=None):
     """
     Use the default or provided CONFIG to loop through each filter
     and apply the transform_* method
 
     params
-        html: raw html input, the input needs to be valid html
+        html: raw html input, the input needs to be valid html,
+        or a BeautifulSoup tree which is modified and returned
         options: allows a developer to override the default config
         and pass in HTML_TAGS and TRANSFORM_STYLES_MAPPING
     """
+    if isinstance(html, BeautifulSoup):
+        return transform_inline_styles(html, options)
+    return fragment_to_html(transform_inline_styles(parse_html_fragment(html), options))
 
-    soup = normalize_style_attrs(BeautifulSoup(html, "html.parser"))
+
+def transform_inline_styles(soup, options=None):
+    soup = normalize_style_attrs(soup)
 
     CONF_HTML_TAGS = HTML_TAGS
     if options and options.get("HTML_TAGS"):
@@ -112,7 +121,7 @@ def filter_transform_inline_styles(html, options=None):
             for tag in tags:
                 filter[1](soup, tag)
 
-    return str(soup)
+    return soup
 
 
 def filter_transform_styles(tags, soup, filter_method, conf_html_tags):
@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+
+
+def progress_interval():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_PROGRESS_INTERVAL", 5)
+
+
+class ImportProgress:
+    """
+    Report the progress of an import from the counts in the Logger: a line
+    on the output stream and, if status_file is given, a JSON file that can
+    be polled by other programs.
+
+    Updates are written at most once every interval seconds, however many
+    items are imported in between.
+    """
+
+    def __init__(
+        self, stream=None, status_file=None, interval=None, clock=time.monotonic
+    ):
+        self.stream = stream or sys.stdout
+        self.status_file = status_file
+        self.interval = progress_interval() if interval is None else interval
+        self.clock = clock
+        self.total = None
+        self.started = None
+        self.last_update = None
+        self.media_at_start = 0
+        self.processed_at_start = 0
+
+    def start(self, total=None, processed=0):
+        """total is the number of items that will be read, the ETA is
+        reported if it's known. processed is the number of items imported
+        before the import was resumed."""
+        self.total = total
+        self.processed_at_start = processed
+        self.started = self.last_update = self.clock()
+        self.media_at_start = self.count_media()
+
+    @staticmethod
+    def count_media():
+        """The media fetched is counted from the ImportedMedia records, so
+        media saved by worker processes is counted too."""
+        from wagtail_wordpress_import.models import ImportedMedia
+
+        return ImportedMedia.objects.count()
+
+    def update(self, logger):
+        """Report the progress if interval seconds have passed since the last report."""
+        if self.started is None:
+            self.start()
+        if self.clock() - self.last_update >= self.interval:
+            self.report(logger)
+
+    def finish(self, logger, state="finished"):
+        if self.started is None:
+            self.start()
+        self.report(logger, state)
+
+    def report(self, logger, state="running"):
+        self.last_update = self.clock()
+        status = self.get_status(logger, state)
+        self.stream.write(self.format_status(status) + "\n")
+        if self.status_file:
+            self.write_status_file(status)
+
+    def get_status(self, logger, state="running"):
+        elapsed = self.clock() - self.started
+        processed = logger.processed - self.processed_at_start
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total is not None and rate:
+            eta = max(self.total - logger.processed, 0) / rate
+
+        return {
+            "state": state,
+            "total": self.total,
+            "processed": logger.processed,
+            "created": logger.results["created"],
+            "updated": logger.results["updated"],
+            "unchanged": logger.results["unchanged"],
+            "skipped": logger.results["excluded"],
+            "media_fetched": self.count_media() - self.media_at_start,
+            "bytes_processed": logger.bytes_processed,
+            "elapsed_seconds": round(elapsed, 1),
+            "items_per_second": round(rate, 2),
+            "eta_seconds": None if eta is None else round(eta, 1),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    @staticmethod
+    def format_status(status):
+        if status["total"]:
+            processed = f"{status['processed']}/{status['total']} items ({status['processed'] / status['total']:.0%})"
+        else:
+            processed = f"{status['processed']} items"
+        line = (
+            f"{processed}, {status['items_per_second']:.1f} items/s, "
+            f"created: {status['created']} updated: {status['updated']} "
+            f"unchanged: {status['unchanged']} skipped: {status['skipped']}, "
+            f"media fetched: {status['media_fetched']}, "
+            f"{status['bytes_processed'] / 1024 / 1024:.1f} MB"
+        )
+        if status["state"] != "running":
+            return f"{line}, {status['state']} in {timedelta(seconds=round(status['elapsed_seconds']))}"
+        if status["eta_seconds"] is not None:
+            line += f", ETA {timedelta(seconds=round(status['eta_seconds']))}"
+        return line
+
+    def write_status_file(self, status):
+        """Write the status to a temporary file and rename it, so the status
+        file is never read half written."""
+        temporary_file = f"{self.status_file}.tmp"
+        with open(temporary_file, "w") as f:
+            json.dump(status, f, indent=2)
+        os.replace(temporary_file, self.status_file)
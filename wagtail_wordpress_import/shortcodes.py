@@ -1,3 +1,6 @@
+import re
+from functools import lru_cache
+
 import shortcodes
 
 
@@ -18,3 +21,75 @@ def find_all_shortcodes(text):
             return []
 
     return found_shortcodes
+
+
+def get_names_alternation(names):
+    # longer names first, so foobar isn't matched as foo
+    return "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+
+
+@lru_cache(maxsize=32)
+def get_shortcode_tokenizer(names):
+    """Return one compiled regex matching the opening, closing and self closing
+    tags of all the shortcode names, e.g. [foo bar=1], [/foo] and [foo bar=1 /].
+
+    names: a tuple of shortcode names
+
+    The groups of a match are "closing" ("/" for a closing tag), "name",
+    "attrs" and "self_closing" ("/" for a self closing tag, e.g. [foo /] or
+    [foo bar="1"/]).
+    """
+    return re.compile(
+        r"\["  # matches the opening [
+        + r"(?P<closing>/)?"  # matches the / of a closing tag
+        + r"(?P<name>"
+        + get_names_alternation(names)
+        + r")"
+        + r"\b"  # matches a word boundary
+        + r"(?P<attrs>[^\]]*?)"  # capture 'attrs', matching anything but ]
+        # matches the / of a self closing tag, only after whitespace or a quote
+        # so an unquoted value ending in /, e.g. [foo link=http://a.com/],
+        # stays in the attrs
+        + r"(?P<self_closing>(?<=[\s\"'])/)?"
+        + r"\]"  # matches the closing ]
+    )
+
+
+@lru_cache(maxsize=32)
+def get_inline_shortcode_tokenizer(names):
+    """Return one compiled regex matching the start of an inline shortcode
+    of any of the names, the same way as InlineShortcodeHandler._pattern.
+
+    names: a tuple of shortcode names
+    """
+    return re.compile(r"\[(?P<name>" + get_names_alternation(names) + r")\s")
+
+
+def pair_shortcode_tags(html, tokenizer):
+    """Scan the html once and return a list of (opening match, closing match)
+    tuples for the shortcode tags found by the tokenizer. The closing match
+    is None for a self closing tag.
+
+    A closing tag is paired with the nearest unclosed opening tag with the
+    same name, so shortcodes can be nested. Opening tags without a closing
+    tag and closing tags without an opening tag are left out.
+    """
+    pairs = []
+    unclosed = []
+
+    for match in tokenizer.finditer(html):
+        if match.group("closing"):
+            if match.group("attrs") or match.group("self_closing"):
+                continue  # e.g. [/foo bar], which isn't a closing tag
+            for depth in range(len(unclosed) - 1, -1, -1):
+                if unclosed[depth].group("name") == match.group("name"):
+                    pairs.append((unclosed[depth], match))
+                    # tags opened inside this one and never closed stay as text
+                    del unclosed[depth:]
+                    break
+        elif match.group("self_closing"):
+            pairs.append((match, None))
+        else:
+            unclosed.append(match)
+
+    return pairs
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wagtail_wordpress_import_test", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testpage",
+            name="wp_import_digest",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.13 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+from wagtail_wordpress_import.operations import PopulateWPLinkHash
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wagtail_wordpress_import_test", "0002_testpage_wp_import_digest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testpage",
+            name="wp_link_hash",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=40, null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="testpage",
+            name="wp_post_id",
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        PopulateWPLinkHash("testpage"),
+    ]
@@ -1,8 +1,14 @@
 import os
+from unittest import mock
 
 from django.test import TestCase
 
-from wagtail_wordpress_import.prefilters.bleach_filter import filter_bleach_clean
+from wagtail_wordpress_import.prefilters.bleach_filter import (
+    ALLOWED_ATTRIBUTES,
+    ALLOWED_TAGS,
+    filter_bleach_clean,
+    get_cleaner,
+)
 
 BASE_PATH = os.path.dirname(os.path.dirname(__file__))
 FIXTURES_PATH = BASE_PATH + "/fixtures"
@@ -17,3 +23,61 @@ class TestBleach(TestCase):
         bc = filter_bleach_clean(self.stream)
         self.assertNotIn('style=" float: left;"', bc)
         self.assertNotIn('onmouseover=alert("Boo!")', bc)
+
+    def test_cleaner_is_reused(self):
+        self.assertIs(get_cleaner(), get_cleaner())
+        options = {"ADDITIONAL_ALLOWED_TAGS": ["my-custom-tag"]}
+        self.assertIs(get_cleaner(options), get_cleaner(dict(options)))
+        self.assertIsNot(get_cleaner(), get_cleaner(options))
+
+    def test_allow_lists_are_not_changed(self):
+        tags = list(ALLOWED_TAGS)
+        attributes = {tag: list(names) for tag, names in ALLOWED_ATTRIBUTES.items()}
+        for i in range(3):
+            filter_bleach_clean(
+                "<my-custom-tag data-foo='bar'>text</my-custom-tag>",
+                {
+                    "ADDITIONAL_ALLOWED_TAGS": ["my-custom-tag"],
+                    "ADDITIONAL_ALLOWED_ATTRIBUTES": {"my-custom-tag": ["data-foo"]},
+                },
+            )
+        self.assertEqual(ALLOWED_TAGS, tags)
+        self.assertEqual(ALLOWED_ATTRIBUTES, attributes)
+
+    def test_cleaner_is_cached_on_the_options(self):
+        options = {
+            "ADDITIONAL_ALLOWED_TAGS": ["my-custom-tag"],
+            "ADDITIONAL_ALLOWED_ATTRIBUTES": {"my-custom-tag": ["data-foo"]},
+        }
+        cleaner = get_cleaner(options)
+        with mock.patch(
+            "wagtail_wordpress_import.prefilters.bleach_filter.Cleaner"
+        ) as cleaner_class:
+            self.assertIs(
+                get_cleaner(
+                    {
+                        "ADDITIONAL_ALLOWED_ATTRIBUTES": {
+                            "my-custom-tag": ["data-foo"]
+                        },
+                        "ADDITIONAL_ALLOWED_TAGS": ["my-custom-tag"],
+                    }
+                ),
+                cleaner,
+            )
+        cleaner_class.assert_not_called()
+
+    def test_additional_options(self):
+        html = "<my-custom-tag data-foo='bar'>text</my-custom-tag>"
+        self.assertNotIn("<my-custom-tag", filter_bleach_clean(html))
+        self.assertEqual(
+            filter_bleach_clean(
+                html,
+                {
+                    "ADDITIONAL_ALLOWED_TAGS": ["my-custom-tag"],
+                    "ADDITIONAL_ALLOWED_ATTRIBUTES": {"my-custom-tag": ["data-foo"]},
+                },
+            ),
+            '<my-custom-tag data-foo="bar">text</my-custom-tag>',
+        )
+        # the options of one call don't apply to the next
+        self.assertNotIn("<my-custom-tag", filter_bleach_clean(html))
@@ -1,4 +1,5 @@
 import os
+from unittest import mock
 
 import bs4
 import requests
@@ -7,7 +8,14 @@ from bs4 import BeautifulSoup
 from django.test import TestCase, override_settings
 from wagtail.images import get_image_model
 
-from wagtail_wordpress_import.block_builder import BlockBuilder, conf_promote_child_tags
+from wagtail_wordpress_import.block_builder import (
+    REGISTERED_BLOCK_BUILDERS,
+    BlockBuilder,
+    clear_block_dispatch_table,
+    conf_promote_child_tags,
+    get_block_dispatch_table,
+    register_block_builder,
+)
 from wagtail_wordpress_import.block_builder_defaults import (
     build_block_quote_block,
     build_form_block,
@@ -22,6 +30,7 @@ from wagtail_wordpress_import.block_builder_defaults import (
     get_image_file_name,
     image_linker,
 )
+from wagtail_wordpress_import.prefilters.handle_shortcodes import CaptionHandler
 from wagtail_wordpress_import.test.tests.utility_functions import (
     get_soup,
     mock_image,
@@ -162,6 +171,72 @@ class TestBlockBuilderBlockDefaults(TestCase):
         self.assertTrue(output["value"].startswith("<table"))
 
 
+def build_subheading_block(tag):
+    return {"type": "heading", "value": {"importance": "h2", "text": tag.text}}
+
+
+class TestBlockDispatchTable(TestCase):
+    def tearDown(self):
+        REGISTERED_BLOCK_BUILDERS.clear()
+        clear_block_dispatch_table()
+
+    def test_table_is_shared(self):
+        table = get_block_dispatch_table()
+        self.assertIs(get_block_dispatch_table(), table)
+        self.assertIs(BlockBuilder("<p></p>", None, None).dispatch_table, table)
+        self.assertIs(table.builders["h1"], build_heading_block)
+        self.assertEqual(
+            table.builders["wagtail_block_caption"].__func__,
+            CaptionHandler.construct_block,
+        )
+        with self.assertRaises(TypeError):
+            table.builders["h2"] = build_subheading_block
+
+    def test_table_is_rebuilt_when_settings_change(self):
+        table = get_block_dispatch_table()
+        with override_settings(
+            WAGTAIL_WORDPRESS_IMPORTER_CONVERT_HTML_TAGS_TO_BLOCKS={
+                "h2": "wagtail_wordpress_import.test.tests.test_block_builder.build_subheading_block"
+            }
+        ):
+            self.assertIsNot(get_block_dispatch_table(), table)
+            builders = get_block_dispatch_table().builders
+            self.assertIs(builders["h2"], build_subheading_block)
+            self.assertNotIn("h1", builders)
+        self.assertIs(get_block_dispatch_table().builders["h1"], build_heading_block)
+        self.assertNotIn("h2", get_block_dispatch_table().builders)
+
+    def test_register_block_builder(self):
+        register_block_builder("h2", build_subheading_block)
+        register_block_builder(
+            "h1",
+            "wagtail_wordpress_import.test.tests.test_block_builder.build_subheading_block",
+        )
+
+        @register_block_builder("h3")
+        def build_h3_block(tag):
+            return {"type": "raw_html", "value": str(tag)}
+
+        builders = get_block_dispatch_table().builders
+        self.assertIs(builders["h1"], build_subheading_block)
+        self.assertIs(builders["h2"], build_subheading_block)
+        self.assertIs(builders["h3"], build_h3_block)
+
+        blocks = BlockBuilder(
+            "<h2>Subheading</h2><h3>Heading 3</h3>", None, None
+        ).build()
+        self.assertEqual(
+            blocks,
+            [
+                {
+                    "type": "heading",
+                    "value": {"importance": "h2", "text": "Subheading"},
+                },
+                {"type": "raw_html", "value": "<h3>Heading 3</h3>"},
+            ],
+        )
+
+
 @override_settings(WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN="http://www.example.com")
 class TestBlockBuilderBuild(TestCase):
     @responses.activate
@@ -454,3 +529,22 @@ class TestBlockBuilderFetchUrlRequests(TestCase):
             fetch_url(self.page_url),
             (None, True, None),
         )
+
+    @responses.activate
+    def test_fetch_url_reports_the_exception(self):
+        for exception in [
+            requests.ConnectTimeout,
+            requests.ReadTimeout,
+            requests.Timeout,
+            requests.ConnectionError,
+            requests.HTTPError,
+            requests.RequestException,
+        ]:
+            with self.subTest(exception=exception.__name__):
+                responses.reset()
+                responses.add(responses.GET, self.page_url, body=exception())
+                with mock.patch("builtins.print") as mock_print:
+                    self.assertEqual(fetch_url(self.page_url), (None, False, None))
+                mock_print.assert_called_once_with(
+                    f"{exception.__name__}: {self.page_url}"
+                )
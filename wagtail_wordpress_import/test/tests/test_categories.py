@@ -0,0 +1,135 @@
+import os
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from wagtail import VERSION as WAGTAIL_VERSION
+
+if WAGTAIL_VERSION >= (3, 0):
+    from wagtail.models import Page
+else:
+    from wagtail.core.models import Page
+
+from wagtail_wordpress_import.importers.categories import CategoryIndex
+from wagtail_wordpress_import.importers.wordpress import WordpressImporter
+from wagtail_wordpress_import.logger import Logger
+from wagtail_wordpress_import.test.models import Category
+from wagtail_wordpress_import.test.tests.xml_boilerplate import (
+    build_xml_stream,
+    generate_temporay_file,
+)
+
+LOG_DIR = "fakedir"
+
+
+class TestCategoryIndex(TestCase):
+    def setUp(self):
+        Category.objects.create(name="Blogging")
+
+    def test_existing_categories_are_found_without_queries(self):
+        index = CategoryIndex.load(Category)
+        with self.assertNumQueries(0):
+            categories = index.get_categories(["Blogging"])
+        self.assertEqual(categories, [Category.objects.get(name="Blogging")])
+
+    def test_pending_categories_are_created_together(self):
+        index = CategoryIndex.load(Category)
+        index.add_names(["Life", "Blogging", "Cars"])
+        index.add_names(["Cars", "Computing"])
+        with self.assertNumQueries(2):
+            index.create_pending()
+        self.assertEqual(
+            sorted(Category.objects.values_list("name", flat=True)),
+            ["Blogging", "Cars", "Computing", "Life"],
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [category.name for category in index.get_categories(["Cars", "Life"])],
+                ["Cars", "Life"],
+            )
+
+    def test_category_created_since_load(self):
+        index = CategoryIndex.load(Category)
+        Category.objects.create(name="Life")
+        self.assertEqual(
+            index.get_categories(["Life"]), [Category.objects.get(name="Life")]
+        )
+        self.assertEqual(Category.objects.filter(name="Life").count(), 1)
+
+    def test_short_and_empty_names_are_skipped(self):
+        index = CategoryIndex.load(Category)
+        self.assertEqual(index.get_categories(["A", "", None]), [])
+        self.assertEqual(Category.objects.count(), 1)
+
+
+@override_settings(
+    WAGTAIL_WORDPRESS_IMPORT_CATEGORY_PLUGIN_ENABLED=True,
+    WAGTAIL_WORDPRESS_IMPORT_CATEGORY_PLUGIN_MODEL="wagtail_wordpress_import.test.models.Category",
+)
+class TestImportCategories(TestCase):
+    fixtures = [
+        f"{os.path.dirname(os.path.dirname(__file__))}/fixtures/dump.json",
+    ]
+
+    def test_declared_categories_are_created(self):
+        xml_file = generate_temporay_file(
+            build_xml_stream(
+                xml_tags_fragment="""
+                <wp:category>
+                    <wp:term_id>1</wp:term_id>
+                    <wp:category_nicename>blogging</wp:category_nicename>
+                    <wp:category_parent />
+                    <wp:cat_name><![CDATA[Blogging]]></wp:cat_name>
+                </wp:category>
+                <wp:category>
+                    <wp:term_id>2</wp:term_id>
+                    <wp:category_nicename>unused</wp:category_nicename>
+                    <wp:category_parent />
+                    <wp:cat_name><![CDATA[Unused]]></wp:cat_name>
+                </wp:category>
+                """,
+                xml_items_fragment="""
+                <item>
+                    <title>A title</title>
+                    <link>https://www.example.com/a-title</link>
+                    <content:encoded><![CDATA[<p>Content</p>]]></content:encoded>
+                    <wp:post_id>1</wp:post_id>
+                    <wp:post_date>2015-05-21 15:00:31</wp:post_date>
+                    <wp:post_date_gmt>2015-05-21 19:00:31</wp:post_date_gmt>
+                    <wp:post_modified>2015-05-21 15:00:44</wp:post_modified>
+                    <wp:post_modified_gmt>2015-05-21 19:00:44</wp:post_modified_gmt>
+                    <wp:post_name>a-title</wp:post_name>
+                    <wp:status>publish</wp:status>
+                    <wp:post_type>post</wp:post_type>
+                    <category domain="category" nicename="blogging"><![CDATA[Blogging]]></category>
+                    <category domain="category" nicename="life"><![CDATA[Life]]></category>
+                </item>
+                """,
+            ).read()
+        )
+        self.addCleanup(os.remove, xml_file)
+
+        importer = WordpressImporter(xml_file)
+        with mock.patch.object(
+            importer, "start_batch", wraps=importer.start_batch
+        ) as start_batch:
+            importer.run(
+                logger=Logger(LOG_DIR),
+                app_for_pages="wagtail_wordpress_import_test",
+                model_for_pages="TestPage",
+                parent_id="2",
+                page_types=["post"],
+                page_statuses=["publish"],
+                batch_size=1,
+            )
+        # the <wp:category> tags don't count toward the batch size
+        self.assertEqual(start_batch.call_count, 1)
+
+        self.assertEqual(
+            sorted(Category.objects.values_list("name", flat=True)),
+            ["Blogging", "Life", "Unused"],
+        )
+        page = Page.objects.get(title="A title").specific
+        self.assertEqual(
+            [category.name for category in page.categories.order_by("name")],
+            ["Blogging", "Life"],
+        )
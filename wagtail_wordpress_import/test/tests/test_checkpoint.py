@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from wagtail_wordpress_import.importers.checkpoint import ImportCheckpoint
+from wagtail_wordpress_import.importers.readers import (
+    IndexedItemReader,
+    IterparseItemReader,
+)
+from wagtail_wordpress_import.importers.wordpress import WordpressImporter
+from wagtail_wordpress_import.logger import Logger
+from wagtail_wordpress_import.test.models import TestPage
+
+BASE_PATH = os.path.dirname(os.path.dirname(__file__))
+FIXTURES_PATH = BASE_PATH + "/fixtures"
+LOG_DIR = "fakedir"
+IMPORTER_RUN_PARAMS_TEST = {
+    "app_for_pages": "wagtail_wordpress_import_test",
+    "model_for_pages": "TestPage",
+    "parent_id": "2",
+    "page_types": ["post", "page"],
+    "page_statuses": ["publish", "draft"],
+}
+
+
+class TestReaderIterFrom(TestCase):
+    def test_iter_from(self):
+        xml_file = f"{FIXTURES_PATH}/raw_xml.xml"
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        indexed_xml_file = os.path.join(temp_dir, "raw_xml.xml")
+        shutil.copy(xml_file, indexed_xml_file)
+
+        items = list(IterparseItemReader(xml_file))
+        for position in (0, 2, 5):
+            self.assertEqual(
+                list(IterparseItemReader(xml_file).iter_from(position)),
+                items[position:],
+            )
+            self.assertEqual(
+                list(IndexedItemReader(indexed_xml_file).iter_from(position)),
+                items[position:],
+            )
+
+
+@override_settings(WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN="http://www.example.com")
+class TestResumeImport(TestCase):
+    fixtures = [
+        f"{FIXTURES_PATH}/dump.json",
+    ]
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.xml_file = os.path.join(self.temp_dir, "raw_xml.xml")
+        shutil.copy(f"{FIXTURES_PATH}/raw_xml.xml", self.xml_file)
+
+    def run_importer(self, **kwargs):
+        importer = WordpressImporter(self.xml_file)
+        logger = Logger(LOG_DIR, verbose=False)
+        importer.run(logger=logger, **IMPORTER_RUN_PARAMS_TEST, **kwargs)
+        return importer, logger
+
+    def test_resume_after_a_failure(self):
+        # the second page fails to import
+        with mock.patch.object(
+            WordpressImporter,
+            "check_stream_field_block_types",
+            side_effect=[None, ValueError("Invalid page streamfield block types")],
+        ):
+            with self.assertRaises(ValueError):
+                self.run_importer(checkpoint_every=1)
+
+        checkpoint = ImportCheckpoint.load(
+            self.xml_file,
+            {
+                "page_types": ["post", "page"],
+                "page_statuses": ["publish", "draft"],
+                "app_for_pages": "wagtail_wordpress_import_test",
+                "model_for_pages": "TestPage",
+                "parent_id": "2",
+                "use_index": False,
+                "post_ids": [],
+                "categories": False,
+            },
+        )
+        self.assertEqual(checkpoint.position, 1)
+        self.assertEqual(len(checkpoint.imported_page_ids), 1)
+        self.assertEqual(TestPage.objects.count(), 1)
+
+        importer, logger = self.run_importer(resume=True)
+
+        self.assertEqual(TestPage.objects.count(), 2)
+        self.assertEqual(len(importer.imported_page_ids), 2)
+        self.assertEqual(len(importer.imported_pages), 2)
+        self.assertEqual(logger.processed, 5)
+        self.assertEqual(logger.imported, 2)
+        self.assertEqual(logger.results, {"created": 2, "excluded": 3})
+        # the checkpoint is deleted once the import has finished
+        self.assertFalse(
+            os.path.exists(ImportCheckpoint.get_checkpoint_path(self.xml_file))
+        )
+
+    def test_resume_without_a_checkpoint(self):
+        importer, logger = self.run_importer(resume=True)
+        self.assertEqual(TestPage.objects.count(), 2)
+        self.assertEqual(logger.processed, 5)
+
+    def test_checkpoint_with_other_options_is_not_resumed(self):
+        ImportCheckpoint(
+            self.xml_file,
+            size=os.path.getsize(self.xml_file),
+            mtime=os.stat(self.xml_file).st_mtime_ns,
+            options={"page_types": ["page"]},
+            position=5,
+            imported_page_ids=[],
+            pages_with_unresolved_links=[],
+            items_cache={},
+            tags_cache={},
+            logger_counts={},
+        ).save()
+        importer, logger = self.run_importer(resume=True)
+        self.assertEqual(logger.processed, 5)
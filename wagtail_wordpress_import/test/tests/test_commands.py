@@ -1,4 +1,9 @@
+import csv
+import glob
+import json
 import os
+import tempfile
+from unittest import mock
 
 from django.core.management import CommandError, call_command
 from django.test import TestCase, override_settings
@@ -118,26 +123,57 @@ class TestImportXmlCommandCompletes(TestCase):
         built_file = generate_temporary_file(
             build_xml_stream(xml_items_fragment=fragment).read()
         )
+        arguments = [
+            "import_xml",
+            built_file,
+            "2",
+            "-a",
+            "wagtail_wordpress_import_test",
+            "-m",
+            "TestPage",
+            "-t",
+            "post",
+            "-s",
+            "publish",
+        ]
 
         with self.assertRaises(FileNotFoundError):
-            call_command(
-                "import_xml",
-                built_file,
-                "2",
-                "-a",
-                "wagtail_wordpress_import_test",
-                "-m",
-                "TestPage",
-                "-t",
-                "post",
-                "-s",
-                "publish",
-            )
+            # the report is opened before the import, the log folder is missing
+            call_command(*arguments)
+
+        self.assertEqual(Page.objects.get(id=2).get_children().count(), 0)
+
+        with tempfile.TemporaryDirectory() as log_dir:
+            with mock.patch(
+                "wagtail_wordpress_import.management.commands.import_xml.LOG_DIR",
+                log_dir,
+            ):
+                call_command(*arguments, "--status-file", f"{log_dir}/status.json")
+
+            with open(glob.glob(f"{log_dir}/import-report-*.csv")[0]) as report:
+                rows = list(csv.reader(report))
+            with open(f"{log_dir}/status.json") as status_file:
+                status = json.load(status_file)
 
         parent_page = Page.objects.get(id=2)
         imported_pages = parent_page.get_children().all()
         self.assertEqual(imported_pages.count(), 1)
         self.assertEqual(imported_pages[0].title, "A title")
+        self.assertEqual(len(rows), 3)  # the labels, the page and the excluded item
+        self.assertEqual(
+            rows[1][1:5],
+            [
+                "A title",
+                "https://www.example.com/a-title",
+                "existed",
+                "created",
+            ],
+        )
+        self.assertEqual(rows[2][4], "excluded")
+        self.assertEqual(status["state"], "finished")
+        self.assertEqual(status["total"], 2)
+        self.assertEqual(status["processed"], 2)
+        self.assertEqual(status["created"], 1)
 
 
 class TestReduceCommand(TestCase):
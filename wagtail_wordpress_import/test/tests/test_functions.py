@@ -1,6 +1,10 @@
 from django.test import TestCase
 
-from wagtail_wordpress_import.functions import get_attr_as_list, snakecase_key
+from wagtail_wordpress_import.functions import (
+    get_attr_as_list,
+    iter_chunks,
+    snakecase_key,
+)
 
 
 class TestSnakeCaseKey(TestCase):
@@ -39,3 +43,20 @@ class TestDictToList(TestCase):
     def test_with_expected_list(self):
         node = {"foo": [{"bar": "baz", "baz": "bar"}]}
         self.assertEqual(get_attr_as_list(node, "foo"), [{"bar": "baz", "baz": "bar"}])
+
+
+class TestIterChunks(TestCase):
+    def test_chunks(self):
+        self.assertEqual(list(iter_chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(iter_chunks([], 2)), [])
+
+    def test_only_counted_items_count_toward_size(self):
+        items = ["tag", "tag", "item", "tag", "item", "item", "tag"]
+        self.assertEqual(
+            list(iter_chunks(items, 2, counts=lambda item: item == "item")),
+            [["tag", "tag", "item", "tag", "item"], ["item", "tag"]],
+        )
+        self.assertEqual(
+            list(iter_chunks(["tag", "tag"], 2, counts=lambda item: item == "item")),
+            [["tag", "tag"]],
+        )
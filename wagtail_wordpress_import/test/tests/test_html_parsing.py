@@ -0,0 +1,60 @@
+from django.test import TestCase, override_settings
+
+from wagtail_wordpress_import.block_builder import BlockBuilder
+from wagtail_wordpress_import.html_parsing import (
+    fragment_to_html,
+    get_body,
+    parse_html,
+    parse_html_fragment,
+)
+from wagtail_wordpress_import.prefilters.pipeline import run_prefilters
+
+PREFILTER_PATH = "wagtail_wordpress_import.test.tests.test_prefilter_pipeline"
+
+
+class TestHtmlParsing(TestCase):
+    def test_default_parsers(self):
+        self.assertEqual(parse_html("<p>one</p>").builder.NAME, "lxml")
+        self.assertEqual(parse_html_fragment("<p>one</p>").builder.NAME, "html.parser")
+
+    @override_settings(WAGTAIL_WORDPRESS_IMPORTER_HTML_PARSER="html.parser")
+    def test_parser_setting_for_the_block_builder(self):
+        soup = parse_html("<p>one</p>")
+        self.assertEqual(soup.builder.NAME, "html.parser")
+        self.assertEqual([tag.name for tag in get_body(soup).find_all()], ["p"])
+
+    @override_settings(WAGTAIL_WORDPRESS_IMPORTER_HTML_PARSER="lxml")
+    def test_parser_setting_for_fragments(self):
+        soup = parse_html_fragment("<p>one</p>")
+        self.assertEqual(soup.builder.NAME, "lxml")
+        self.assertEqual(fragment_to_html(soup), "<p>one</p>")
+
+    @override_settings(WAGTAIL_WORDPRESS_IMPORTER_HTML_PARSER="lxml")
+    def test_fragment_to_html_keeps_tags_lxml_moves_to_the_head(self):
+        html = "<style>p {color: red}</style><p>one</p>"
+        self.assertEqual(fragment_to_html(parse_html_fragment(html)), html)
+
+    @override_settings(WAGTAIL_WORDPRESS_IMPORTER_HTML_PARSER="lxml")
+    def test_prefilters_with_lxml(self):
+        output = run_prefilters(
+            "<p>one</p><p>two</p>",
+            [
+                {"FUNCTION": f"{PREFILTER_PATH}.add_class", "OPTIONS": {"CLASS": "a"}},
+                {"FUNCTION": f"{PREFILTER_PATH}.upper_case"},
+            ],
+        )
+        self.assertEqual(output, '<P CLASS="A">ONE</P><P CLASS="A">TWO</P>')
+
+    @override_settings(WAGTAIL_WORDPRESS_IMPORTER_HTML_PARSER="html.parser")
+    def test_block_builder_with_html_parser(self):
+        blocks = BlockBuilder("<h1>Heading</h1><p>one</p>", None, None).build()
+        self.assertEqual(
+            blocks,
+            [
+                {
+                    "type": "heading",
+                    "value": {"importance": "h1", "text": "Heading"},
+                },
+                {"type": "rich_text", "value": "<p>one</p>"},
+            ],
+        )
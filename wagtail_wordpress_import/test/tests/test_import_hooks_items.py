@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 from io import StringIO
 from unittest import mock
 from xml.dom import pulldom
@@ -13,6 +15,13 @@ else:
     from wagtail.core.models import Page
 
 from wagtail_wordpress_import.functions import node_to_dict
+from wagtail_wordpress_import.importers.checkpoint import ImportCheckpoint
+from wagtail_wordpress_import.importers.import_hooks import (
+    ItemsCache,
+    SqliteCachedItems,
+    TagsCache,
+    close_cache_connections,
+)
 from wagtail_wordpress_import.importers.wordpress import WordpressImporter
 from wagtail_wordpress_import.logger import Logger
 from wagtail_wordpress_import.test.tests.xml_boilerplate import (
@@ -366,3 +375,151 @@ class WordpressImporterTestsCheckXmlItemsCached(TestCase):
             "datatagname",
             getattr(self.importer.items_cache, "bar"),
         )
+
+
+@override_settings(
+    WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE={
+        "attachment": {"DATA_TAG": "thumbnail_id", "FUNCTION": "path.to.function"},
+    },
+    WORDPRESS_IMPORT_HOOKS_TAGS_TO_CACHE={
+        "wp:author": {
+            "DATA_TAG": "dc:creator",
+            "FUNCTION": "path.to.function",
+            "KEY": "wp:author_login",
+        },
+    },
+)
+class TestCachedItems(TestCase):
+    def test_get_by_post_id(self):
+        items_cache = ItemsCache()
+        for post_id in range(1, 20001):
+            item = {"wp:post_id": post_id, "guid": f"{post_id}.jpg"}
+            items_cache.add_item_to_cache("attachment", item)
+            items_cache.add_item_to_cache("attachment", dict(item))
+
+        self.assertIsInstance(items_cache.attachment, list)
+        self.assertEqual(len(items_cache.attachment), 20000)
+        self.assertEqual(items_cache.attachment.get(43)["guid"], "43.jpg")
+        # postmeta values are strings
+        self.assertEqual(items_cache.attachment.get("43")["guid"], "43.jpg")
+        self.assertIsNone(items_cache.attachment.get(20001))
+        self.assertEqual(
+            items_cache.attachment.get("43.jpg", key="guid")["wp:post_id"], 43
+        )
+
+    def test_items_with_the_same_post_id(self):
+        items_cache = ItemsCache()
+        items_cache.add_item_to_cache("attachment", {"wp:post_id": 1, "guid": "a"})
+        items_cache.add_item_to_cache("attachment", {"wp:post_id": 1, "guid": "b"})
+        # both are cached, as before, get returns the first
+        self.assertEqual(len(items_cache.attachment), 2)
+        self.assertEqual(items_cache.attachment.get(1)["guid"], "a")
+
+    def test_get_by_tags_cache_key(self):
+        tags_cache = TagsCache()
+        tags_cache.add_item_to_cache(
+            "wp:author", {"wp:author_login": "joe", "wp:author_id": 2}
+        )
+        self.assertEqual(getattr(tags_cache, "wp:author").get("joe")["wp:author_id"], 2)
+
+    def test_item_changed_after_it_is_cached(self):
+        items_cache = ItemsCache()
+        item = {"wp:post_id": 1, "guid": "a.jpg", "category": [{"#text": "Cars"}]}
+        items_cache.add_item_to_cache("attachment", item)
+        item["guid"] = "b.jpg"
+        item["category"][0]["#text"] = "Life"
+        item["category"].append({"#text": "Blogging"})
+        self.assertEqual(
+            items_cache.attachment.get(1),
+            {"wp:post_id": 1, "guid": "a.jpg", "category": [{"#text": "Cars"}]},
+        )
+
+    def test_set_cache(self):
+        items_cache = ItemsCache()
+        items_cache.set_cache("attachment", [{"wp:post_id": 1}, {"wp:post_id": 1}])
+        self.assertEqual(items_cache.attachment, [{"wp:post_id": 1}])
+        self.assertEqual(items_cache.attachment.get(1), {"wp:post_id": 1})
+
+
+@override_settings(
+    WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE={
+        "attachment": {"DATA_TAG": "thumbnail_id", "FUNCTION": "path.to.function"},
+    },
+    WORDPRESS_IMPORT_HOOKS_TAGS_TO_CACHE={
+        "wp:author": {
+            "DATA_TAG": "dc:creator",
+            "FUNCTION": "path.to.function",
+            "KEY": "wp:author_login",
+        },
+    },
+)
+class TestSqliteCachedItems(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.addCleanup(close_cache_connections)
+        settings_override = override_settings(
+            WAGTAIL_WORDPRESS_IMPORTER_CACHE_DB=os.path.join(
+                self.temp_dir, "cache.sqlite3"
+            )
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_get_by_post_id(self):
+        items_cache = ItemsCache()
+        for post_id in range(1, 2001):
+            item = {"wp:post_id": post_id, "guid": f"{post_id}.jpg"}
+            items_cache.add_item_to_cache("attachment", item)
+            items_cache.add_item_to_cache("attachment", dict(item))
+
+        self.assertIsInstance(items_cache.attachment, SqliteCachedItems)
+        self.assertEqual(len(items_cache.attachment), 2000)
+        self.assertEqual(items_cache.attachment.get(43)["guid"], "43.jpg")
+        self.assertEqual(items_cache.attachment.get("43")["guid"], "43.jpg")
+        self.assertIsNone(items_cache.attachment.get(2001))
+        self.assertEqual(
+            items_cache.attachment.get("43.jpg", key="guid")["wp:post_id"], 43
+        )
+        self.assertEqual(
+            [item["wp:post_id"] for item in items_cache.attachment][:3], [1, 2, 3]
+        )
+
+    def test_items_without_postmeta(self):
+        items_cache = ItemsCache()
+        items_cache.add_item_to_cache(
+            "attachment", {"wp:post_id": 1, "wp:postmeta": [{"wp:meta_key": "a"}]}
+        )
+        self.assertEqual(list(items_cache.attachment), [{"wp:post_id": 1}])
+
+    def test_get_by_tags_cache_key(self):
+        tags_cache = TagsCache()
+        tags_cache.add_item_to_cache(
+            "wp:author", {"wp:author_login": "joe", "wp:author_id": 2}
+        )
+        self.assertEqual(getattr(tags_cache, "wp:author").get("joe")["wp:author_id"], 2)
+
+    def test_caches_are_kept_separate(self):
+        ItemsCache().add_item_to_cache("attachment", {"wp:post_id": 1})
+        self.assertFalse(getattr(TagsCache(), "wp:author"))
+        self.assertEqual(len(ItemsCache().attachment), 1)
+
+    def test_clear(self):
+        items_cache = ItemsCache()
+        items_cache.add_item_to_cache("attachment", {"wp:post_id": 1})
+        items_cache.clear()
+        self.assertEqual(len(items_cache.attachment), 0)
+        self.assertIsNone(items_cache.attachment.get(1))
+
+    def test_not_saved_in_checkpoint(self):
+        items_cache = ItemsCache()
+        items_cache.add_item_to_cache("attachment", {"wp:post_id": 1})
+        self.assertEqual(
+            ImportCheckpoint.get_cached_items(
+                items_cache, settings.WORDPRESS_IMPORT_HOOKS_ITEMS_TO_CACHE
+            ),
+            {},
+        )
+        # the items were committed, and are there when the import is resumed
+        close_cache_connections()
+        self.assertEqual(ItemsCache().attachment.get(1), {"wp:post_id": 1})
@@ -1,6 +1,33 @@
-from django.test import TestCase
+from unittest import mock
 
-from wagtail_wordpress_import.handle_inline_shortcodes import InlineShortcodeHandler
+from django.test import TestCase, override_settings
+
+from wagtail_wordpress_import.handle_inline_shortcodes import (
+    InlineShortcodeHandler,
+    InlineShortcodeScanner,
+    get_inline_shortcode_scanner,
+)
+
+
+class StockHandler(InlineShortcodeHandler):
+    shortcode_name = "stock"
+
+    def construct_html_tag(self, html):
+        for match in self._pattern.finditer(html):
+            attrs = self.get_shortcode_attrs(match.groupdict()["attrs"])
+            html = html.replace(
+                match.group(),
+                f'<{self.element_name} data-stock="{attrs["symbol"]}">${attrs["symbol"]}</{self.element_name}>',
+            )
+        return html
+
+
+class QuoteHandler(StockHandler):
+    shortcode_name = "quote"
+
+
+stock_handler = StockHandler()
+quote_handler = QuoteHandler()
 
 
 class TestInlineShortcodeHandler(TestCase):
@@ -166,3 +193,44 @@ class TestGetAttrs(TestCase):
         ):
             with self.assertRaises(IndexError):
                 attrs = handler.get_shortcode_attrs(attrs)
+
+
+class TestInlineShortcodeScanner(TestCase):
+    def test_only_handlers_with_a_shortcode_are_called(self):
+        scanner = InlineShortcodeScanner([stock_handler, quote_handler])
+        html = 'some content before [stock symbol="ABC"] some content after'
+
+        self.assertEqual(scanner.get_handlers(html), [stock_handler])
+        self.assertEqual(scanner.get_handlers("no shortcodes"), [])
+        self.assertEqual(scanner.get_handlers("[stocks symbol=ABC]"), [])
+        with mock.patch.object(quote_handler, "construct_html_tag") as construct:
+            self.assertEqual(
+                scanner.construct_html_tags(html),
+                'some content before <span data-stock="ABC">$ABC</span> some content after',
+            )
+        construct.assert_not_called()
+
+    def test_handlers_are_called_in_order(self):
+        scanner = InlineShortcodeScanner([quote_handler, stock_handler])
+        html = "[stock symbol=A] [quote symbol=B] [stock symbol=C]"
+        self.assertEqual(scanner.get_handlers(html), [quote_handler, stock_handler])
+
+    @override_settings(
+        WAGTAIL_WORDPRESS_IMPORTER_INLINE_SHORTCODE_HANDLERS=[
+            "wagtail_wordpress_import.test.tests.test_inline_shortcode_handlers.stock_handler"
+        ]
+    )
+    def test_scanner_is_built_once_per_setting(self):
+        scanner = get_inline_shortcode_scanner()
+        self.assertIs(get_inline_shortcode_scanner(), scanner)
+        self.assertEqual(scanner.handlers, [stock_handler])
+
+        with override_settings(
+            WAGTAIL_WORDPRESS_IMPORTER_INLINE_SHORTCODE_HANDLERS=[
+                "wagtail_wordpress_import.test.tests.test_inline_shortcode_handlers.stock_handler",
+                "wagtail_wordpress_import.test.tests.test_inline_shortcode_handlers.quote_handler",
+            ]
+        ):
+            self.assertEqual(
+                get_inline_shortcode_scanner().handlers, [stock_handler, quote_handler]
+            )
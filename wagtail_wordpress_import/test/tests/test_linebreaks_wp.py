@@ -1,4 +1,6 @@
+import json
 import os
+import time
 
 from bs4 import BeautifulSoup
 from django.test import TestCase
@@ -33,3 +35,28 @@ class TestLinebreaks(TestCase):
         self.assertEqual(len(paragraphs), 3)
         for i in range(len(paragraphs)):
             self.assertEqual(paragraphs[i].text.strip()[-1], str(i + 1))
+
+
+class TestLinebreaksGolden(TestCase):
+    """The output for a corpus of WordPress posts, saved from the original
+    port of wpautop, must not change."""
+
+    def setUp(self):
+        with open(f"{FIXTURES_PATH}/linebreaks_wp_golden.json", "r") as f:
+            self.cases = json.load(f)
+
+    def test_output_matches_golden(self):
+        for i, case in enumerate(self.cases):
+            with self.subTest(case=i):
+                self.assertEqual(filter_linebreaks_wp(case["input"]), case["output"])
+
+    def test_time_per_item(self):
+        repeats = 20
+        started = time.perf_counter()
+        for _ in range(repeats):
+            for case in self.cases:
+                filter_linebreaks_wp(case["input"])
+        time_per_item = (time.perf_counter() - started) / (repeats * len(self.cases))
+        # this is well under a millisecond, the limit only catches a
+        # pathological regression such as catastrophic backtracking
+        self.assertLess(time_per_item, 0.005)
@@ -0,0 +1,133 @@
+import csv
+import glob
+import io
+import json
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from wagtail_wordpress_import.logger import Logger
+
+
+def make_item(id, result="created"):
+    return {
+        "id": id,
+        "title": f"Item {id}",
+        "link": f"https://www.example.com/item-{id}/",
+        "result": result,
+        "reason": "existed",
+        "datecheck": "",
+        "slugcheck": "",
+    }
+
+
+class TestLogger(TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.log_dir.cleanup)
+
+    @override_settings(WAGTAIL_WORDPRESS_IMPORTER_LOG_RECENT_ITEMS=2)
+    def test_only_counts_and_recent_items_are_kept(self):
+        logger = Logger(self.log_dir.name)
+        for id in range(1, 5):
+            logger.log_item(make_item(id, "created" if id % 2 else "updated"))
+
+        self.assertEqual(logger.results, {"created": 2, "updated": 2})
+        self.assertEqual([item["id"] for item in logger.items], [3, 4])
+
+    def test_csv_report_is_written_as_items_are_logged(self):
+        logger = Logger(self.log_dir.name)
+        logger.start_import_report()
+        for id in range(1, 4):
+            logger.log_item(make_item(id))
+        logger.save_csv_import_report()
+
+        with open(glob.glob(f"{self.log_dir.name}/import-report-*.csv")[0]) as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0][0], "Page ID")
+        self.assertEqual([row[0] for row in rows[1:]], ["1", "2", "3"])
+        self.assertEqual(rows[3][2], "https://www.example.com/item-3/")
+
+    @override_settings(WAGTAIL_WORDPRESS_IMPORTER_REPORT_FORMAT="jsonl")
+    def test_jsonl_report(self):
+        logger = Logger(self.log_dir.name)
+        logger.start_import_report()
+        logger.log_item(make_item(1))
+        logger.log_item(make_item(0, "excluded"))
+        logger.save_csv_import_report()
+
+        with open(glob.glob(f"{self.log_dir.name}/import-report-*.jsonl")[0]) as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(
+            rows[0],
+            {
+                "id": 1,
+                "title": "Item 1",
+                "url": "https://www.example.com/item-1/",
+                "reason": "existed",
+                "result": "created",
+                "dates": "",
+                "slug": "",
+            },
+        )
+        self.assertEqual(rows[1]["result"], "excluded")
+
+    def test_report_without_start_has_the_recent_items(self):
+        logger = Logger(self.log_dir.name)
+        logger.log_item(make_item(1))
+        logger.save_csv_import_report()
+
+        with open(glob.glob(f"{self.log_dir.name}/import-report-*.csv")[0]) as f:
+            self.assertEqual(len(list(csv.reader(f))), 2)
+
+    @override_settings(WAGTAIL_WORDPRESS_IMPORTER_LOG_RECENT_ITEMS=0)
+    def test_no_recent_items(self):
+        logger = Logger(self.log_dir.name)
+        with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            logger.log_item(make_item(1))
+        self.assertEqual(stdout.getvalue(), "Wagtail ID: 1, Item 1, created\n")
+        self.assertEqual(list(logger.items), [])
+        self.assertEqual(logger.results, {"created": 1})
+
+    @override_settings(WAGTAIL_WORDPRESS_IMPORTER_LOG_RECENT_ITEMS=1)
+    def test_images_and_page_link_errors_are_written_as_they_are_logged(self):
+        logger = Logger(self.log_dir.name)
+        logger.start_import_report()
+        for id in range(1, 4):
+            logger.log_image(
+                {
+                    "id": id,
+                    "title": f"Item {id}",
+                    "link": f"https://www.example.com/image-{id}.jpg",
+                    "reason": "not found",
+                }
+            )
+            logger.log_page_link_error(
+                {
+                    "id": id,
+                    "title": f"Item {id}",
+                    "link": f"https://www.example.com/missing-{id}/",
+                }
+            )
+        logger.save_csv_import_report()
+        logger.save_csv_images_report()
+        logger.save_csv_pagelink_errors_report()
+
+        self.assertEqual(logger.images_logged, 3)
+        self.assertEqual(logger.page_link_errors_logged, 3)
+        self.assertEqual([image["id"] for image in logger.images], [3])
+        self.assertEqual([error["id"] for error in logger.page_link_errors], [3])
+
+        with open(glob.glob(f"{self.log_dir.name}/images-report-*.csv")[0]) as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["Page ID", "Page Title", "Wordpress Link", "Reason"])
+        self.assertEqual([row[0] for row in rows[1:]], ["1", "2", "3"])
+        self.assertEqual(rows[3][2], "https://www.example.com/image-3.jpg")
+
+        with open(
+            glob.glob(f"{self.log_dir.name}/pagelink_errors-report-*.csv")[0]
+        ) as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["Page ID", "Page Title", "Wordpress Link"])
+        self.assertEqual(rows[3], ["3", "Item 3", "https://www.example.com/missing-3/"])
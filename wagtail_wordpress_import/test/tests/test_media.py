@@ -0,0 +1,449 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import requests
+import responses
+from django.core.files.base import ContentFile
+from django.core.files.images import ImageFile
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from wagtail.documents import get_document_model
+from wagtail.images import get_image_model
+
+from wagtail_wordpress_import.block_builder_defaults import (
+    download_media,
+    fetch_media,
+    get_media_urls,
+    get_or_save_document,
+    get_or_save_image,
+    image_linker,
+)
+from wagtail_wordpress_import.media import (
+    FileSystemMediaSource,
+    MediaFetcher,
+    MediaIndex,
+    MediaTooLarge,
+    get_media_fetcher,
+    get_media_source,
+    get_session,
+    normalise_media_url,
+    stream_to_file,
+)
+from wagtail_wordpress_import.models import ImportedMedia
+from wagtail_wordpress_import.test.tests.utility_functions import mock_image, mock_pdf
+
+ImportedDocument = get_document_model()
+ImportedImage = get_image_model()
+
+
+@override_settings(WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN="http://www.example.com")
+class TestMediaFetcher(TestCase):
+    def setUp(self):
+        self.image_url = "http://www.example.com/images/an-image.jpg"
+        self.pdf_url = "http://www.example.com/files/a-document.pdf"
+
+    def add_responses(self):
+        responses.add(
+            responses.GET,
+            self.image_url,
+            body=mock_image().read(),
+            status=200,
+            content_type="image/jpeg",
+        )
+        responses.add(
+            responses.GET,
+            self.pdf_url,
+            body=mock_pdf().read(),
+            status=200,
+            content_type="application/pdf",
+        )
+
+    def test_session_is_shared(self):
+        self.assertIs(get_session(), get_session())
+
+    @responses.activate
+    def test_prefetched_media_is_used(self):
+        self.add_responses()
+        with MediaFetcher(download_media, max_workers=2, max_per_host=1) as fetcher:
+            self.assertIs(get_media_fetcher(), fetcher)
+            fetcher.prefetch([self.image_url, self.pdf_url, self.image_url])
+            media_file, valid, content_type, digest = fetch_media(self.pdf_url)
+            self.assertTrue(valid)
+            self.assertEqual(media_file.read(), b"PDF Document")
+            self.assertEqual(digest, hashlib.sha256(b"PDF Document").hexdigest())
+            fetch_media(self.image_url)
+            self.assertEqual(len(responses.calls), 2)
+
+            # each prefetched result is only used once
+            fetch_media(self.image_url)
+            self.assertEqual(len(responses.calls), 3)
+
+        self.assertIsNone(get_media_fetcher())
+
+    @responses.activate
+    def test_discard_group(self):
+        self.add_responses()
+        with MediaFetcher(download_media) as fetcher:
+            fetcher.prefetch([self.image_url, self.pdf_url], group=1)
+            # a url prefetched again is kept for the later group
+            fetcher.prefetch([self.pdf_url], group=2)
+            fetcher.discard(1)
+            self.assertIsNone(fetcher.get(self.image_url))
+            media_file, valid, content_type, digest = fetcher.get(self.pdf_url)
+            media_file.close()
+            self.assertTrue(valid)
+
+    @responses.activate
+    def test_image_linker_uses_prefetched_image(self):
+        self.add_responses()
+        html = '<p><img src="/images/an-image.jpg" alt="An image" /></p>'
+        with MediaFetcher(download_media) as fetcher:
+            fetcher.prefetch(get_media_urls(html))
+            output = image_linker(html)
+        self.assertIn('embedtype="image"', output)
+        self.assertEqual(len(responses.calls), 1)
+        self.assertTrue(ImportedImage.objects.filter(title="an-image.jpg").exists())
+
+    def test_get_media_urls(self):
+        html = """
+        <img src="/images/an-image.jpg" />
+        <IMG class="photo" src='https://cdn.example.com/other.png'>
+        <a href="/files/a-document.pdf">A document</a>
+        <a href="/a-page/">A page</a>
+        """
+        self.assertEqual(
+            get_media_urls(html),
+            [
+                self.image_url,
+                "https://cdn.example.com/other.png",
+                self.pdf_url,
+            ],
+        )
+
+    def test_get_media_urls_skips_existing_images(self):
+        ImportedImage.objects.create(
+            title="an-image.jpg", file=ImageFile(mock_image(), name="an-image.jpg")
+        )
+        self.assertEqual(get_media_urls('<img src="/images/an-image.jpg" />'), [])
+        with MediaIndex.load():
+            self.assertEqual(get_media_urls('<img src="/images/an-image.jpg" />'), [])
+
+
+class TestFileSystemMediaSource(TestCase):
+    def setUp(self):
+        self.uploads_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.uploads_dir, "2021", "07"))
+        with open(os.path.join(self.uploads_dir, "2021", "07", "local.jpg"), "wb") as f:
+            f.write(mock_image().read())
+        self.source = FileSystemMediaSource(self.uploads_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.uploads_dir)
+
+    def test_get_path(self):
+        self.assertEqual(
+            self.source.get_path(
+                "https://www.example.com/wp-content/uploads/2021/07/local.jpg"
+            ),
+            os.path.join(self.uploads_dir, "2021", "07", "local.jpg"),
+        )
+        self.assertIsNone(
+            self.source.get_path(
+                "https://www.example.com/wp-content/uploads/2021/07/missing.jpg"
+            )
+        )
+        self.assertIsNone(
+            self.source.get_path("https://www.example.com/images/local.jpg")
+        )
+
+    def test_get_path_stays_in_uploads_dir(self):
+        self.assertIsNone(
+            self.source.get_path(
+                "https://www.example.com/wp-content/uploads/../../etc/passwd"
+            )
+        )
+
+    def test_open(self):
+        media_file, content_type = self.source.open(
+            "https://www.example.com/wp-content/uploads/2021/07/local.jpg"
+        )
+        with media_file:
+            self.assertTrue(media_file.read().startswith(b"\xff\xd8"))
+        self.assertEqual(content_type, "image/jpeg")
+
+    def test_media_source_is_created_once(self):
+        self.assertIsNone(get_media_source())
+        with override_settings(
+            WAGTAIL_WORDPRESS_IMPORTER_MEDIA_SOURCE="wagtail_wordpress_import.media.FileSystemMediaSource",
+            WAGTAIL_WORDPRESS_IMPORTER_UPLOADS_DIR=self.uploads_dir,
+        ):
+            source = get_media_source()
+            self.assertIsInstance(source, FileSystemMediaSource)
+            self.assertIs(get_media_source(), source)
+            with override_settings(
+                WAGTAIL_WORDPRESS_IMPORTER_UPLOADS_URL_PATH="/uploads/"
+            ):
+                self.assertEqual(get_media_source().url_path, "/uploads/")
+            self.assertEqual(get_media_source().url_path, "/wp-content/uploads/")
+        self.assertIsNone(get_media_source())
+
+    @responses.activate
+    def test_image_saved_from_uploads_dir(self):
+        with override_settings(
+            WAGTAIL_WORDPRESS_IMPORTER_MEDIA_SOURCE="wagtail_wordpress_import.media.FileSystemMediaSource",
+            WAGTAIL_WORDPRESS_IMPORTER_UPLOADS_DIR=self.uploads_dir,
+        ):
+            image = get_or_save_image(
+                "https://www.example.com/wp-content/uploads/2021/07/local.jpg"
+            )
+        self.assertEqual(image.title, "local.jpg")
+        self.assertEqual(image.width, 100)
+        self.assertEqual(len(responses.calls), 0)
+
+    @responses.activate
+    def test_missing_file_is_downloaded(self):
+        url = "https://www.example.com/wp-content/uploads/2021/07/remote.jpg"
+        responses.add(
+            responses.GET,
+            url,
+            body=mock_image().read(),
+            status=200,
+            content_type="image/jpeg",
+        )
+        with override_settings(
+            WAGTAIL_WORDPRESS_IMPORTER_MEDIA_SOURCE="wagtail_wordpress_import.media.FileSystemMediaSource",
+            WAGTAIL_WORDPRESS_IMPORTER_UPLOADS_DIR=self.uploads_dir,
+        ):
+            image = get_or_save_image(url)
+        self.assertEqual(image.title, "remote.jpg")
+        self.assertEqual(len(responses.calls), 1)
+
+
+class TestDownloadMedia(TestCase):
+    def setUp(self):
+        self.url = "http://www.example.com/files/a-document.pdf"
+
+    @responses.activate
+    def test_download_is_streamed_to_file(self):
+        responses.add(
+            responses.GET,
+            self.url,
+            body=b"x" * 200000,
+            status=200,
+            content_type="application/pdf",
+        )
+        media_file, valid, content_type, digest = download_media(self.url)
+        with media_file:
+            self.assertTrue(valid)
+            self.assertEqual(media_file.read(), b"x" * 200000)
+        self.assertEqual(digest, hashlib.sha256(b"x" * 200000).hexdigest())
+
+    def test_response_is_closed_when_not_found(self):
+        response = mock.Mock(status_code=404)
+        with mock.patch(
+            "wagtail_wordpress_import.block_builder_defaults.fetch_url",
+            return_value=(response, False, "text/html"),
+        ):
+            self.assertEqual(download_media(self.url), (None, False, "text/html", None))
+        response.close.assert_called_once_with()
+        response.iter_content.assert_not_called()
+
+    @override_settings(WAGTAIL_WORDPRESS_IMPORTER_MEDIA_MAX_SIZE=1000)
+    @responses.activate
+    def test_content_length_too_large(self):
+        responses.add(
+            responses.GET,
+            self.url,
+            body=b"x" * 2000,
+            status=200,
+            content_type="application/pdf",
+        )
+        media_file, valid, content_type, digest = download_media(self.url)
+        self.assertIsNone(media_file)
+        self.assertFalse(valid)
+
+    @override_settings(WAGTAIL_WORDPRESS_IMPORTER_MEDIA_MAX_SIZE=1000)
+    @responses.activate
+    def test_body_too_large_without_content_length(self):
+        responses.add(
+            responses.GET,
+            self.url,
+            body=b"x" * 2000,
+            status=200,
+            content_type="application/pdf",
+            auto_calculate_content_length=False,
+        )
+        response = requests.get(self.url, stream=True)
+        response.headers.pop("Content-Length", None)
+        with self.assertRaises(MediaTooLarge):
+            stream_to_file(response, max_size=1000)
+
+
+class TestMediaIndex(TestCase):
+    def add_image_response(self, url):
+        responses.add(
+            responses.GET,
+            url,
+            body=mock_image().read(),
+            status=200,
+            content_type="image/jpeg",
+        )
+
+    def test_normalise_media_url(self):
+        self.assertEqual(
+            normalise_media_url(
+                "https://www.example.com/wp-content/uploads/image-300x200.jpg?ver=2"
+            ),
+            "example.com/wp-content/uploads/image.jpg",
+        )
+        self.assertEqual(
+            normalise_media_url("http://example.com/image-scaled.png"),
+            "example.com/image.png",
+        )
+
+    @responses.activate
+    def test_resized_image_is_not_imported_again(self):
+        self.add_image_response("http://www.example.com/uploads/image.jpg")
+        with MediaIndex.load():
+            image = get_or_save_image("http://www.example.com/uploads/image.jpg")
+            with self.assertNumQueries(0):
+                self.assertEqual(
+                    get_or_save_image(
+                        "https://www.example.com/uploads/image-300x200.jpg"
+                    ),
+                    image,
+                )
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_original_is_not_found_as_a_resized_image(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/uploads/image-300x200.jpg",
+            body=mock_image(color="red").read(),
+            status=200,
+            content_type="image/jpeg",
+        )
+        self.add_image_response("http://www.example.com/uploads/image.jpg")
+        self.add_image_response("http://www.example.com/uploads/image-600x400.jpg")
+        with MediaIndex.load():
+            thumbnail = get_or_save_image(
+                "http://www.example.com/uploads/image-300x200.jpg"
+            )
+            image = get_or_save_image("http://www.example.com/uploads/image.jpg")
+            self.assertNotEqual(image, thumbnail)
+            self.assertEqual(
+                get_or_save_image("http://www.example.com/uploads/image-600x400.jpg"),
+                image,
+            )
+
+        index = MediaIndex.load()
+        self.assertEqual(
+            index.get("image", "http://www.example.com/uploads/image-1024x768.jpg"),
+            image.id,
+        )
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_same_file_from_another_url_is_not_imported_again(self):
+        self.add_image_response("http://www.example.com/uploads/image.jpg")
+        self.add_image_response("http://www.example.com/other/copy.jpg")
+        with MediaIndex.load():
+            image = get_or_save_image("http://www.example.com/uploads/image.jpg")
+            self.assertEqual(
+                get_or_save_image("http://www.example.com/other/copy.jpg"), image
+            )
+        self.assertEqual(ImportedImage.objects.count(), 1)
+        self.assertEqual(ImportedMedia.objects.filter(object_id=image.id).count(), 2)
+
+    @responses.activate
+    def test_same_filename_with_different_content_is_imported(self):
+        responses.add(
+            responses.GET,
+            "http://www.example.com/2020/image.jpg",
+            body=mock_image(color="red").read(),
+            status=200,
+            content_type="image/jpeg",
+        )
+        self.add_image_response("http://www.example.com/2021/image.jpg")
+        self.add_image_response("http://www.example.com/2022/image.jpg")
+        with MediaIndex.load():
+            first = get_or_save_image("http://www.example.com/2020/image.jpg")
+            second = get_or_save_image("http://www.example.com/2021/image.jpg")
+            self.assertEqual(
+                get_or_save_image("http://www.example.com/2022/image.jpg"), second
+            )
+        self.assertNotEqual(first, second)
+
+    @responses.activate
+    def test_image_imported_before_urls_were_recorded(self):
+        url = "http://www.example.com/uploads/image.jpg"
+        image = ImportedImage.objects.create(
+            title="image.jpg", file=ImageFile(mock_image(), name="image.jpg")
+        )
+        with MediaIndex.load() as index:
+            self.assertEqual(get_media_urls(f'<img src="{url}" />'), [])
+            self.assertEqual(get_or_save_image(url), image)
+            self.assertEqual(index.get("image", url), image.id)
+        self.assertEqual(len(responses.calls), 0)
+        self.assertEqual(ImportedImage.objects.count(), 1)
+        self.assertEqual(ImportedMedia.objects.get(source_url=url).object_id, image.id)
+
+    @responses.activate
+    def test_document_imported_before_urls_were_recorded(self):
+        url = "http://www.example.com/files/a-document.pdf"
+        document = ImportedDocument.objects.create(
+            title="a-document.pdf",
+            file=ContentFile(b"PDF Document", name="a-document.pdf"),
+        )
+        with MediaIndex.load():
+            self.assertEqual(get_media_urls(f'<a href="{url}">A</a>'), [])
+            self.assertEqual(get_or_save_document(url), document)
+        self.assertEqual(len(responses.calls), 0)
+        self.assertEqual(ImportedDocument.objects.count(), 1)
+        self.assertTrue(ImportedMedia.objects.filter(source_url=url).exists())
+
+    def test_source_url_is_recorded_once(self):
+        index = MediaIndex.load()
+        # recorded by another import since the index was loaded
+        ImportedMedia.objects.create(
+            media_type="image",
+            source_url="http://www.example.com/uploads/image.jpg",
+            normalised_url="example.com/uploads/image.jpg",
+            sha256="a" * 64,
+            object_id=1,
+        )
+        image = ImportedImage.objects.create(
+            title="image.jpg", file=ImageFile(mock_image(), name="image.jpg")
+        )
+        index.add("image", "http://www.example.com/uploads/image.jpg", "b" * 64, image)
+
+        self.assertEqual(ImportedMedia.objects.count(), 1)
+        self.assertEqual(
+            index.get("image", "http://www.example.com/uploads/image.jpg"), 1
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ImportedMedia.objects.create(
+                media_type="image",
+                source_url="http://www.example.com/uploads/image.jpg",
+                normalised_url="example.com/uploads/image.jpg",
+                sha256="b" * 64,
+                object_id=image.id,
+            )
+
+    @responses.activate
+    def test_index_is_loaded_from_imported_media(self):
+        self.add_image_response("http://www.example.com/uploads/image.jpg")
+        with MediaIndex.load():
+            image = get_or_save_image("http://www.example.com/uploads/image.jpg")
+
+        index = MediaIndex.load()
+        self.assertEqual(
+            index.get("image", "http://www.example.com/uploads/image.jpg"), image.id
+        )
+        self.assertIsNone(
+            index.get("document", "http://www.example.com/uploads/image.jpg")
+        )
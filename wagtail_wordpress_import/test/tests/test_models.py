@@ -0,0 +1,110 @@
+import os
+from unittest import mock
+
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase
+from wagtail import VERSION as WAGTAIL_VERSION
+
+if WAGTAIL_VERSION >= (3, 0):
+    from wagtail.models import Page
+else:
+    from wagtail.core.models import Page
+
+from wagtail_wordpress_import.checks import (
+    check_imported_page_fields,
+    check_imported_page_indexes,
+)
+from wagtail_wordpress_import.importers.page_links import get_link_path_hash
+from wagtail_wordpress_import.operations import PopulateWPLinkHash
+from wagtail_wordpress_import.test.models import TestPage
+
+BASE_PATH = os.path.dirname(os.path.dirname(__file__))
+FIXTURES_PATH = BASE_PATH + "/fixtures"
+
+
+class TestWPImportedPageMixin(TestCase):
+    fixtures = [
+        f"{FIXTURES_PATH}/dump.json",
+    ]
+
+    def setUp(self):
+        self.page = Page.objects.get(pk=2).add_child(
+            instance=TestPage(
+                title="A title",
+                slug="a-title",
+                wp_post_id=43120,
+                wp_link="https://www.example.com/2015/05/a-title/",
+            )
+        )
+
+    def test_wp_link_hash_is_set_on_save(self):
+        self.assertEqual(self.page.wp_link_hash, get_link_path_hash("/2015/05/a-title"))
+
+    def test_link_path_hash(self):
+        self.assertEqual(
+            get_link_path_hash("http://example.com/2015/05/a-title#comments"),
+            get_link_path_hash("/2015/05/a-title/"),
+        )
+        self.assertNotEqual(
+            get_link_path_hash("/2015/05/a-title"), get_link_path_hash("/a-title")
+        )
+        self.assertIsNone(get_link_path_hash("mailto:joe@example.com"))
+
+    def test_filter_by_wp_link(self):
+        for link in [
+            "https://example.com/2015/05/a-title",
+            "/2015/05/a-title/",
+            "https://www.example.com/?p=43120",
+        ]:
+            with self.subTest(link=link):
+                self.assertEqual(
+                    list(TestPage.filter_by_wp_link(link)), [self.page.testpage]
+                )
+        self.assertFalse(TestPage.filter_by_wp_link("/another-title").exists())
+        self.assertFalse(TestPage.filter_by_wp_link("mailto:a@example.com").exists())
+
+    def test_populate_wp_link_hash(self):
+        TestPage.objects.filter(pk=self.page.pk).update(wp_link_hash=None)
+        state = MigrationLoader(connection).project_state(
+            ("wagtail_wordpress_import_test", "0003_testpage_wp_lookup_indexes")
+        )
+        PopulateWPLinkHash("testpage").database_forwards(
+            "wagtail_wordpress_import_test",
+            mock.Mock(connection=connection),
+            state,
+            state,
+        )
+        self.assertEqual(
+            TestPage.objects.get(pk=self.page.pk).wp_link_hash,
+            get_link_path_hash(self.page.wp_link),
+        )
+
+
+class TestImportedPageChecks(TestCase):
+    def test_fields_are_indexed(self):
+        self.assertEqual(check_imported_page_fields(None), [])
+
+    def test_field_without_index(self):
+        with mock.patch.object(
+            TestPage._meta.get_field("wp_post_id"), "db_index", False
+        ):
+            errors = check_imported_page_fields(None)
+        self.assertEqual(
+            [error.id for error in errors], ["wagtail_wordpress_import.W001"]
+        )
+        self.assertIs(errors[0].obj, TestPage)
+
+    def test_database_indexes(self):
+        self.assertEqual(check_imported_page_indexes(None), [])
+        self.assertEqual(check_imported_page_indexes(None, databases=["default"]), [])
+
+    def test_database_without_indexes(self):
+        with mock.patch.object(
+            connection.introspection, "get_constraints", return_value={}
+        ):
+            errors = check_imported_page_indexes(None, databases=["default"])
+        self.assertEqual(
+            [error.id for error in errors], ["wagtail_wordpress_import.W002"]
+        )
+        self.assertIn("wp_post_id, wp_link_hash", errors[0].msg)
@@ -0,0 +1,113 @@
+import os
+
+from django.test import TestCase, override_settings
+from wagtail import VERSION as WAGTAIL_VERSION
+
+if WAGTAIL_VERSION >= (3, 0):
+    from wagtail.models import Page
+else:
+    from wagtail.core.models import Page
+
+from wagtail_wordpress_import.importers.page_links import PageLinkIndex, split_link
+from wagtail_wordpress_import.importers.wordpress import WordpressImporter
+from wagtail_wordpress_import.logger import Logger
+
+BASE_PATH = os.path.dirname(os.path.dirname(__file__))
+FIXTURES_PATH = BASE_PATH + "/fixtures"
+LOG_DIR = "fakedir"
+
+
+class TestSplitLink(TestCase):
+    def test_absolute_link(self):
+        self.assertEqual(
+            split_link("https://www.Example.com:443/a-page/#top"),
+            ("example.com", "/a-page", None),
+        )
+
+    def test_relative_link(self):
+        self.assertEqual(split_link("/a-page"), (None, "/a-page", None))
+
+    def test_post_id_permalink(self):
+        self.assertEqual(
+            split_link("http://example.com/?p=12"), ("example.com", "/", 12)
+        )
+        self.assertEqual(split_link("/?page_id=3"), (None, "/", 3))
+
+    def test_not_a_page_link(self):
+        self.assertIsNone(split_link(None))
+        self.assertIsNone(split_link("#an-anchor"))
+        self.assertIsNone(split_link("mailto:someone@example.com"))
+
+
+class TestPageLinkIndex(TestCase):
+    def setUp(self):
+        self.index = PageLinkIndex()
+        self.index.add(10, "https://www.example.com/page-one/", 1)
+        self.index.add(20, "https://www.example.com/blog/page-two/", 2)
+
+    def test_resolve(self):
+        self.assertEqual(self.index.resolve("https://www.example.com/page-one/"), 10)
+        self.assertEqual(self.index.resolve("http://example.com/page-one"), 10)
+        self.assertEqual(self.index.resolve("/blog/page-two/"), 20)
+        self.assertEqual(self.index.resolve("https://example.com/?p=2"), 20)
+
+    def test_unresolved(self):
+        self.assertIsNone(self.index.resolve("https://www.example.com/missing/"))
+        self.assertIsNone(self.index.resolve("https://www.other.com/page-one/"))
+        self.assertIsNone(self.index.resolve("/?p=3"))
+
+    def test_is_internal(self):
+        self.assertTrue(self.index.is_internal("https://example.com/missing/"))
+        self.assertTrue(self.index.is_internal("/missing/"))
+        self.assertFalse(self.index.is_internal("https://www.other.com/page-one/"))
+        self.assertFalse(self.index.is_internal("mailto:someone@example.com"))
+
+
+@override_settings(WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN="http://www.example.com")
+class TestImporterPageLinks(TestCase):
+    fixtures = [
+        f"{FIXTURES_PATH}/dump.json",
+    ]
+
+    def setUp(self):
+        self.logger = Logger(LOG_DIR)
+        self.importer = WordpressImporter(f"{FIXTURES_PATH}/page_links.xml")
+        self.importer.run(
+            logger=self.logger,
+            app_for_pages="wagtail_wordpress_import_test",
+            model_for_pages="TestPage",
+            parent_id="2",
+            page_types=["page"],
+            page_statuses=["publish"],
+        )
+        pages = Page.objects.get(id=2).get_children().specific()
+        self.page_one = pages.get(title="Page one")
+        self.page_two = pages.get(title="Page two")
+
+    def test_links_resolved(self):
+        html = str(self.page_one.body)
+        self.assertEqual(html.count(f'href="{self.page_two.url}"'), 2)
+        self.assertIn('href="https://www.other.com/page-two/"', html)
+        self.assertIn('href="mailto:someone@example.com"', html)
+        self.assertIn(
+            'href="https://www.example.com/wp-content/uploads/2021/07/archive.zip"',
+            html,
+        )
+        self.assertIn(f'href="{self.page_one.url}"', str(self.page_two.body))
+
+    def test_unresolved_links_reported(self):
+        self.assertEqual(self.logger.page_link_errors_logged, 1)
+        self.assertEqual(
+            list(self.logger.page_link_errors),
+            [
+                {
+                    "id": self.page_one.id,
+                    "title": "Page one",
+                    "link": "https://www.example.com/missing/",
+                }
+            ],
+        )
+
+    def test_only_pages_with_forward_links_updated_again(self):
+        # page two links back to page one, which was already imported
+        self.assertEqual(self.importer.pages_with_unresolved_links, [self.page_one.id])
@@ -0,0 +1,146 @@
+import os
+
+from bs4 import BeautifulSoup
+from django.test import TestCase
+
+from wagtail_wordpress_import.block_builder_defaults import build_richtext_block_content
+from wagtail_wordpress_import.importers.wordpress import DEFAULT_PREFILTERS
+from wagtail_wordpress_import.prefilters.bleach_filter import (
+    ALLOWED_ATTRIBUTES,
+    ALLOWED_STYLES,
+    ALLOWED_TAGS,
+    build_cleaner,
+)
+from wagtail_wordpress_import.prefilters.pipeline import run_prefilters, soup_prefilter
+
+BASE_PATH = os.path.dirname(os.path.dirname(__file__))
+FIXTURES_PATH = BASE_PATH + "/fixtures"
+
+PREFILTER_PATH = "wagtail_wordpress_import.test.tests.test_prefilter_pipeline"
+received = []
+
+
+@soup_prefilter
+def add_class(soup, options=None):
+    received.append(soup)
+    for p in soup.find_all("p"):
+        p["class"] = options["CLASS"]
+    return soup
+
+
+def upper_case(html, options=None):
+    received.append(html)
+    return html.upper()
+
+
+class TestRunPrefilters(TestCase):
+    def setUp(self):
+        received.clear()
+
+    def test_soup_prefilters_share_a_tree(self):
+        output = run_prefilters(
+            "<p>one</p>",
+            [
+                {"FUNCTION": f"{PREFILTER_PATH}.add_class", "OPTIONS": {"CLASS": "a"}},
+                {"FUNCTION": f"{PREFILTER_PATH}.add_class", "OPTIONS": {"CLASS": "b"}},
+            ],
+        )
+        self.assertEqual(output, '<p class="b">one</p>')
+        self.assertIsInstance(received[0], BeautifulSoup)
+        self.assertIs(received[0], received[1])
+
+    def test_string_prefilters_receive_a_string(self):
+        output = run_prefilters(
+            "<p>one</p>",
+            [
+                {"FUNCTION": f"{PREFILTER_PATH}.add_class", "OPTIONS": {"CLASS": "a"}},
+                {"FUNCTION": f"{PREFILTER_PATH}.upper_case"},
+                {"FUNCTION": f"{PREFILTER_PATH}.add_class", "OPTIONS": {"CLASS": "b"}},
+            ],
+        )
+        self.assertEqual(received[1], '<p class="a">one</p>')
+        self.assertEqual(output, '<p class="b">ONE</p>')
+
+    def test_no_content(self):
+        for content in [None, ""]:
+            with self.subTest(content=content):
+                output = run_prefilters(
+                    content,
+                    [
+                        {
+                            "FUNCTION": f"{PREFILTER_PATH}.add_class",
+                            "OPTIONS": {"CLASS": "a"},
+                        },
+                        {"FUNCTION": f"{PREFILTER_PATH}.upper_case"},
+                    ],
+                )
+                self.assertEqual(output, "")
+                self.assertEqual(received[-1], "")
+
+    def test_debug_content(self):
+        debug_content = {}
+        run_prefilters(
+            "<p>one</p>",
+            [
+                {"FUNCTION": f"{PREFILTER_PATH}.upper_case"},
+                {"FUNCTION": f"{PREFILTER_PATH}.add_class", "OPTIONS": {"CLASS": "a"}},
+            ],
+            debug_content=debug_content,
+        )
+        self.assertEqual(
+            debug_content,
+            {"upper_case": "<P>ONE</P>", "add_class": '<p class="a">ONE</p>'},
+        )
+
+    def test_transform_inline_styles_in_soup_mode(self):
+        output = run_prefilters(
+            '<p style="text-align: center">one</p>',
+            [
+                {
+                    "FUNCTION": "wagtail_wordpress_import.prefilters.transform_inline_styles"
+                }
+            ],
+        )
+        self.assertEqual(
+            output, '<p class="align-center" style="text-align:center;">one</p>'
+        )
+
+
+class TestDefaultPrefiltersKeepNoState(TestCase):
+    """The default prefilters are run over many items in an import, nothing
+    they keep between items should grow with the number of items."""
+
+    def setUp(self):
+        with open(f"{FIXTURES_PATH}/raw_html.txt", "r") as f:
+            self.content = f.read()
+
+    def test_repeated_items(self):
+        allow_lists = (
+            list(ALLOWED_TAGS),
+            {tag: list(names) for tag, names in ALLOWED_ATTRIBUTES.items()},
+            list(ALLOWED_STYLES),
+        )
+        output = run_prefilters(self.content, DEFAULT_PREFILTERS)
+        cleaners = build_cleaner.cache_info().currsize
+
+        for i in range(200):
+            self.assertEqual(run_prefilters(self.content, DEFAULT_PREFILTERS), output)
+
+        self.assertEqual(build_cleaner.cache_info().currsize, cleaners)
+        self.assertEqual(
+            (
+                ALLOWED_TAGS,
+                {tag: list(names) for tag, names in ALLOWED_ATTRIBUTES.items()},
+                ALLOWED_STYLES,
+            ),
+            allow_lists,
+        )
+
+
+class TestBuildRichtextBlockContent(TestCase):
+    def test_html_without_media_tags(self):
+        blocks = []
+        build_richtext_block_content("<p>Some <b>text</b></p>", blocks)
+        self.assertEqual(
+            blocks, [{"type": "rich_text", "value": "<p>Some <b>text</b></p>"}]
+        )
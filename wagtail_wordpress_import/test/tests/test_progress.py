@@ -0,0 +1,90 @@
+import io
+import json
+import os
+import tempfile
+
+from django.test import TestCase
+
+from wagtail_wordpress_import.logger import Logger
+from wagtail_wordpress_import.progress import ImportProgress
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def log_item(logger, result):
+    logger.processed += 1
+    logger.bytes_processed += 1024 * 1024
+    logger.log_item(
+        {
+            "id": logger.processed,
+            "title": "",
+            "link": "",
+            "result": result,
+            "reason": "",
+            "datecheck": "",
+            "slugcheck": "",
+        }
+    )
+
+
+class TestImportProgress(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.stream = io.StringIO()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.status_file = os.path.join(temp_dir.name, "status.json")
+        self.progress = ImportProgress(
+            stream=self.stream,
+            status_file=self.status_file,
+            interval=10,
+            clock=self.clock,
+        )
+        self.logger = Logger("fakedir", progress=self.progress, verbose=False)
+
+    def read_status(self):
+        with open(self.status_file) as f:
+            return json.load(f)
+
+    def test_updates_are_rate_limited(self):
+        self.progress.start(total=100)
+        for i in range(5):
+            self.clock.now += 1
+            log_item(self.logger, "created")
+        self.assertEqual(self.stream.getvalue(), "")
+
+        self.clock.now = 10
+        log_item(self.logger, "excluded")
+        self.assertEqual(
+            self.stream.getvalue(),
+            "6/100 items (6%), 0.6 items/s, created: 5 updated: 0 unchanged: 0 "
+            "skipped: 1, media fetched: 0, 6.0 MB, ETA 0:02:37\n",
+        )
+
+        status = self.read_status()
+        self.assertEqual(status["state"], "running")
+        self.assertEqual(status["processed"], 6)
+        self.assertEqual(status["skipped"], 1)
+        self.assertEqual(status["bytes_processed"], 6 * 1024 * 1024)
+        self.assertEqual(status["eta_seconds"], 156.7)
+
+    def test_finish(self):
+        self.progress.start()
+        self.clock.now = 2
+        log_item(self.logger, "updated")
+        self.progress.finish(self.logger)
+
+        self.assertEqual(
+            self.stream.getvalue(),
+            "1 items, 0.5 items/s, created: 0 updated: 1 unchanged: 0 "
+            "skipped: 0, media fetched: 0, 1.0 MB, finished in 0:00:02\n",
+        )
+        status = self.read_status()
+        self.assertEqual(status["state"], "finished")
+        self.assertIsNone(status["eta_seconds"])
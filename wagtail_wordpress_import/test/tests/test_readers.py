@@ -0,0 +1,162 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.test import TestCase, override_settings
+
+from wagtail_wordpress_import.importers.readers import (
+    IndexedItemReader,
+    IterparseItemReader,
+    PulldomItemReader,
+    get_item_reader_class,
+)
+from wagtail_wordpress_import.test.tests.xml_boilerplate import build_xml_stream
+
+BASE_PATH = os.path.dirname(os.path.dirname(__file__))
+FIXTURES_PATH = BASE_PATH + "/fixtures"
+
+
+class TestItemReadersParity(TestCase):
+    """The iterparse reader should yield exactly what the pulldom reader does"""
+
+    def assertReadersMatch(self, xml_source, tags_to_cache=None):
+        if isinstance(xml_source, str) and os.path.exists(xml_source):
+            pulldom_items = list(PulldomItemReader(xml_source, tags_to_cache))
+            iterparse_items = list(IterparseItemReader(xml_source, tags_to_cache))
+        else:
+            pulldom_items = list(PulldomItemReader(StringIO(xml_source), tags_to_cache))
+            iterparse_items = list(
+                IterparseItemReader(StringIO(xml_source), tags_to_cache)
+            )
+        self.assertTrue(pulldom_items)
+        self.assertEqual(pulldom_items, iterparse_items)
+        return iterparse_items
+
+    def test_raw_xml_fixture(self):
+        items = self.assertReadersMatch(f"{FIXTURES_PATH}/raw_xml.xml")
+        self.assertEqual(len(items), 5)
+
+    def test_post_meta_fixture(self):
+        items = self.assertReadersMatch(f"{FIXTURES_PATH}/post_meta.xml")
+        self.assertEqual(len(items), 5)
+
+    def test_tags_to_cache(self):
+        xml = build_xml_stream(
+            xml_tags_fragment="""
+            <wp:author>
+                <wp:author_id>3</wp:author_id>
+                <wp:author_login><![CDATA[rickw]]></wp:author_login>
+            </wp:author>
+            <wp:author>
+                <wp:author_id>4</wp:author_id>
+                <wp:author_login><![CDATA[joe]]></wp:author_login>
+            </wp:author>
+            """,
+            xml_items_fragment="""
+            <item>
+                <title>Item one</title>
+                <wp:post_id>1</wp:post_id>
+            </item>
+            """,
+        ).read()
+        items = self.assertReadersMatch(xml, tags_to_cache=["wp:author"])
+        self.assertEqual(
+            [tag_name for tag_name, item in items], ["wp:author", "wp:author", "item"]
+        )
+        self.assertEqual(items[0][1], {"wp:author_id": 3, "wp:author_login": "rickw"})
+
+    def test_value_types(self):
+        xml = build_xml_stream(
+            xml_items_fragment="""
+            <item>
+                <title> A title </title>
+                <description />
+                <content:encoded><![CDATA[]]></content:encoded>
+                <excerpt:encoded><![CDATA[<p>foo</p>]]>bar<!-- baz --></excerpt:encoded>
+                <wp:post_id>12</wp:post_id>
+                <wp:is_sticky>false</wp:is_sticky>
+                <wp:post-password>true</wp:post-password>
+                <category domain="category" nicename="foo"><![CDATA[Foo]]></category>
+                <category domain="category" nicename="bar"><![CDATA[Bar]]></category>
+                <wp:postmeta>
+                    <wp:meta_key><![CDATA[_thumbnail_id]]></wp:meta_key>
+                    <wp:meta_value><![CDATA[43124]]></wp:meta_value>
+                </wp:postmeta>
+                <wp:nothing><nil>true</nil></wp:nothing>
+                <wp:comment>
+                    <item><title>A nested item is not yielded</title></item>
+                </wp:comment>
+            </item>
+            """,
+        ).read()
+        items = self.assertReadersMatch(xml)
+        self.assertEqual(len(items), 1)
+        item = items[0][1]
+        self.assertEqual(item["title"], " A title ")
+        self.assertIsNone(item["description"])
+        self.assertIsNone(item["content:encoded"])
+        self.assertEqual(item["wp:post_id"], 12)
+        self.assertIs(item["wp:is_sticky"], False)
+        self.assertIs(item["wp:post_password"], True)
+        self.assertEqual(item["category"], ["Foo", "Bar"])
+        self.assertIsNone(item["wp:nothing"])
+
+
+class TestItemReadersEntities(TestCase):
+    """An external entity in a DOCTYPE isn't resolved"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        secret_file = os.path.join(self.temp_dir, "secret.txt")
+        with open(secret_file, "w") as f:
+            f.write("secret")
+        self.xml_file = os.path.join(self.temp_dir, "export.xml")
+        with open(self.xml_file, "w") as f:
+            f.write(
+                f"""<?xml version="1.0" encoding="UTF-8"?>
+                <!DOCTYPE rss [<!ENTITY secret SYSTEM "file://{secret_file}">]>
+                <rss xmlns:wp="http://wordpress.org/export/1.2/" version="2.0">
+                <channel>
+                    <wp:author><wp:author_login>&secret;</wp:author_login></wp:author>
+                    <item>
+                        <title>&secret;</title>
+                        <wp:post_id>1</wp:post_id>
+                        <wp:post_type>post</wp:post_type>
+                    </item>
+                </channel>
+                </rss>"""
+            )
+
+    def test_iterparse_reader(self):
+        items = list(IterparseItemReader(self.xml_file, ["wp:author"]))
+        self.assertEqual(len(items), 2)
+        self.assertNotIn("secret", str(items))
+
+    def test_indexed_reader(self):
+        items = list(
+            IndexedItemReader(self.xml_file, ["wp:author"], post_types=["post"])
+        )
+        self.assertEqual(len(items), 2)
+        self.assertNotIn("secret", str(items))
+
+
+class TestGetItemReaderClass(TestCase):
+    def test_default_reader(self):
+        self.assertIs(get_item_reader_class(), IterparseItemReader)
+
+    def test_reader_by_name(self):
+        self.assertIs(get_item_reader_class("pulldom"), PulldomItemReader)
+
+    def test_reader_by_dotted_path(self):
+        self.assertIs(
+            get_item_reader_class(
+                "wagtail_wordpress_import.importers.readers.PulldomItemReader"
+            ),
+            PulldomItemReader,
+        )
+
+    @override_settings(WAGTAIL_WORDPRESS_IMPORT_ITEM_READER="pulldom")
+    def test_reader_from_settings(self):
+        self.assertIs(get_item_reader_class(), PulldomItemReader)
@@ -1,3 +1,5 @@
+from unittest import mock
+
 import responses
 from bs4 import BeautifulSoup
 from django.test import TestCase
@@ -6,7 +8,10 @@ from wagtail.images import get_image_model
 from wagtail_wordpress_import.prefilters.handle_shortcodes import (
     SHORTCODE_HANDLERS,
     BlockShortcodeHandler,
+    BlockShortcodeScanner,
     CaptionHandler,
+    filter_transform_shortcodes,
+    get_shortcode_scanner,
     register,
 )
 from wagtail_wordpress_import.test.tests.utility_functions import mock_image
@@ -460,3 +465,121 @@ class TestCaptionHandler(TestCase):
         )
         self.assertEqual(output["value"]["alignment"], "center")
         self.assertEqual(output["value"]["link"], "")
+
+
+class FooHandler(BlockShortcodeHandler):
+    shortcode_name = "foo"
+
+
+class BarHandler(BlockShortcodeHandler):
+    shortcode_name = "bar"
+
+
+class TestBlockShortcodeScanner(TestCase):
+    def setUp(self):
+        self.scanner = BlockShortcodeScanner([FooHandler(), BarHandler()])
+
+    def test_matches_pre_filter(self):
+        html = 'ham[foo]eggs[/foo]spam [bar width="12"]beans[/bar]'
+        self.assertEqual(
+            self.scanner.pre_filter(html),
+            BarHandler().pre_filter(FooHandler().pre_filter(html)),
+        )
+
+    def test_nested_shortcodes(self):
+        html = "[foo a=1]x[foo]y[/foo][bar]z[/bar][/foo]"
+        self.assertEqual(
+            self.scanner.pre_filter(html),
+            "<wagtail_block_foo a=1>x<wagtail_block_foo>y</wagtail_block_foo>"
+            "<wagtail_block_bar>z</wagtail_block_bar></wagtail_block_foo>",
+        )
+
+    def test_self_closing_shortcode(self):
+        html = 'ham [foo src="x.jpg" /] spam'
+        self.assertEqual(
+            self.scanner.pre_filter(html),
+            'ham <wagtail_block_foo src="x.jpg" ></wagtail_block_foo> spam',
+        )
+
+    def test_self_closing_shortcode_after_a_quote(self):
+        html = 'ham [foo src="x.jpg"/] spam'
+        self.assertEqual(
+            self.scanner.pre_filter(html),
+            'ham <wagtail_block_foo src="x.jpg"></wagtail_block_foo> spam',
+        )
+
+    def test_unquoted_value_ending_in_a_slash(self):
+        # the / is part of the value, as with BlockShortcodeHandler.pre_filter
+        html = "[foo link=http://www.example.com/]x[/foo] [bar a=1/]"
+        self.assertEqual(
+            self.scanner.pre_filter(html),
+            BarHandler().pre_filter(FooHandler().pre_filter(html)),
+        )
+        self.assertEqual(
+            self.scanner.pre_filter(html),
+            "<wagtail_block_foo link=http://www.example.com/>x</wagtail_block_foo>"
+            " [bar a=1/]",
+        )
+
+    def test_content_can_span_lines(self):
+        html = "[foo]\n<img />\ncaption[/foo]"
+        self.assertEqual(
+            self.scanner.pre_filter(html),
+            "<wagtail_block_foo>\n<img />\ncaption</wagtail_block_foo>",
+        )
+
+    def test_caption_can_span_lines(self):
+        # BlockShortcodeHandler.pre_filter only matches a caption on one line
+        html = (
+            '[caption id="attachment_1" align="aligncenter" width="600"]\n'
+            '<img src="https://www.example.com/images/foo.jpg" />\n'
+            "A caption[/caption]"
+        )
+        self.assertEqual(CaptionHandler().pre_filter(html), html)
+        self.assertEqual(
+            BlockShortcodeScanner([CaptionHandler()]).pre_filter(html),
+            '<wagtail_block_caption id="attachment_1" align="aligncenter" width="600">\n'
+            '<img src="https://www.example.com/images/foo.jpg" />\n'
+            "A caption</wagtail_block_caption>",
+        )
+
+    def test_unmatched_tags_are_left(self):
+        html = "[foo this is an aside] [bar][foo]x[/bar] [/foo bar] [/baz] [food]"
+        self.assertEqual(
+            self.scanner.pre_filter(html),
+            "[foo this is an aside] <wagtail_block_bar>[foo]x</wagtail_block_bar>"
+            " [/foo bar] [/baz] [food]",
+        )
+
+    def test_handler_overriding_pre_filter_is_called(self):
+        class UpperHandler(BlockShortcodeHandler):
+            shortcode_name = "upper"
+
+            def pre_filter(self, string):
+                return string.upper()
+
+        scanner = BlockShortcodeScanner([FooHandler(), UpperHandler()])
+        self.assertEqual(scanner.tokenizer.pattern.count("upper"), 0)
+        self.assertEqual(
+            scanner.pre_filter("[foo]x[/foo]"),
+            "<WAGTAIL_BLOCK_FOO>X</WAGTAIL_BLOCK_FOO>",
+        )
+
+    def test_scanner_is_built_once_per_registry(self):
+        handlers = [CaptionHandler]
+        with mock.patch(
+            "wagtail_wordpress_import.prefilters.handle_shortcodes.SHORTCODE_HANDLERS",
+            handlers,
+        ):
+            scanner = get_shortcode_scanner()
+            self.assertIs(get_shortcode_scanner(), scanner)
+            self.assertEqual(
+                filter_transform_shortcodes("[foo]x[/foo]"), "[foo]x[/foo]"
+            )
+
+            handlers.append(FooHandler)
+            self.assertIsNot(get_shortcode_scanner(), scanner)
+            self.assertEqual(
+                filter_transform_shortcodes("[foo]x[/foo]"),
+                "<wagtail_block_foo>x</wagtail_block_foo>",
+            )
@@ -0,0 +1,117 @@
+import os
+
+from django.test import TestCase, override_settings
+
+from wagtail_wordpress_import.importers.wordpress import WordpressImporter
+from wagtail_wordpress_import.logger import Logger
+from wagtail_wordpress_import.prefilters.pipeline import run_prefilters
+from wagtail_wordpress_import.timings import (
+    NO_TIMING,
+    StageTimings,
+    record_timings,
+    time_stage,
+)
+
+BASE_PATH = os.path.dirname(os.path.dirname(__file__))
+FIXTURES_PATH = BASE_PATH + "/fixtures"
+
+
+class TestTimeStage(TestCase):
+    def test_nothing_is_timed_without_active_timings(self):
+        self.assertIs(time_stage("page_save"), NO_TIMING)
+
+    def test_stages_are_added_up(self):
+        timings = {}
+        with record_timings(timings):
+            for i in range(2):
+                with time_stage("page_save"):
+                    pass
+        self.assertEqual(list(timings), ["page_save"])
+        self.assertGreater(timings["page_save"], 0)
+        self.assertIs(time_stage("page_save"), NO_TIMING)
+
+    def test_each_prefilter_is_timed(self):
+        timings = {}
+        with record_timings(timings):
+            run_prefilters(
+                "<p>one</p>",
+                [
+                    {"FUNCTION": "wagtail_wordpress_import.prefilters.linebreaks_wp"},
+                    {"FUNCTION": "wagtail_wordpress_import.prefilters.bleach_clean"},
+                ],
+            )
+        self.assertEqual(
+            set(timings),
+            {
+                "prefilter_content.filter_linebreaks_wp",
+                "prefilter_content.filter_bleach_clean",
+            },
+        )
+
+
+class TestStageTimings(TestCase):
+    def test_percentiles(self):
+        stage_timings = StageTimings()
+        for i in range(1, 101):
+            stage_timings.add_item(i, {"page_save": i / 1000})
+
+        report = stage_timings.get_report()["stages"][0]
+        self.assertEqual(report["stage"], "page_save")
+        self.assertEqual(report["count"], 100)
+        self.assertAlmostEqual(report["total"], 5.05)
+        self.assertAlmostEqual(report["mean"], 0.0505)
+        self.assertEqual(report["max"], 0.1)
+        # percentiles are estimated to within 10%
+        for percent in (50, 90, 99):
+            self.assertLessEqual(report[f"p{percent}"], percent / 1000 * 1.1)
+            self.assertGreaterEqual(report[f"p{percent}"], percent / 1000)
+
+    def test_slowest_items(self):
+        stage_timings = StageTimings(slowest_count=2)
+        stage_timings.add_item(1, {"block_builder": 0.2, "page_save": 0.1})
+        stage_timings.add_item(2, {"block_builder": 0.5})
+        # part of the block builder's time, so not added to the total
+        stage_timings.add_item(3, {"block_builder": 0.1, "block_builder.x": 0.1})
+
+        slowest = stage_timings.get_report()["slowest_items"]
+        self.assertEqual([item["post_id"] for item in slowest], [2, 1])
+        self.assertAlmostEqual(slowest[1]["total"], 0.3)
+
+
+@override_settings(WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN="http://www.example.com")
+class TestImporterTimings(TestCase):
+    fixtures = [
+        f"{FIXTURES_PATH}/dump.json",
+    ]
+
+    def run_importer(self, logger):
+        WordpressImporter(f"{FIXTURES_PATH}/raw_xml.xml").run(
+            logger=logger,
+            app_for_pages="wagtail_wordpress_import_test",
+            model_for_pages="TestPage",
+            parent_id="2",
+            page_types=["post", "page"],
+            page_statuses=["publish", "draft"],
+        )
+
+    def test_stages_are_timed(self):
+        logger = Logger("fakedir", verbose=False, timings=True)
+        self.run_importer(logger)
+
+        report = logger.timings.get_report()
+        stages = {stage["stage"]: stage["count"] for stage in report["stages"]}
+        for stage in (
+            "prefilter_content",
+            "prefilter_content.filter_linebreaks_wp",
+            "block_builder",
+            "update_page_links",
+            "check_stream_field_block_types",
+            "page_save",
+        ):
+            self.assertEqual(stages[stage], 2)
+        self.assertEqual(len(report["slowest_items"]), 2)
+
+    def test_timings_are_off_by_default(self):
+        logger = Logger("fakedir", verbose=False)
+        self.run_importer(logger)
+        self.assertIsNone(logger.timings)
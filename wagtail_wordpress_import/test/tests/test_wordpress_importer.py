@@ -1,5 +1,9 @@
 import os
+import shutil
+import tempfile
+from unittest import mock
 
+import responses
 from django.test import TestCase, override_settings
 from wagtail import VERSION as WAGTAIL_VERSION
 
@@ -8,8 +12,27 @@ if WAGTAIL_VERSION >= (3, 0):
 else:
     from wagtail.core.models import Page
 
-from wagtail_wordpress_import.importers.wordpress import WordpressImporter
+from wagtail_wordpress_import.block_builder import (
+    REGISTERED_BLOCK_BUILDERS,
+    clear_block_dispatch_table,
+)
+from wagtail_wordpress_import.block_builder_defaults import (
+    build_heading_block,
+    conf_html_tags_to_blocks,
+)
+from wagtail_wordpress_import.importers.wordpress import (
+    WordpressImporter,
+    start_worker_pool,
+)
 from wagtail_wordpress_import.logger import Logger
+from wagtail_wordpress_import.media import MediaFetcher
+from wagtail_wordpress_import.models import ImportedMedia
+from wagtail_wordpress_import.test.models import TestPage
+from wagtail_wordpress_import.test.tests.utility_functions import mock_image
+from wagtail_wordpress_import.test.tests.xml_boilerplate import (
+    build_xml_stream,
+    generate_temporay_file,
+)
 
 BASE_PATH = os.path.dirname(os.path.dirname(__file__))
 FIXTURES_PATH = BASE_PATH + "/fixtures"
@@ -106,6 +129,9 @@ class WordpressImporterTests(TestCase):
         skipped = self.logger.skipped
         self.assertEqual(skipped, 3)
 
+        # only the items are logged, not the other tags in the xml
+        self.assertEqual(self.logger.results, {"created": 2, "excluded": 3})
+
     def test_logger_lists(self):
         logger = Logger(LOG_DIR)
         logger.items.append(
@@ -314,3 +340,412 @@ class WordpressImporterTestsYoastEnabledChangedKey(TestCase):
             self.published_pages.first().search_description,
             "a search description from yoast using a different key",
         )
+
+
+@override_settings(WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN="http://www.example.com")
+class WordpressImporterTestsPostIds(TestCase):
+    """Only the items with the given post ids are read using the XML index."""
+
+    fixtures = [
+        f"{FIXTURES_PATH}/dump.json",
+    ]
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        xml_file = os.path.join(self.temp_dir, "raw_xml.xml")
+        shutil.copy(f"{FIXTURES_PATH}/raw_xml.xml", xml_file)
+        self.importer = WordpressImporter(xml_file)
+        self.logger = Logger(LOG_DIR)
+        self.importer.run(
+            logger=self.logger,
+            app_for_pages=IMPORTER_RUN_PARAMS_TEST["app_for_pages"],
+            model_for_pages=IMPORTER_RUN_PARAMS_TEST["model_for_pages"],
+            parent_id=IMPORTER_RUN_PARAMS_TEST["parent_id"],
+            page_types=IMPORTER_RUN_PARAMS_TEST["page_types"],
+            page_statuses=IMPORTER_RUN_PARAMS_TEST["page_statuses"],
+            post_ids=[2],
+        )
+        self.parent_page = Page.objects.get(id=IMPORTER_RUN_PARAMS_TEST["parent_id"])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_only_selected_items_imported(self):
+        imported_pages = self.parent_page.get_children()
+        self.assertEqual(len(imported_pages), 1)
+        self.assertEqual(imported_pages.first().title, "Item two title")
+        self.assertEqual(self.logger.processed, 1)
+
+
+@override_settings(WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN="http://www.example.com")
+class WordpressImporterTestsIncremental(TestCase):
+    """Items are skipped if their digest matches the digest saved on the page."""
+
+    fixtures = [
+        f"{FIXTURES_PATH}/dump.json",
+    ]
+
+    def run_import(self, **kwargs):
+        logger = Logger(LOG_DIR)
+        WordpressImporter(f"{FIXTURES_PATH}/raw_xml.xml").run(
+            logger=logger,
+            app_for_pages=IMPORTER_RUN_PARAMS_TEST["app_for_pages"],
+            model_for_pages=IMPORTER_RUN_PARAMS_TEST["model_for_pages"],
+            parent_id=IMPORTER_RUN_PARAMS_TEST["parent_id"],
+            page_types=IMPORTER_RUN_PARAMS_TEST["page_types"],
+            page_statuses=IMPORTER_RUN_PARAMS_TEST["page_statuses"],
+            **kwargs,
+        )
+        return logger
+
+    def test_digest_saved_on_page(self):
+        self.run_import()
+        page = Page.objects.get(title="Item one title").specific
+        self.assertEqual(len(page.wp_import_digest), 64)
+
+    def test_unchanged_items_are_skipped(self):
+        self.run_import()
+        logger = self.run_import(incremental=True)
+        self.assertEqual(logger.unchanged, 2)
+        self.assertEqual(logger.imported, 0)
+        self.assertEqual(
+            [item["result"] for item in logger.items if item["id"]],
+            ["unchanged", "unchanged"],
+        )
+
+    def test_items_are_imported_without_incremental(self):
+        self.run_import()
+        logger = self.run_import()
+        self.assertEqual(logger.unchanged, 0)
+        self.assertEqual(logger.imported, 2)
+
+    def test_changed_config_imports_items(self):
+        self.run_import()
+        with override_settings(
+            WAGTAIL_WORDPRESS_IMPORT_PREFILTERS=[
+                {"FUNCTION": "wagtail_wordpress_import.prefilters.linebreaks_wp"}
+            ]
+        ):
+            logger = self.run_import(incremental=True)
+        self.assertEqual(logger.unchanged, 0)
+        self.assertEqual(logger.imported, 2)
+
+    def test_changed_settings_import_items(self):
+        for setting in [
+            {"WAGTAIL_WORDPRESS_IMPORTER_HTML_PARSER": "html.parser"},
+            {"WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN": "https://example.org"},
+            {"WAGTAIL_WORDPRESS_IMPORTER_DIGEST_VERSION": 2},
+        ]:
+            with self.subTest(setting=setting):
+                self.run_import()
+                with override_settings(**setting):
+                    logger = self.run_import(incremental=True)
+                self.assertEqual(logger.unchanged, 0)
+                self.assertEqual(logger.imported, 2)
+
+    def test_registered_block_builder_imports_items(self):
+        self.run_import()
+        self.addCleanup(clear_block_dispatch_table)
+        with mock.patch.dict(REGISTERED_BLOCK_BUILDERS, {"h2": build_heading_block}):
+            clear_block_dispatch_table()
+            logger = self.run_import(incremental=True)
+        self.assertEqual(logger.unchanged, 0)
+        self.assertEqual(logger.imported, 2)
+
+    def test_digest_is_computed_once_for_each_item(self):
+        self.run_import()
+        with mock.patch(
+            "wagtail_wordpress_import.importers.wordpress.conf_html_tags_to_blocks",
+            wraps=conf_html_tags_to_blocks,
+        ) as conf:
+            logger = self.run_import(incremental=True)
+        self.assertEqual(logger.unchanged, 2)
+        self.assertEqual(conf.call_count, 2)
+
+    def test_unresolved_links_of_unchanged_pages_are_resolved(self):
+        link = '<p><a href="https://www.example.com/item-2">Item 2</a></p>'
+        xml_file = generate_temporay_file(
+            build_xml_stream(xml_items_fragment=build_item(1, link)).read()
+        )
+        self.addCleanup(os.remove, xml_file)
+        run_params = {
+            "app_for_pages": IMPORTER_RUN_PARAMS_TEST["app_for_pages"],
+            "model_for_pages": IMPORTER_RUN_PARAMS_TEST["model_for_pages"],
+            "parent_id": IMPORTER_RUN_PARAMS_TEST["parent_id"],
+            "page_types": ["post"],
+            "page_statuses": ["publish"],
+        }
+        WordpressImporter(xml_file).run(logger=Logger(LOG_DIR), **run_params)
+        page = TestPage.objects.get(wp_post_id=1)
+        self.assertIn(
+            'href="https://www.example.com/item-2"', page.body.raw_data[0]["value"]
+        )
+
+        # the page linked to is added to the site, the item itself is unchanged
+        with open(xml_file, "w") as f:
+            f.write(
+                build_xml_stream(
+                    xml_items_fragment=build_item(1, link) + build_item(2, "<p>Two</p>")
+                ).read()
+            )
+        logger = Logger(LOG_DIR)
+        WordpressImporter(xml_file).run(logger=logger, incremental=True, **run_params)
+
+        self.assertEqual(logger.unchanged, 1)
+        self.assertEqual(logger.imported, 1)
+        page.refresh_from_db()
+        target = TestPage.objects.get(wp_post_id=2)
+        self.assertIn(
+            f'<a id="{target.id}" linktype="page">Item 2</a>',
+            page.body.raw_data[0]["value"],
+        )
+
+
+@override_settings(WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN="http://www.example.com")
+class WordpressImporterTestsWorkers(TestCase):
+    """The content of items is processed in worker processes."""
+
+    fixtures = [
+        f"{FIXTURES_PATH}/dump.json",
+    ]
+
+    def setUp(self):
+        self.importer = WordpressImporter(f"{FIXTURES_PATH}/raw_xml.xml")
+        self.logger = Logger(LOG_DIR)
+        self.importer.run(
+            logger=self.logger,
+            app_for_pages=IMPORTER_RUN_PARAMS_TEST["app_for_pages"],
+            model_for_pages=IMPORTER_RUN_PARAMS_TEST["model_for_pages"],
+            parent_id=IMPORTER_RUN_PARAMS_TEST["parent_id"],
+            page_types=IMPORTER_RUN_PARAMS_TEST["page_types"],
+            page_statuses=IMPORTER_RUN_PARAMS_TEST["page_statuses"],
+            workers=2,
+        )
+        self.parent_page = Page.objects.get(id=IMPORTER_RUN_PARAMS_TEST["parent_id"])
+
+    def test_pages_imported_in_order(self):
+        self.assertEqual(
+            [page.title for page in self.parent_page.get_children()],
+            ["Item one title", "Item two title"],
+        )
+        self.assertEqual(self.logger.imported, 2)
+        self.assertEqual(self.logger.skipped, 3)
+
+    def test_page_content(self):
+        page = self.parent_page.get_children().get(title="Item one title").specific
+        self.assertTrue(page.body)
+        self.assertTrue(page.wp_block_json)
+        self.assertEqual(page.wp_post_id, 1)
+
+
+def build_item(post_id, content):
+    return f"""
+    <item>
+        <title>Item {post_id}</title>
+        <link>https://www.example.com/item-{post_id}</link>
+        <content:encoded><![CDATA[{content}]]></content:encoded>
+        <wp:post_id>{post_id}</wp:post_id>
+        <wp:post_date_gmt>2015-05-21 19:00:31</wp:post_date_gmt>
+        <wp:post_modified_gmt>2015-05-21 19:00:44</wp:post_modified_gmt>
+        <wp:post_name>item-{post_id}</wp:post_name>
+        <wp:status>publish</wp:status>
+        <wp:post_type>post</wp:post_type>
+    </item>
+    """
+
+
+@override_settings(WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN="http://www.example.com")
+class WordpressImporterTestsWorkersMedia(TestCase):
+    """The media is fetched and saved by the main process, not the workers."""
+
+    fixtures = [
+        f"{FIXTURES_PATH}/dump.json",
+    ]
+
+    @responses.activate
+    def test_repeated_image_is_imported_once(self):
+        image_url = "http://www.example.com/uploads/image.jpg"
+        responses.add(
+            responses.GET,
+            image_url,
+            body=mock_image().read(),
+            status=200,
+            content_type="image/jpeg",
+        )
+        xml_file = generate_temporay_file(
+            build_xml_stream(
+                xml_items_fragment="".join(
+                    build_item(post_id, f'<p>Text <img src="{image_url}" /></p>')
+                    for post_id in range(1, 7)
+                )
+            ).read()
+        )
+        self.addCleanup(os.remove, xml_file)
+
+        logger = Logger(LOG_DIR)
+        WordpressImporter(xml_file).run(
+            logger=logger,
+            app_for_pages=IMPORTER_RUN_PARAMS_TEST["app_for_pages"],
+            model_for_pages=IMPORTER_RUN_PARAMS_TEST["model_for_pages"],
+            parent_id=IMPORTER_RUN_PARAMS_TEST["parent_id"],
+            page_types=["post"],
+            page_statuses=["publish"],
+            workers=2,
+            batch_size=2,
+        )
+
+        self.assertEqual(logger.imported, 6)
+        self.assertEqual(
+            ImportedMedia.objects.filter(media_type="image", source_url=image_url)
+            .values("object_id")
+            .distinct()
+            .count(),
+            1,
+        )
+        self.assertEqual(ImportedMedia.objects.filter(source_url=image_url).count(), 1)
+
+    @responses.activate
+    def test_prefetched_images_are_downloaded_once(self):
+        image_urls = [
+            f"http://www.example.com/uploads/image-{post_id}.jpg"
+            for post_id in range(1, 13)
+        ]
+        for image_url in image_urls:
+            responses.add(
+                responses.GET,
+                image_url,
+                body=mock_image().read(),
+                status=200,
+                content_type="image/jpeg",
+            )
+        xml_file = generate_temporay_file(
+            build_xml_stream(
+                xml_items_fragment="".join(
+                    build_item(post_id, f'<p>Text <img src="{image_url}" /></p>')
+                    for post_id, image_url in enumerate(image_urls, 1)
+                )
+            ).read()
+        )
+        self.addCleanup(os.remove, xml_file)
+
+        logger = Logger(LOG_DIR)
+        WordpressImporter(xml_file).run(
+            logger=logger,
+            app_for_pages=IMPORTER_RUN_PARAMS_TEST["app_for_pages"],
+            model_for_pages=IMPORTER_RUN_PARAMS_TEST["model_for_pages"],
+            parent_id=IMPORTER_RUN_PARAMS_TEST["parent_id"],
+            page_types=["post"],
+            page_statuses=["publish"],
+            workers=2,
+            batch_size=1,
+        )
+
+        self.assertEqual(logger.imported, 12)
+        # the results prefetched ahead of the import aren't discarded
+        self.assertEqual(len(responses.calls), 12)
+
+    def test_worker_pool_is_started_before_the_media_fetcher(self):
+        xml_file = generate_temporay_file(
+            build_xml_stream(xml_items_fragment=build_item(1, "<p>Text</p>")).read()
+        )
+        self.addCleanup(os.remove, xml_file)
+
+        calls = mock.Mock()
+        with mock.patch(
+            "wagtail_wordpress_import.importers.wordpress.start_worker_pool",
+            wraps=start_worker_pool,
+        ) as pool, mock.patch(
+            "wagtail_wordpress_import.importers.wordpress.MediaFetcher",
+            wraps=MediaFetcher,
+        ) as fetcher:
+            calls.attach_mock(pool, "start_worker_pool")
+            calls.attach_mock(fetcher, "MediaFetcher")
+            WordpressImporter(xml_file).run(
+                logger=Logger(LOG_DIR),
+                app_for_pages=IMPORTER_RUN_PARAMS_TEST["app_for_pages"],
+                model_for_pages=IMPORTER_RUN_PARAMS_TEST["model_for_pages"],
+                parent_id=IMPORTER_RUN_PARAMS_TEST["parent_id"],
+                page_types=["post"],
+                page_statuses=["publish"],
+                workers=2,
+            )
+
+        self.assertEqual(
+            [name for name, args, kwargs in calls.mock_calls],
+            ["start_worker_pool", "MediaFetcher"],
+        )
+
+
+@override_settings(WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN="http://www.example.com")
+class WordpressImporterTestsWorkersDuplicates(TestCase):
+    """Items with the same post id in different chunks update the same page."""
+
+    fixtures = [
+        f"{FIXTURES_PATH}/dump.json",
+    ]
+
+    def test_duplicate_post_id_is_imported_once(self):
+        xml_file = generate_temporay_file(
+            build_xml_stream(
+                xml_items_fragment=build_item(1, "<p>First</p>")
+                + build_item(2, "<p>Other</p>")
+                + build_item(1, "<p>Second</p>")
+            ).read()
+        )
+        self.addCleanup(os.remove, xml_file)
+
+        WordpressImporter(xml_file).run(
+            logger=Logger(LOG_DIR),
+            app_for_pages=IMPORTER_RUN_PARAMS_TEST["app_for_pages"],
+            model_for_pages=IMPORTER_RUN_PARAMS_TEST["model_for_pages"],
+            parent_id=IMPORTER_RUN_PARAMS_TEST["parent_id"],
+            page_types=["post"],
+            page_statuses=["publish"],
+            workers=2,
+            batch_size=1,
+        )
+
+        pages = TestPage.objects.filter(wp_post_id=1)
+        self.assertEqual(pages.count(), 1)
+        self.assertIn("Second", str(pages.get().body))
+
+
+@override_settings(WAGTAIL_WORDPRESS_IMPORTER_SOURCE_DOMAIN="http://www.example.com")
+class WordpressImporterTestsBatchSize(TestCase):
+    """Pages are saved in batches, each batch in a single transaction."""
+
+    fixtures = [
+        f"{FIXTURES_PATH}/dump.json",
+    ]
+
+    def run_import(self):
+        logger = Logger(LOG_DIR)
+        WordpressImporter(f"{FIXTURES_PATH}/raw_xml.xml").run(
+            logger=logger,
+            app_for_pages=IMPORTER_RUN_PARAMS_TEST["app_for_pages"],
+            model_for_pages=IMPORTER_RUN_PARAMS_TEST["model_for_pages"],
+            parent_id=IMPORTER_RUN_PARAMS_TEST["parent_id"],
+            page_types=IMPORTER_RUN_PARAMS_TEST["page_types"],
+            page_statuses=IMPORTER_RUN_PARAMS_TEST["page_statuses"],
+            batch_size=3,
+        )
+        return logger
+
+    def test_pages_added_to_tree(self):
+        logger = self.run_import()
+        parent_page = Page.objects.get(id=IMPORTER_RUN_PARAMS_TEST["parent_id"])
+        children = parent_page.get_children()
+        self.assertEqual(
+            [page.title for page in children], ["Item one title", "Item two title"]
+        )
+        self.assertEqual(parent_page.numchild, 2)
+        self.assertEqual(len({page.path for page in children}), 2)
+        self.assertEqual(logger.imported, 2)
+        self.assertEqual(Page.find_problems(), ([], [], [], [], []))
+
+    def test_reimport_updates_pages(self):
+        self.run_import()
+        self.run_import()
+        parent_page = Page.objects.get(id=IMPORTER_RUN_PARAMS_TEST["parent_id"])
+        self.assertEqual(parent_page.get_children().count(), 2)
+        self.assertEqual(parent_page.numchild, 2)
@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+
+from wagtail_wordpress_import.importers.readers import (
+    IndexedItemReader,
+    IterparseItemReader,
+)
+from wagtail_wordpress_import.importers.xml_index import XmlIndex, count_items
+from wagtail_wordpress_import.test.tests.xml_boilerplate import build_xml_stream
+
+BASE_PATH = os.path.dirname(os.path.dirname(__file__))
+FIXTURES_PATH = BASE_PATH + "/fixtures"
+
+
+class TestXmlIndex(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.xml_file = os.path.join(self.temp_dir, "raw_xml.xml")
+        shutil.copy(f"{FIXTURES_PATH}/raw_xml.xml", self.xml_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_build_index(self):
+        index = XmlIndex.build(self.xml_file)
+        self.assertEqual(len(index.items), 5)
+        self.assertEqual([entry["post_id"] for entry in index.items], [1, 2, 1, 1, 1])
+        entry = index.items[0]
+        self.assertEqual(entry["post_type"], "post")
+        self.assertEqual(entry["status"], "publish")
+        self.assertEqual(len(entry["hash"]), 64)
+        with open(self.xml_file, "rb") as f:
+            f.seek(entry["offset"])
+            item_bytes = f.read(entry["length"])
+        self.assertTrue(item_bytes.startswith(b"<item>"))
+        self.assertTrue(item_bytes.endswith(b"</item>"))
+
+    def test_get_or_build_saves_index(self):
+        self.assertIsNone(XmlIndex.load(self.xml_file))
+        XmlIndex.get_or_build(self.xml_file)
+        self.assertTrue(os.path.exists(XmlIndex.get_index_path(self.xml_file)))
+        self.assertEqual(len(XmlIndex.load(self.xml_file).items), 5)
+
+    def test_index_is_stale_when_file_changes(self):
+        XmlIndex.get_or_build(self.xml_file)
+        with open(self.xml_file, "a") as f:
+            f.write("\n")
+        self.assertIsNone(XmlIndex.load(self.xml_file))
+
+    def test_item_tags_in_cdata_are_ignored(self):
+        xml_file = os.path.join(self.temp_dir, "cdata.xml")
+        with open(xml_file, "w") as f:
+            f.write(
+                build_xml_stream(
+                    xml_items_fragment="""
+                    <item>
+                        <wp:post_id>1</wp:post_id>
+                        <content:encoded><![CDATA[<item>not an item</item>]]></content:encoded>
+                    </item>
+                    <!-- <item></item> -->
+                    <item>
+                        <wp:post_id>2</wp:post_id>
+                    </item>
+                    """
+                ).read()
+            )
+        index = XmlIndex.build(xml_file)
+        self.assertEqual([entry["post_id"] for entry in index.items], [1, 2])
+        self.assertEqual(count_items(xml_file), 2)
+
+    def test_build_index_of_invalid_file(self):
+        for content, message in [
+            ("", "is empty"),
+            ("no tags here", "has no root tag"),
+        ]:
+            with self.subTest(content=content):
+                with open(self.xml_file, "w") as f:
+                    f.write(content)
+                with self.assertRaisesMessage(ValueError, message):
+                    XmlIndex.build(self.xml_file)
+                self.assertEqual(count_items(self.xml_file), 0)
+
+    def test_count_items(self):
+        # scanned without an index
+        self.assertEqual(count_items(self.xml_file), 5)
+        self.assertEqual(IterparseItemReader(self.xml_file).count_items(), 5)
+        XmlIndex.get_or_build(self.xml_file)
+        self.assertEqual(count_items(self.xml_file), 5)
+        self.assertEqual(
+            IndexedItemReader(self.xml_file, post_ids=[2]).count_items(), 1
+        )
+
+    def test_indexed_reader_matches_iterparse_reader(self):
+        self.assertEqual(
+            list(IndexedItemReader(self.xml_file)),
+            list(IterparseItemReader(self.xml_file)),
+        )
+
+    def test_indexed_reader_selects_items(self):
+        items = list(IndexedItemReader(self.xml_file, post_ids=[2]))
+        self.assertEqual(
+            [(item["wp:post_id"], item["wp:post_type"]) for tag, item in items],
+            [(2, "page")],
+        )
+
+        items = list(
+            IndexedItemReader(
+                self.xml_file,
+                post_ids=[2],
+                post_types=["page"],
+                item_types_to_cache=["hasnocategories"],
+            )
+        )
+        self.assertEqual(
+            [(item["wp:post_id"], item["wp:post_type"]) for tag, item in items],
+            [(2, "page"), (1, "hasnocategories")],
+        )
+
+    def test_indexed_reader_tags_to_cache(self):
+        xml_file = os.path.join(self.temp_dir, "tags.xml")
+        with open(xml_file, "w") as f:
+            f.write(
+                build_xml_stream(
+                    xml_tags_fragment="""
+                    <wp:author><wp:author_login>joe</wp:author_login></wp:author>
+                    """,
+                    xml_items_fragment="""
+                    <item><wp:post_id>1</wp:post_id></item>
+                    """,
+                ).read()
+            )
+        self.assertEqual(
+            list(IndexedItemReader(xml_file, tags_to_cache=["wp:author"])),
+            [
+                ("wp:author", {"wp:author_login": "joe"}),
+                ("item", {"wp:post_id": 1}),
+            ],
+        )
@@ -0,0 +1,156 @@
+import heapq
+import math
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+
+_active_timings = None
+
+NO_TIMING = nullcontext()
+
+# durations are counted in buckets that are each 10% wider than the last,
+# so the percentiles are within 10% however many items are timed
+BUCKET_RATIO = 1.1
+BUCKET_MIN = 1e-6  # seconds
+
+
+def timings_enabled():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_TIMINGS", False)
+
+
+def slowest_items_count():
+    return getattr(settings, "WAGTAIL_WORDPRESS_IMPORTER_TIMINGS_SLOWEST_ITEMS", 10)
+
+
+class record_timings:
+    """
+    Record the stages timed with time_stage() in the timings dict, by stage
+    name, while the context is active. With None as the dict nothing is
+    recorded.
+    """
+
+    def __init__(self, timings):
+        self.timings = timings
+
+    def __enter__(self):
+        global _active_timings
+        self.previous = _active_timings
+        _active_timings = self.timings
+        return self.timings
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _active_timings
+        _active_timings = self.previous
+
+
+class StageTimer:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timings[self.name] = (
+            self.timings.get(self.name, 0.0) + time.perf_counter() - self.started
+        )
+
+
+def time_stage(name):
+    """
+    Return a context manager adding the time spent in it to the stage in the
+    active timings. It does nothing if no timings are being recorded.
+
+    Stages with a "." in their name are part of another stage, e.g.
+    "prefilter_content.bleach_clean", and aren't added to the item's total.
+    """
+    if _active_timings is None:
+        return NO_TIMING
+    return StageTimer(_active_timings, name)
+
+
+class StageTimings:
+    """
+    Collect the stage timings of each item imported, keeping the count, total
+    and a histogram of the durations of each stage rather than every duration,
+    and the slowest items by their total time.
+    """
+
+    def __init__(self, slowest_count=None):
+        self.slowest_count = (
+            slowest_items_count() if slowest_count is None else slowest_count
+        )
+        self.stages = {}
+        self.slowest = []  # a heap of (total seconds, post id)
+
+    def add_item(self, post_id, timings):
+        for name, seconds in timings.items():
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = {
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "buckets": {},
+                }
+            stage["count"] += 1
+            stage["total"] += seconds
+            stage["max"] = max(stage["max"], seconds)
+            bucket = get_bucket(seconds)
+            stage["buckets"][bucket] = stage["buckets"].get(bucket, 0) + 1
+
+        total = sum(seconds for name, seconds in timings.items() if "." not in name)
+        if len(self.slowest) < self.slowest_count:
+            heapq.heappush(self.slowest, (total, post_id))
+        elif self.slowest and total > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (total, post_id))
+
+    def percentile(self, name, percent):
+        """Return an estimate of the percentile of the stage durations."""
+        stage = self.stages[name]
+        rank = math.ceil(stage["count"] * percent / 100)
+        seen = 0
+        for bucket in sorted(stage["buckets"]):
+            seen += stage["buckets"][bucket]
+            if seen >= rank:
+                return min(get_bucket_limit(bucket), stage["max"])
+        return stage["max"]
+
+    def get_report(self):
+        """Return a dict of the stages, slowest in total first, and the slowest items."""
+        return {
+            "stages": [
+                {
+                    "stage": name,
+                    "count": stage["count"],
+                    "total": stage["total"],
+                    "mean": stage["total"] / stage["count"],
+                    "p50": self.percentile(name, 50),
+                    "p90": self.percentile(name, 90),
+                    "p99": self.percentile(name, 99),
+                    "max": stage["max"],
+                }
+                for name, stage in sorted(
+                    self.stages.items(), key=lambda stage: -stage[1]["total"]
+                )
+            ],
+            "slowest_items": [
+                {"post_id": post_id, "total": total}
+                for total, post_id in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+def get_bucket(seconds):
+    if seconds <= BUCKET_MIN:
+        return 0
+    return math.ceil(math.log(seconds / BUCKET_MIN, BUCKET_RATIO))
+
+
+def get_bucket_limit(bucket):
+    """Return the longest duration counted in the bucket."""
+    return BUCKET_MIN * BUCKET_RATIO**bucket